@@ -31,8 +31,12 @@ from app.models import (
 # Alembic Config 对象
 config = context.config
 
-# 设置数据库连接字符串（从环境变量读取）
-config.set_main_option("sqlalchemy.url", settings.database_url)
+# 数据库连接字符串：以代码方式调用时可通过 config.attributes["database_url"] 传入，
+# 否则从应用配置（环境变量/.env）读取
+database_url = config.attributes.get("database_url") or settings.database_url
+
+# 设置数据库连接字符串
+config.set_main_option("sqlalchemy.url", database_url)
 
 # 配置日志
 if config.config_file_name is not None:
@@ -75,7 +79,7 @@ def do_run_migrations(connection: Connection) -> None:
 async def run_async_migrations() -> None:
     """在'在线'模式下运行异步迁移"""
     configuration = config.get_section(config.config_ini_section, {})
-    configuration["sqlalchemy.url"] = settings.database_url
+    configuration["sqlalchemy.url"] = database_url
     
     connectable = async_engine_from_config(
         configuration,
@@ -48,7 +48,7 @@ from app.services.foreshadow_service import foreshadow_service
 from app.services.chapter_regenerator import ChapterRegenerator
 from app.logger import get_logger
 from app.api.settings import get_user_ai_service
-from app.utils.sse_response import SSEResponse, create_sse_response
+from app.utils.sse_response import SSEResponse, create_sse_response, batch_text_stream
 
 router = APIRouter(prefix="/chapters", tags=["章节管理"])
 logger = get_logger(__name__)
@@ -1285,12 +1285,12 @@ async def generate_chapter_content_stream(
         tracker = WizardProgressTracker("章节")
         
         try:
-            yield await tracker.start()
+            yield tracker.start()
             
             # 创建新的数据库会话
             async for db_session in get_db(request):
                 # === 加载阶段 ===
-                yield await tracker.loading("加载章节信息...", 0.2)
+                yield tracker.loading("加载章节信息...", 0.2)
                 
                 # 重新获取章节信息
                 chapter_result = await db_session.execute(
@@ -1298,10 +1298,10 @@ async def generate_chapter_content_stream(
                 )
                 current_chapter = chapter_result.scalar_one_or_none()
                 if not current_chapter:
-                    yield await tracker.error("章节不存在", 404)
+                    yield tracker.error("章节不存在", 404)
                     return
             
-                yield await tracker.loading("加载项目信息...", 0.4)
+                yield tracker.loading("加载项目信息...", 0.4)
                 
                 # 获取项目信息
                 project_result = await db_session.execute(
@@ -1309,7 +1309,7 @@ async def generate_chapter_content_stream(
                 )
                 project = project_result.scalar_one_or_none()
                 if not project:
-                    yield await tracker.error("项目不存在", 404)
+                    yield tracker.error("项目不存在", 404)
                     return
                 
                 # 获取项目的大纲模式
@@ -1413,7 +1413,7 @@ async def generate_chapter_content_stream(
                 logger.info(f"  - 相关记忆: {chapter_context.context_stats.get('memory_count', 0)} 条")
                 logger.info(f"  - 总上下文长度: {chapter_context.context_stats.get('total_length', 0)} 字符")
             
-                yield await tracker.loading("上下文构建完成", 0.8)
+                yield tracker.loading("上下文构建完成", 0.8)
                 
                 # 🎭 确定使用的叙事人称（临时指定 > 项目默认 > 系统默认）
                 chapter_perspective = (
@@ -1527,7 +1527,7 @@ async def generate_chapter_content_stream(
                     prompt = base_prompt
                 
                 # === 准备阶段 ===
-                yield await tracker.preparing("准备AI提示词...")
+                yield tracker.preparing("准备AI提示词...")
                 
                 logger.info(f"开始AI流式创作章节 {chapter_id}")
                 
@@ -1566,34 +1566,35 @@ async def generate_chapter_content_stream(
                 full_content = ""
                 chunk_count = 0
                 
-                yield await tracker.generating(
+                yield tracker.generating(
                     current_chars=0,
                     estimated_total=target_word_count
                 )
                 
-                async for chunk in user_ai_service.generate_text_stream(**generate_kwargs):
+                async for chunk in batch_text_stream(user_ai_service.generate_text_stream(**generate_kwargs)):
+                    if chunk is None:
+                        # 上游空闲时发送心跳保持连接
+                        yield tracker.heartbeat()
+                        continue
+                    
                     full_content += chunk
                     chunk_count += 1
                     
                     # 发送内容块
-                    yield await tracker.generating_chunk(chunk)
+                    yield tracker.generating_chunk(chunk)
                     
                     # 每5个chunk发送一次进度更新
                     if chunk_count % 5 == 0:
-                        yield await tracker.generating(
+                        yield tracker.generating(
                             current_chars=len(full_content),
                             estimated_total=target_word_count,
                             message=f'正在创作中... 已生成 {len(full_content)} 字'
                         )
                     
-                    # 每20个chunk发送心跳
-                    if chunk_count % 20 == 0:
-                        yield await tracker.heartbeat()
-                    
                     await asyncio.sleep(0)  # 让出控制权
                 
                 # === 保存阶段 ===
-                yield await tracker.saving("正在保存章节...", 0.3)
+                yield tracker.saving("正在保存章节...", 0.3)
                 
                 # 更新章节内容到数据库
                 old_word_count = current_chapter.word_count or 0
@@ -1663,19 +1664,19 @@ async def generate_chapter_content_stream(
                     ai_service=user_ai_service
                 )
                 
-                yield await tracker.saving("章节保存完成", 0.8)
+                yield tracker.saving("章节保存完成", 0.8)
                 
                 # === 完成阶段 ===
-                yield await tracker.complete("创作完成！")
+                yield tracker.complete("创作完成！")
                 
                 # 发送结果数据
-                yield await tracker.result({
+                yield tracker.result({
                     'word_count': new_word_count,
                     'analysis_task_id': task_id
                 })
                 
                 # 发送分析开始事件（使用自定义事件）
-                yield await SSEResponse.send_event(
+                yield SSEResponse.send_event(
                     event='analysis_started',
                     data={
                         'task_id': task_id,
@@ -1684,7 +1685,7 @@ async def generate_chapter_content_stream(
                 )
                 
                 # 发送完成信号
-                yield await tracker.done()
+                yield tracker.done()
                 
                 break  # 退出async for db_session循环
         
@@ -1707,7 +1708,7 @@ async def generate_chapter_content_stream(
                         logger.info("章节生成事务已回滚（异常）")
                 except Exception as rollback_error:
                     logger.error(f"回滚失败: {str(rollback_error)}")
-            yield await tracker.error(str(e))
+            yield tracker.error(str(e))
         finally:
             # 确保数据库会话被正确关闭
             if db_session:
@@ -3022,21 +3023,21 @@ async def regenerate_chapter_stream(
             )
             characters = characters_result.scalars().all()
             
-            # 📝 根据大纲模式智能筛选相关角色（重新生成）
-            outline_mode_result = await temp_db.execute(
-                select(Project.outline_mode).where(Project.id == chapter.project_id)
+            # 获取章节大纲（角色筛选与项目上下文共用同一次查询结果）
+            outline_result = await temp_db.execute(
+                select(Outline)
+                .where(Outline.project_id == chapter.project_id)
+                .where(Outline.order_index == chapter.chapter_number)
             )
-            outline_mode = outline_mode_result.scalar_one_or_none() or 'one-to-many'
+            outline = outline_result.scalar_one_or_none()
+            
+            # 📝 根据大纲模式智能筛选相关角色（重新生成），大纲模式直接取自已加载的项目
+            outline_mode = (project.outline_mode if project else None) or 'one-to-many'
             
             filter_character_names = None
             if outline_mode == 'one-to-one':
                 # 1-1模式：从outline.structure中提取characters字段
-                outline_result_temp = await temp_db.execute(
-                    select(Outline.structure)
-                    .where(Outline.project_id == chapter.project_id)
-                    .where(Outline.order_index == chapter.chapter_number)
-                )
-                outline_structure = outline_result_temp.scalar_one_or_none()
+                outline_structure = outline.structure if outline else None
                 if outline_structure:
                     try:
                         structure = json.loads(outline_structure)
@@ -3063,14 +3064,6 @@ async def regenerate_chapter_stream(
                 filter_character_names=filter_character_names
             )
             
-            # 获取章节大纲
-            outline_result = await temp_db.execute(
-                select(Outline)
-                .where(Outline.project_id == chapter.project_id)
-                .where(Outline.order_index == chapter.chapter_number)
-            )
-            outline = outline_result.scalar_one_or_none()
-            
             # 获取写作风格
             style_content = ""
             style_id = regenerate_request.style_id
@@ -3133,11 +3126,11 @@ async def regenerate_chapter_stream(
         tracker = WizardProgressTracker("章节重新生成")
         
         try:
-            yield await tracker.start()
+            yield tracker.start()
             
             # 创建独立数据库会话
             async for db_session in get_db(request):
-                yield await tracker.loading("加载章节信息...", 0.5)
+                yield tracker.loading("加载章节信息...", 0.5)
                 
                 # 创建重新生成任务
                 regen_task = RegenerationTask(
@@ -3166,9 +3159,9 @@ async def regenerate_chapter_stream(
                 task_id = regen_task.id
                 logger.info(f"📝 创建重新生成任务: {task_id}")
                 
-                yield await tracker.preparing("准备重新生成...")
+                yield tracker.preparing("准备重新生成...")
                 
-                yield await SSEResponse.send_event(
+                yield SSEResponse.send_event(
                     event='task_created',
                     data={'task_id': task_id}
                 )
@@ -3180,7 +3173,7 @@ async def regenerate_chapter_stream(
                 full_content = ""
                 estimated_total = regenerate_request.target_word_count or len(chapter.content)
                 
-                yield await tracker.generating(
+                yield tracker.generating(
                     current_chars=0,
                     estimated_total=estimated_total
                 )
@@ -3199,11 +3192,11 @@ async def regenerate_chapter_stream(
                         # 内容块
                         chunk = event['content']
                         full_content += chunk
-                        yield await tracker.generating_chunk(chunk)
+                        yield tracker.generating_chunk(chunk)
                         
                         # 定期更新进度
                         if len(full_content) % 500 == 0:
-                            yield await tracker.generating(
+                            yield tracker.generating(
                                 current_chars=len(full_content),
                                 estimated_total=estimated_total,
                                 message=f'重新生成中... 已生成 {len(full_content)} 字'
@@ -3213,20 +3206,22 @@ async def regenerate_chapter_stream(
                         progress = event.get('progress', 0)
                         message = event.get('message', '')
                         if progress < 20:
-                            yield await tracker.preparing(message)
+                            yield tracker.preparing(message)
                         elif progress < 85:
-                            yield await tracker.generating(
+                            yield tracker.generating(
                                 current_chars=len(full_content),
                                 estimated_total=estimated_total,
                                 message=message
                             )
                         else:
-                            yield await tracker.parsing(message)
+                            yield tracker.parsing(message)
+                    elif event['type'] == 'heartbeat':
+                        yield tracker.heartbeat()
                     
                     await asyncio.sleep(0)
                 
                 # === 保存阶段 ===
-                yield await tracker.saving("保存重新生成的内容...", 0.5)
+                yield tracker.saving("保存重新生成的内容...", 0.5)
                 
                 # 更新任务状态
                 regen_task.status = 'completed'
@@ -3240,13 +3235,13 @@ async def regenerate_chapter_stream(
                 await db_session.commit()
                 db_committed = True
                 
-                yield await tracker.saving("保存完成", 0.9)
+                yield tracker.saving("保存完成", 0.9)
                 
                 # === 完成阶段 ===
-                yield await tracker.complete("重新生成完成！")
+                yield tracker.complete("重新生成完成！")
                 
                 # 发送结果数据
-                yield await tracker.result({
+                yield tracker.result({
                     'task_id': task_id,
                     'word_count': len(full_content),
                     'version_number': regen_task.version_number,
@@ -3255,7 +3250,7 @@ async def regenerate_chapter_stream(
                 })
                 
                 # 发送完成信号
-                yield await tracker.done()
+                yield tracker.done()
                 
                 logger.info(f"✅ 章节重新生成完成: {chapter_id}, 任务: {task_id}")
                 
@@ -3280,7 +3275,7 @@ async def regenerate_chapter_stream(
                 except Exception as update_error:
                     logger.error(f"更新任务失败状态失败: {str(update_error)}")
             
-            yield await tracker.error(str(e))
+            yield tracker.error(str(e))
         
         finally:
             if db_session:
@@ -3523,8 +3518,8 @@ async def partial_regenerate_stream(
         tracker = WizardProgressTracker("局部重写")
         
         try:
-            yield await tracker.start()
-            yield await tracker.loading("准备重写上下文...", 0.3)
+            yield tracker.start()
+            yield tracker.loading("准备重写上下文...", 0.3)
             
             # 截取上下文
             context_chars = partial_request.context_chars
@@ -3545,7 +3540,7 @@ async def partial_regenerate_stream(
             
             logger.info(f"📝 局部重写 - 原文: {original_word_count}字, 前文: {len(context_before)}字, 后文: {len(context_after)}字")
             
-            yield await tracker.loading("构建提示词...", 0.5)
+            yield tracker.loading("构建提示词...", 0.5)
             
             # 构建字数要求
             length_requirement = ""
@@ -3583,7 +3578,7 @@ async def partial_regenerate_stream(
                 style_content=style_content if style_content else "保持与原文一致的叙事风格"
             )
             
-            yield await tracker.preparing("开始生成...")
+            yield tracker.preparing("开始生成...")
             
             # 计算 max_tokens
             if partial_request.length_mode == "expand":
@@ -3599,24 +3594,29 @@ async def partial_regenerate_stream(
             full_content = ""
             chunk_count = 0
             
-            yield await tracker.generating(
+            yield tracker.generating(
                 current_chars=0,
                 estimated_total=target_words
             )
             
-            async for chunk in user_ai_service.generate_text_stream(
+            async for chunk in batch_text_stream(user_ai_service.generate_text_stream(
                 prompt=prompt,
                 max_tokens=calculated_max_tokens
-            ):
+            )):
+                if chunk is None:
+                    # 上游空闲时发送心跳保持连接
+                    yield tracker.heartbeat()
+                    continue
+                
                 full_content += chunk
                 chunk_count += 1
                 
                 # 发送内容块
-                yield await tracker.generating_chunk(chunk)
+                yield tracker.generating_chunk(chunk)
                 
                 # 每5个chunk发送一次进度更新
                 if chunk_count % 5 == 0:
-                    yield await tracker.generating(
+                    yield tracker.generating(
                         current_chars=len(full_content),
                         estimated_total=target_words,
                         message=f'正在重写中... 已生成 {len(full_content)} 字'
@@ -3651,10 +3651,10 @@ async def partial_regenerate_stream(
             logger.info(f"✅ 局部重写完成: 原文{original_word_count}字 -> 新文{new_word_count}字")
             
             # 完成
-            yield await tracker.complete("重写完成！")
+            yield tracker.complete("重写完成！")
             
             # 发送结果数据
-            yield await tracker.result({
+            yield tracker.result({
                 'new_text': full_content,
                 'word_count': new_word_count,
                 'original_word_count': original_word_count,
@@ -3662,11 +3662,11 @@ async def partial_regenerate_stream(
                 'end_position': partial_request.end_position
             })
             
-            yield await tracker.done()
+            yield tracker.done()
             
         except Exception as e:
             logger.error(f"❌ 局部重写失败: {str(e)}", exc_info=True)
-            yield await tracker.error(str(e))
+            yield tracker.error(str(e))
     
     return create_sse_response(event_generator())
 
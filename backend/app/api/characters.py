@@ -7,7 +7,7 @@ import json
 from typing import AsyncGenerator
 
 from app.database import get_db
-from app.utils.sse_response import SSEResponse, create_sse_response, WizardProgressTracker
+from app.utils.sse_response import SSEResponse, create_sse_response, WizardProgressTracker, batch_text_stream
 from app.models.character import Character
 from app.models.project import Project
 from app.models.generation_history import GenerationHistory
@@ -649,10 +649,10 @@ async def generate_character_stream(
             user_id = getattr(http_request.state, 'user_id', None)
             project = await verify_project_access(request.project_id, user_id, db)
             
-            yield await tracker.start()
+            yield tracker.start()
             
             # 获取已存在的角色列表
-            yield await tracker.loading("获取项目上下文...", 0.3)
+            yield tracker.loading("获取项目上下文...", 0.3)
             
             existing_chars_result = await db.execute(
                 select(Character)
@@ -744,8 +744,8 @@ async def generate_character_stream(
 - 其他要求：{request.requirements or '无'}
 """
             
-            yield await tracker.loading("项目上下文准备完成", 0.7)
-            yield await tracker.preparing("构建AI提示词...")
+            yield tracker.loading("项目上下文准备完成", 0.7)
+            yield tracker.preparing("构建AI提示词...")
             
             # 获取自定义提示词模板
             template = await PromptService.get_template("SINGLE_CHARACTER_GENERATION", user_id, db)
@@ -756,7 +756,7 @@ async def generate_character_stream(
                 user_input=user_input
             )
             
-            yield await tracker.generating(0, max(3000, len(prompt) * 8), "调用AI服务生成角色...")
+            yield tracker.generating(0, max(3000, len(prompt) * 8), "调用AI服务生成角色...")
             logger.info(f"🎯 开始为项目 {request.project_id} 生成角色（SSE流式）")
             
             try:
@@ -766,44 +766,40 @@ async def generate_character_stream(
                 estimated_total = max(3000, len(prompt) * 8)
                 
                 logger.info(f"🎯 开始生成角色（流式模式）...")
-                yield await tracker.generating(0, estimated_total, "开始生成角色...")
+                yield tracker.generating(0, estimated_total, "开始生成角色...")
                 
-                async for chunk in user_ai_service.generate_text_stream(
+                async for content in batch_text_stream(user_ai_service.generate_text_stream(
                     prompt=prompt,
                     tool_choice="required",
-                ):
-                    # chunk 现在可能是 dict 或 str，提取 content 字段
-                    if isinstance(chunk, dict):
-                        content = chunk.get("content", "")
-                    else:
-                        content = chunk
+                )):
+                    if content is None:
+                        # 上游空闲时发送心跳保持连接
+                        yield tracker.heartbeat()
+                        continue
                     
+                    # 各 Provider 只产出字符串内容，合并后直接使用
                     if content:
                         ai_response += content
                         
                         # 发送内容块
-                        yield await SSEResponse.send_chunk(content)
+                        yield SSEResponse.send_chunk(content)
                         
                         # 定期更新进度（每收到约500字符更新一次，避免过于频繁）
                         current_len = len(ai_response)
                         if current_len >= chunk_count * 500:
                             chunk_count += 1
-                            yield await tracker.generating(current_len, estimated_total)
-                        
-                        # 心跳
-                        if chunk_count % 20 == 0:
-                            yield await tracker.heartbeat()
+                            yield tracker.generating(current_len, estimated_total)
                         
             except Exception as ai_error:
                 logger.error(f"❌ AI服务调用异常：{str(ai_error)}")
-                yield await tracker.error(f"AI服务调用失败：{str(ai_error)}")
+                yield tracker.error(f"AI服务调用失败：{str(ai_error)}")
                 return
             
             if not ai_response or not ai_response.strip():
-                yield await tracker.error("AI服务返回空响应")
+                yield tracker.error("AI服务返回空响应")
                 return
             
-            yield await tracker.parsing("解析AI响应...", 0.5)
+            yield tracker.parsing("解析AI响应...", 0.5)
             
             # ✅ 使用统一的 JSON 清洗方法
             try:
@@ -813,10 +809,10 @@ async def generate_character_stream(
             except json.JSONDecodeError as e:
                 logger.error(f"❌ 角色JSON解析失败: {e}")
                 logger.error(f"   原始响应预览: {ai_response[:200]}")
-                yield await tracker.error(f"AI返回的内容无法解析为JSON：{str(e)}")
+                yield tracker.error(f"AI返回的内容无法解析为JSON：{str(e)}")
                 return
             
-            yield await tracker.saving("创建角色记录...", 0.3)
+            yield tracker.saving("创建角色记录...", 0.3)
             
             # 转换traits
             traits_json = json.dumps(character_data.get("traits", []), ensure_ascii=False) if character_data.get("traits") else None
@@ -981,7 +977,7 @@ async def generate_character_stream(
             
             # 如果是组织，创建Organization详情
             if is_organization:
-                yield await tracker.saving("创建组织详情...", 0.6)
+                yield tracker.saving("创建组织详情...", 0.6)
                 
                 org_check = await db.execute(
                     select(Organization).where(Organization.character_id == character.id)
@@ -1148,7 +1144,7 @@ async def generate_character_stream(
                     
                     logger.info(f"✅ 成功创建 {created_members} 条组织成员记录")
             
-            yield await tracker.saving("保存生成历史...", 0.9)
+            yield tracker.saving("保存生成历史...", 0.9)
             
             # 记录生成历史
             history = GenerationHistory(
@@ -1164,10 +1160,10 @@ async def generate_character_stream(
             
             logger.info(f"🎉 成功生成角色: {character.name}")
             
-            yield await tracker.complete("角色生成完成！")
+            yield tracker.complete("角色生成完成！")
             
             # 发送结果数据
-            yield await tracker.result({
+            yield tracker.result({
                 "character": {
                     "id": character.id,
                     "name": character.name,
@@ -1176,14 +1172,14 @@ async def generate_character_stream(
                 }
             })
             
-            yield await tracker.done()
+            yield tracker.done()
             
         except HTTPException as he:
             logger.error(f"HTTP异常: {he.detail}")
-            yield await tracker.error(he.detail, he.status_code)
+            yield tracker.error(he.detail, he.status_code)
         except Exception as e:
             logger.error(f"生成角色失败: {str(e)}")
-            yield await tracker.error(f"生成角色失败: {str(e)}")
+            yield tracker.error(f"生成角色失败: {str(e)}")
     
     return create_sse_response(generate())
 
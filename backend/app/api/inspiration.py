@@ -123,9 +123,10 @@ async def generate_options(
             
             system_key, user_key = template_keys
             
-            # 获取自定义提示词模板（分别获取 system 和 user）
-            system_template = await PromptService.get_template(system_key, user_id, db)
-            user_template = await PromptService.get_template(user_key, user_id, db)
+            # 获取自定义提示词模板（system 和 user 一次查询取回）
+            templates = await PromptService.get_templates_bulk(template_keys, user_id, db)
+            system_template = templates[system_key]
+            user_template = templates[user_key]
             
             # 准备格式化参数
             format_params = {
@@ -136,8 +137,8 @@ async def generate_options(
             }
             
             # 格式化提示词
-            system_prompt = system_template.format(**format_params)
-            user_prompt = user_template.format(**format_params)
+            system_prompt = PromptService.format_prompt(system_template, **format_params)
+            user_prompt = PromptService.format_prompt(user_template, **format_params)
             
             # 如果是重试，在提示词中强调格式要求
             if attempt > 0:
@@ -283,9 +284,10 @@ async def refine_options(
             
             system_key, user_key = template_keys
             
-            # 获取自定义提示词模板
-            system_template = await PromptService.get_template(system_key, user_id, db)
-            user_template = await PromptService.get_template(user_key, user_id, db)
+            # 获取自定义提示词模板（system 和 user 一次查询取回）
+            templates = await PromptService.get_templates_bulk(template_keys, user_id, db)
+            system_template = templates[system_key]
+            user_template = templates[user_key]
             
             # 准备格式化参数
             format_params = {
@@ -296,8 +298,8 @@ async def refine_options(
             }
             
             # 格式化提示词
-            system_prompt = system_template.format(**format_params)
-            user_prompt = user_template.format(**format_params)
+            system_prompt = PromptService.format_prompt(system_template, **format_params)
+            user_prompt = PromptService.format_prompt(user_template, **format_params)
             
             # 添加反馈信息到提示词
             feedback_instruction = f"""
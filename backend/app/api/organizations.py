@@ -7,7 +7,7 @@ from pydantic import BaseModel, Field
 import json
 
 from app.database import get_db
-from app.utils.sse_response import SSEResponse, create_sse_response, WizardProgressTracker
+from app.utils.sse_response import SSEResponse, create_sse_response, WizardProgressTracker, batch_text_stream
 from app.models.relationship import Organization, OrganizationMember
 from app.models.character import Character
 from app.models.project import Project
@@ -429,10 +429,10 @@ async def generate_organization_stream(
             user_id = getattr(http_request.state, 'user_id', None)
             project = await verify_project_access(gen_request.project_id, user_id, db)
             
-            yield await tracker.start()
+            yield tracker.start()
             
             # 获取已存在的角色和组织列表
-            yield await tracker.loading("获取项目上下文...", 0.3)
+            yield tracker.loading("获取项目上下文...", 0.3)
             
             existing_chars_result = await db.execute(
                 select(Character)
@@ -479,8 +479,8 @@ async def generate_organization_stream(
 - 其他要求：{gen_request.requirements or '无'}
 """
             
-            yield await tracker.loading("项目上下文准备完成", 0.7)
-            yield await tracker.preparing("构建AI提示词...")
+            yield tracker.loading("项目上下文准备完成", 0.7)
+            yield tracker.preparing("构建AI提示词...")
             
             # 获取自定义提示词模板
             template = await PromptService.get_template("SINGLE_ORGANIZATION_GENERATION", user_id, db)
@@ -491,7 +491,7 @@ async def generate_organization_stream(
                 user_input=user_input
             )
             
-            yield await tracker.generating(0, max(3000, len(prompt) * 8), "调用AI服务生成组织...")
+            yield tracker.generating(0, max(3000, len(prompt) * 8), "调用AI服务生成组织...")
             logger.info(f"🎯 开始为项目 {gen_request.project_id} 生成组织（SSE流式）")
             
             try:
@@ -500,31 +500,32 @@ async def generate_organization_stream(
                 chunk_count = 0
                 estimated_total = max(3000, len(prompt) * 8)
                 
-                async for chunk in user_ai_service.generate_text_stream(prompt=prompt):
+                async for chunk in batch_text_stream(user_ai_service.generate_text_stream(prompt=prompt)):
+                    if chunk is None:
+                        # 上游空闲时发送心跳保持连接
+                        yield tracker.heartbeat()
+                        continue
+                    
                     chunk_count += 1
                     ai_content += chunk
                     
                     # 发送内容块
-                    yield await SSEResponse.send_chunk(chunk)
+                    yield SSEResponse.send_chunk(chunk)
                     
                     # 定期更新字数（避免过于频繁）
                     if chunk_count % 5 == 0:
-                        yield await tracker.generating(len(ai_content), estimated_total)
-                    
-                    # 心跳
-                    if chunk_count % 20 == 0:
-                        yield await tracker.heartbeat()
+                        yield tracker.generating(len(ai_content), estimated_total)
                         
             except Exception as ai_error:
                 logger.error(f"❌ AI服务调用异常：{str(ai_error)}")
-                yield await tracker.error(f"AI服务调用失败：{str(ai_error)}")
+                yield tracker.error(f"AI服务调用失败：{str(ai_error)}")
                 return
             
             if not ai_content or not ai_content.strip():
-                yield await tracker.error("AI服务返回空响应")
+                yield tracker.error("AI服务返回空响应")
                 return
             
-            yield await tracker.parsing("解析AI响应...", 0.5)
+            yield tracker.parsing("解析AI响应...", 0.5)
             
             # ✅ 使用统一的 JSON 清洗方法
             try:
@@ -534,10 +535,10 @@ async def generate_organization_stream(
             except json.JSONDecodeError as e:
                 logger.error(f"❌ 组织JSON解析失败: {e}")
                 logger.error(f"   原始响应预览: {ai_content[:200]}")
-                yield await tracker.error(f"AI返回的内容无法解析为JSON：{str(e)}")
+                yield tracker.error(f"AI返回的内容无法解析为JSON：{str(e)}")
                 return
             
-            yield await tracker.saving("创建组织记录...", 0.3)
+            yield tracker.saving("创建组织记录...", 0.3)
             
             # 创建角色记录（组织也是角色的一种）
             character = Character(
@@ -564,7 +565,7 @@ async def generate_organization_stream(
             
             logger.info(f"✅ 组织角色创建成功：{character.name} (ID: {character.id})")
             
-            yield await tracker.saving("创建组织详情...", 0.6)
+            yield tracker.saving("创建组织详情...", 0.6)
             
             # 自动创建Organization详情记录
             organization = Organization(
@@ -581,7 +582,7 @@ async def generate_organization_stream(
             
             logger.info(f"✅ 组织详情创建成功：{character.name} (Org ID: {organization.id})")
             
-            yield await tracker.saving("保存生成历史...", 0.9)
+            yield tracker.saving("保存生成历史...", 0.9)
             
             # 记录生成历史
             history = GenerationHistory(
@@ -597,10 +598,10 @@ async def generate_organization_stream(
             
             logger.info(f"🎉 成功生成组织: {character.name}")
             
-            yield await tracker.complete("组织生成完成！")
+            yield tracker.complete("组织生成完成！")
             
             # 发送结果数据
-            yield await tracker.result({
+            yield tracker.result({
                 "character": {
                     "id": character.id,
                     "name": character.name,
@@ -609,13 +610,13 @@ async def generate_organization_stream(
                 }
             })
             
-            yield await tracker.done()
+            yield tracker.done()
             
         except HTTPException as he:
             logger.error(f"HTTP异常: {he.detail}")
-            yield await tracker.error(he.detail, he.status_code)
+            yield tracker.error(he.detail, he.status_code)
         except Exception as e:
             logger.error(f"生成组织失败: {str(e)}")
-            yield await tracker.error(f"生成组织失败: {str(e)}")
+            yield tracker.error(f"生成组织失败: {str(e)}")
     
     return create_sse_response(generate())
@@ -39,7 +39,7 @@ from app.services.foreshadow_service import foreshadow_service
 from app.services.memory_service import memory_service
 from app.logger import get_logger
 from app.api.settings import get_user_ai_service
-from app.utils.sse_response import SSEResponse, create_sse_response, WizardProgressTracker
+from app.utils.sse_response import SSEResponse, create_sse_response, WizardProgressTracker, batch_text_stream
 
 router = APIRouter(prefix="/outlines", tags=["大纲管理"])
 logger = get_logger(__name__)
@@ -1519,7 +1519,7 @@ async def new_outline_generator(
     tracker = WizardProgressTracker("大纲")
     
     try:
-        yield await tracker.start()
+        yield tracker.start()
         
         project_id = data.get("project_id")
         # 确保chapter_count是整数（前端可能传字符串）
@@ -1527,16 +1527,16 @@ async def new_outline_generator(
         enable_mcp = data.get("enable_mcp", True)
         
         # 验证项目
-        yield await tracker.loading("加载项目信息...", 0.3)
+        yield tracker.loading("加载项目信息...", 0.3)
         result = await db.execute(
             select(Project).where(Project.id == project_id)
         )
         project = result.scalar_one_or_none()
         if not project:
-            yield await tracker.error("项目不存在", 404)
+            yield tracker.error("项目不存在", 404)
             return
         
-        yield await tracker.loading(f"准备生成{chapter_count}章大纲...", 0.6)
+        yield tracker.loading(f"准备生成{chapter_count}章大纲...", 0.6)
         
         # 获取角色信息
         characters_result = await db.execute(
@@ -1552,7 +1552,7 @@ async def new_outline_generator(
             user_ai_service.db_session = db
         
         # 使用提示词模板
-        yield await tracker.preparing("准备AI提示词...")
+        yield tracker.preparing("准备AI提示词...")
         template = await PromptService.get_template("OUTLINE_CREATE", user_id_for_mcp, db)
         prompt = PromptService.format_prompt(
             template,
@@ -1583,31 +1583,32 @@ async def new_outline_generator(
         accumulated_text = ""
         chunk_count = 0
         
-        yield await tracker.generating(current_chars=0, estimated_total=estimated_total)
+        yield tracker.generating(current_chars=0, estimated_total=estimated_total)
         
-        async for chunk in user_ai_service.generate_text_stream(
+        async for chunk in batch_text_stream(user_ai_service.generate_text_stream(
             prompt=prompt,
             provider=provider_param,
             model=model_param
-        ):
+        )):
+            if chunk is None:
+                # 上游空闲时发送心跳保持连接
+                yield tracker.heartbeat()
+                continue
+            
             chunk_count += 1
             accumulated_text += chunk
             
             # 发送内容块
-            yield await tracker.generating_chunk(chunk)
+            yield tracker.generating_chunk(chunk)
             
             # 定期更新进度
             if chunk_count % 10 == 0:
-                yield await tracker.generating(
+                yield tracker.generating(
                     current_chars=len(accumulated_text),
                     estimated_total=estimated_total
                 )
-            
-            # 每20个块发送心跳
-            if chunk_count % 20 == 0:
-                yield await tracker.heartbeat()
         
-        yield await tracker.parsing("解析大纲数据...")
+        yield tracker.parsing("解析大纲数据...")
         
         ai_content = accumulated_text
         ai_response = {"content": ai_content}
@@ -1628,12 +1629,12 @@ async def new_outline_generator(
                 if retry_count > max_retries:
                     # 超过最大重试次数，使用fallback数据
                     logger.error(f"❌ 大纲解析失败，已达最大重试次数({max_retries})，使用fallback数据")
-                    yield await tracker.warning("解析失败，使用备用数据")
+                    yield tracker.warning("解析失败，使用备用数据")
                     outline_data = _parse_ai_response(ai_content, raise_on_error=False)
                     break
                 
                 logger.warning(f"⚠️ JSON解析失败（第{retry_count}次），正在重试...")
-                yield await tracker.retry(retry_count, max_retries, "JSON解析失败")
+                yield tracker.retry(retry_count, max_retries, "JSON解析失败")
                 
                 # 重试时重置生成进度
                 tracker.reset_generating_progress()
@@ -1645,27 +1646,28 @@ async def new_outline_generator(
                 # 在prompt中添加格式强调
                 retry_prompt = prompt + "\n\n【重要提醒】请确保返回完整的JSON数组，不要截断。每个章节对象必须包含完整的title、summary等字段。"
                 
-                async for chunk in user_ai_service.generate_text_stream(
+                async for chunk in batch_text_stream(user_ai_service.generate_text_stream(
                     prompt=retry_prompt,
                     provider=provider_param,
                     model=model_param
-                ):
+                )):
+                    if chunk is None:
+                        # 上游空闲时发送心跳保持连接
+                        yield tracker.heartbeat()
+                        continue
+                    
                     chunk_count += 1
                     accumulated_text += chunk
                     
                     # 发送内容块
-                    yield await tracker.generating_chunk(chunk)
-                    
-                    # 每20个块发送心跳
-                    if chunk_count % 20 == 0:
-                        yield await tracker.heartbeat()
+                    yield tracker.generating_chunk(chunk)
                 
                 ai_content = accumulated_text
                 ai_response = {"content": ai_content}
                 logger.info(f"🔄 重试生成完成，累计{len(ai_content)}字符")
         
         # 全新生成模式：删除旧大纲和关联的所有章节
-        yield await tracker.saving("清理旧大纲、章节和伏笔...", 0.2)
+        yield tracker.saving("清理旧大纲、章节和伏笔...", 0.2)
         logger.info(f"全新生成：删除项目 {project_id} 的旧大纲和章节（outline_mode: {project.outline_mode}）")
         
         # 清理伏笔数据
@@ -1703,7 +1705,7 @@ async def new_outline_generator(
         logger.info(f"✅ 全新生成：删除了 {deleted_outlines_count} 个旧大纲")
         
         # 保存新大纲
-        yield await tracker.saving("保存大纲到数据库...", 0.6)
+        yield tracker.saving("保存大纲到数据库...", 0.6)
         outlines = await _save_outlines(
             project_id, outline_data, db, start_index=1
         )
@@ -1725,10 +1727,10 @@ async def new_outline_generator(
         
         logger.info(f"全新生成完成 - {len(outlines)} 章")
         
-        yield await tracker.complete()
+        yield tracker.complete()
         
         # 发送最终结果
-        yield await tracker.result({
+        yield tracker.result({
             "message": f"成功生成{len(outlines)}章大纲",
             "total_chapters": len(outlines),
             "outlines": [
@@ -1745,7 +1747,7 @@ async def new_outline_generator(
             ]
         })
         
-        yield await tracker.done()
+        yield tracker.done()
         
     except GeneratorExit:
         logger.warning("大纲生成器被提前关闭")
@@ -1757,7 +1759,7 @@ async def new_outline_generator(
         if not db_committed and db.in_transaction():
             await db.rollback()
             logger.info("大纲生成事务已回滚（异常）")
-        yield await tracker.error(f"生成失败: {str(e)}")
+        yield tracker.error(f"生成失败: {str(e)}")
 
 
 async def continue_outline_generator(
@@ -1773,24 +1775,24 @@ async def continue_outline_generator(
     
     try:
         # === 初始化阶段 ===
-        yield await tracker.start("开始续写大纲...")
+        yield tracker.start("开始续写大纲...")
         
         project_id = data.get("project_id")
         # 确保chapter_count是整数（前端可能传字符串）
         total_chapters_to_generate = int(data.get("chapter_count", 5))
         
         # 验证项目
-        yield await tracker.loading("加载项目信息...", 0.2)
+        yield tracker.loading("加载项目信息...", 0.2)
         result = await db.execute(
             select(Project).where(Project.id == project_id)
         )
         project = result.scalar_one_or_none()
         if not project:
-            yield await tracker.error("项目不存在", 404)
+            yield tracker.error("项目不存在", 404)
             return
         
         # 获取现有大纲
-        yield await tracker.loading("分析已有大纲...", 0.5)
+        yield tracker.loading("分析已有大纲...", 0.5)
         existing_result = await db.execute(
             select(Outline)
             .where(Outline.project_id == project_id)
@@ -1799,13 +1801,13 @@ async def continue_outline_generator(
         existing_outlines = existing_result.scalars().all()
         
         if not existing_outlines:
-            yield await tracker.error("续写模式需要已有大纲，当前项目没有大纲", 400)
+            yield tracker.error("续写模式需要已有大纲，当前项目没有大纲", 400)
             return
         
         current_chapter_count = len(existing_outlines)
         last_chapter_number = existing_outlines[-1].order_index
         
-        yield await tracker.loading(
+        yield tracker.loading(
             f"当前已有{str(current_chapter_count)}章，将续写{str(total_chapters_to_generate)}章",
             0.8
         )
@@ -1841,7 +1843,7 @@ async def continue_outline_generator(
             if confirmed_characters:
                 # 直接使用用户确认的角色列表创建角色
                 try:
-                    yield await tracker.preparing(
+                    yield tracker.preparing(
                         f"🎭 【确认模式】创建 {len(confirmed_characters)} 个用户确认的角色..."
                     )
                     
@@ -1864,13 +1866,13 @@ async def continue_outline_generator(
                             char_name = char_data.get("name") or char_data.get("character_name")
                             if char_name in existing_character_names:
                                 logger.warning(f"⚠️ 角色 '{char_name}' 已存在，跳过创建")
-                                yield await tracker.preparing(
+                                yield tracker.preparing(
                                     f"⏭️ [{idx+1}/{len(confirmed_characters)}] 角色 '{char_name}' 已存在，跳过"
                                 )
                                 continue
                             
                             # 生成角色详细信息
-                            yield await tracker.preparing(
+                            yield tracker.preparing(
                                 f"🤖 [{idx+1}/{len(confirmed_characters)}] AI生成角色详情：{char_name}..."
                             )
                             character_data = await auto_char_service._generate_character_details(
@@ -1883,7 +1885,7 @@ async def continue_outline_generator(
                             )
                             
                             # 创建角色记录
-                            yield await tracker.preparing(
+                            yield tracker.preparing(
                                 f"💾 [{idx+1}/{len(confirmed_characters)}] 保存角色：{char_name}..."
                             )
                             character = await auto_char_service._create_character_record(
@@ -1895,7 +1897,7 @@ async def continue_outline_generator(
                             # 建立关系
                             relationships_data = character_data.get("relationships") or character_data.get("relationships_array", [])
                             if relationships_data:
-                                yield await tracker.preparing(
+                                yield tracker.preparing(
                                     f"🔗 [{idx+1}/{len(confirmed_characters)}] 建立 {len(relationships_data)} 个关系：{char_name}..."
                                 )
                                 await auto_char_service._create_relationships(
@@ -1910,13 +1912,13 @@ async def continue_outline_generator(
                             existing_character_names.add(character.name)  # 更新已存在的角色名称集合
                             actually_created_count += 1
                             logger.info(f"✅ 创建确认的角色: {character.name}")
-                            yield await tracker.preparing(
+                            yield tracker.preparing(
                                 f"✅ [{idx+1}/{len(confirmed_characters)}] 角色创建成功：{character.name}"
                             )
                             
                         except Exception as e:
                             logger.error(f"创建确认的角色失败: {e}", exc_info=True)
-                            yield await tracker.warning(
+                            yield tracker.warning(
                                 f"[{idx+1}/{len(confirmed_characters)}] 角色创建失败：{char_name}"
                             )
                             continue
@@ -1924,19 +1926,19 @@ async def continue_outline_generator(
                     # 提交角色到数据库
                     if actually_created_count > 0:
                         await db.commit()
-                        yield await tracker.preparing(
+                        yield tracker.preparing(
                             f"✅ 【确认模式】实际创建了 {actually_created_count} 个新角色（跳过 {len(confirmed_characters) - actually_created_count} 个已存在）"
                         )
                         logger.info(f"✅ 【确认模式】实际创建了 {actually_created_count} 个新角色（跳过了 {len(confirmed_characters) - actually_created_count} 个已存在的角色）")
                     else:
-                        yield await tracker.preparing(
+                        yield tracker.preparing(
                             f"ℹ️ 【确认模式】所有角色均已存在，无需创建"
                         )
                         logger.info(f"ℹ️ 【确认模式】所有角色均已存在，无需创建")
                     
                 except Exception as e:
                     logger.error(f"⚠️ 【确认模式】创建确认角色失败: {e}", exc_info=True)
-                    yield await tracker.warning("角色创建失败，继续生成大纲")
+                    yield tracker.warning("角色创建失败，继续生成大纲")
             else:
                 # 根据 require_character_confirmation 决定处理方式
                 require_confirmation = data.get("require_character_confirmation", True)
@@ -1951,7 +1953,7 @@ async def continue_outline_generator(
                     
                     if require_confirmation:
                         # 🔮 预测模式：仅预测角色，不自动创建，需要用户确认
-                        yield await tracker.preparing("🔮 【预测模式】开始分析角色需求...")
+                        yield tracker.preparing("🔮 【预测模式】开始分析角色需求...")
                         logger.info(f"🔮 【预测模式】在生成大纲前预测是否需要新角色")
                         
                         # 进度消息不使用回调，因为在async generator中无法嵌套yield
@@ -1970,7 +1972,7 @@ async def continue_outline_generator(
                             preview_only=True  # ✅ 仅预测不创建
                         )
                         
-                        yield await tracker.preparing("✅ 【预测模式】角色需求分析完成")
+                        yield tracker.preparing("✅ 【预测模式】角色需求分析完成")
                         
                         # 检查是否需要新角色
                         if auto_result.get("needs_new_characters") and auto_result.get("predicted_characters"):
@@ -1980,7 +1982,7 @@ async def continue_outline_generator(
                             )
                             
                             # 🚨 使用专用事件类型通知前端需要角色确认
-                            yield await SSEResponse.send_event(
+                            yield SSEResponse.send_event(
                                 event="character_confirmation_required",
                                 data={
                                     "message": "续写需要引入新角色，请先确认角色信息",
@@ -1991,11 +1993,11 @@ async def continue_outline_generator(
                             )
                             return
                         else:
-                            yield await tracker.preparing("✅ 【预测模式】无需引入新角色，继续生成大纲")
+                            yield tracker.preparing("✅ 【预测模式】无需引入新角色，继续生成大纲")
                             logger.info(f"✅ 【预测模式】AI判断无需引入新角色")
                     else:
                         # 🚀 直接创建模式：预测后自动创建，无需用户确认
-                        yield await tracker.preparing("🚀 【直接创建模式】开始分析并创建角色...")
+                        yield tracker.preparing("🚀 【直接创建模式】开始分析并创建角色...")
                         logger.info(f"🚀 【直接创建模式】在生成大纲前预测并直接创建新角色")
                         
                         # 使用队列桥接回调和generator
@@ -2029,21 +2031,21 @@ async def continue_outline_generator(
                         while not char_task.done():
                             try:
                                 message = await asyncio.wait_for(progress_queue.get(), timeout=0.1)
-                                yield await tracker.preparing(message)
+                                yield tracker.preparing(message)
                             except asyncio.TimeoutError:
                                 pass
                         
                         # 获取结果
                         auto_result = await char_task
                         
-                        yield await tracker.preparing("✅ 【直接创建模式】角色分析和创建完成")
+                        yield tracker.preparing("✅ 【直接创建模式】角色分析和创建完成")
                         
                         # 如果创建了新角色，更新角色列表
                         if auto_result.get("new_characters"):
                             new_count = len(auto_result["new_characters"])
                             logger.info(f"✅ 【直接创建模式】自动创建了 {new_count} 个新角色")
                             
-                            yield await tracker.preparing(
+                            yield tracker.preparing(
                                 f"✅ 【直接创建模式】自动创建了 {new_count} 个新角色"
                             )
                             
@@ -2054,12 +2056,12 @@ async def continue_outline_generator(
                             characters.extend(auto_result["new_characters"])
                             characters_info = _build_characters_info(characters)
                         else:
-                            yield await tracker.preparing("✅ 【直接创建模式】无需引入新角色，继续生成大纲")
+                            yield tracker.preparing("✅ 【直接创建模式】无需引入新角色，继续生成大纲")
                             logger.info(f"✅ 【直接创建模式】AI判断无需引入新角色")
                         
                 except Exception as e:
                     logger.error(f"⚠️ 【方案A】预测性角色引入失败: {e}", exc_info=True)
-                    yield await tracker.warning("角色预测失败，继续生成大纲")
+                    yield tracker.warning("角色预测失败，继续生成大纲")
                     # 不阻断大纲生成流程
         
         # === 组织引入阶段 ===
@@ -2076,7 +2078,7 @@ async def continue_outline_generator(
             if confirmed_organizations:
                 # 直接使用用户确认的组织列表创建组织
                 try:
-                    yield await tracker.preparing(
+                    yield tracker.preparing(
                         f"🏛️ 【确认模式】创建 {len(confirmed_organizations)} 个用户确认的组织..."
                     )
                     
@@ -2094,7 +2096,7 @@ async def continue_outline_generator(
                             org_progress = 21 + int((idx / max(len(confirmed_organizations), 1)) * 8)
                             
                             # 生成组织详细信息
-                            yield await tracker.preparing(
+                            yield tracker.preparing(
                                 f"🤖 [{idx+1}/{len(confirmed_organizations)}] AI生成组织详情：{org_name}..."
                             )
                             organization_data = await auto_org_service._generate_organization_details(
@@ -2108,7 +2110,7 @@ async def continue_outline_generator(
                             )
                             
                             # 创建组织记录
-                            yield await tracker.preparing(
+                            yield tracker.preparing(
                                 f"💾 [{idx+1}/{len(confirmed_organizations)}] 保存组织：{org_name}..."
                             )
                             org_character, organization = await auto_org_service._create_organization_record(
@@ -2120,7 +2122,7 @@ async def continue_outline_generator(
                             # 建立成员关系
                             members_data = organization_data.get("initial_members", [])
                             if members_data:
-                                yield await tracker.preparing(
+                                yield tracker.preparing(
                                     f"🔗 [{idx+1}/{len(confirmed_organizations)}] 建立 {len(members_data)} 个成员关系：{org_name}..."
                                 )
                                 await auto_org_service._create_member_relationships(
@@ -2144,13 +2146,13 @@ async def continue_outline_generator(
                             })
                             created_org_count += 1
                             logger.info(f"✅ 创建确认的组织: {org_character.name}")
-                            yield await tracker.preparing(
+                            yield tracker.preparing(
                                 f"✅ [{idx+1}/{len(confirmed_organizations)}] 组织创建成功：{org_character.name}"
                             )
                             
                         except Exception as e:
                             logger.error(f"创建确认的组织失败: {e}", exc_info=True)
-                            yield await tracker.warning(
+                            yield tracker.warning(
                                 f"[{idx+1}/{len(confirmed_organizations)}] 组织创建失败：{org_name}"
                             )
                             continue
@@ -2158,14 +2160,14 @@ async def continue_outline_generator(
                     # 提交组织到数据库
                     await db.commit()
                     
-                    yield await tracker.preparing(
+                    yield tracker.preparing(
                         f"✅ 【确认模式】成功创建 {created_org_count} 个组织"
                     )
                     logger.info(f"✅ 【确认模式】成功创建 {created_org_count} 个用户确认的组织")
                     
                 except Exception as e:
                     logger.error(f"⚠️ 【确认模式】创建确认组织失败: {e}", exc_info=True)
-                    yield await tracker.warning("组织创建失败，继续生成大纲")
+                    yield tracker.warning("组织创建失败，继续生成大纲")
             else:
                 # 根据 require_organization_confirmation 决定处理方式
                 require_org_confirmation = data.get("require_organization_confirmation", True)
@@ -2180,7 +2182,7 @@ async def continue_outline_generator(
                     
                     if require_org_confirmation:
                         # 🔮 预测模式：仅预测组织，不自动创建，需要用户确认
-                        yield await tracker.preparing("🔮 【预测模式】开始分析组织需求...")
+                        yield tracker.preparing("🔮 【预测模式】开始分析组织需求...")
                         logger.info(f"🔮 【预测模式】在生成大纲前预测是否需要新组织")
                         
                         auto_result = await auto_org_service.analyze_and_create_organizations(
@@ -2199,7 +2201,7 @@ async def continue_outline_generator(
                             preview_only=True  # ✅ 仅预测不创建
                         )
                         
-                        yield await tracker.preparing("✅ 【预测模式】组织需求分析完成")
+                        yield tracker.preparing("✅ 【预测模式】组织需求分析完成")
                         
                         # 检查是否需要新组织
                         if auto_result.get("needs_new_organizations") and auto_result.get("predicted_organizations"):
@@ -2209,7 +2211,7 @@ async def continue_outline_generator(
                             )
                             
                             # 🚨 使用专用事件类型通知前端需要组织确认
-                            yield await SSEResponse.send_event(
+                            yield SSEResponse.send_event(
                                 event="organization_confirmation_required",
                                 data={
                                     "message": "续写需要引入新组织，请先确认组织信息",
@@ -2220,11 +2222,11 @@ async def continue_outline_generator(
                             )
                             return
                         else:
-                            yield await tracker.preparing("✅ 【预测模式】无需引入新组织，继续生成大纲")
+                            yield tracker.preparing("✅ 【预测模式】无需引入新组织，继续生成大纲")
                             logger.info(f"✅ 【预测模式】AI判断无需引入新组织")
                     else:
                         # 🚀 直接创建模式：预测后自动创建，无需用户确认
-                        yield await tracker.preparing("🚀 【直接创建模式】开始分析并创建组织...")
+                        yield tracker.preparing("🚀 【直接创建模式】开始分析并创建组织...")
                         logger.info(f"🚀 【直接创建模式】在生成大纲前预测并直接创建新组织")
                         
                         # 使用队列桥接回调和generator
@@ -2259,14 +2261,14 @@ async def continue_outline_generator(
                         while not org_task.done():
                             try:
                                 message = await asyncio.wait_for(org_progress_queue.get(), timeout=0.1)
-                                yield await tracker.preparing(message)
+                                yield tracker.preparing(message)
                             except asyncio.TimeoutError:
                                 pass
                         
                         # 获取结果
                         auto_result = await org_task
                         
-                        yield await tracker.preparing("✅ 【直接创建模式】组织分析和创建完成")
+                        yield tracker.preparing("✅ 【直接创建模式】组织分析和创建完成")
                         
                         # 如果创建了新组织，更新角色列表
                         if auto_result.get("new_organizations"):
@@ -2278,7 +2280,7 @@ async def continue_outline_generator(
                                     new_org_names.append(org_char.name)
                             logger.info(f"✅ 【直接创建模式】自动创建了 {new_count} 个新组织")
                             
-                            yield await tracker.preparing(
+                            yield tracker.preparing(
                                 f"✅ 【直接创建模式】成功创建 {new_count} 个新组织：{', '.join(new_org_names[:3])}{'...' if new_count > 3 else ''}"
                             )
                             
@@ -2292,12 +2294,12 @@ async def continue_outline_generator(
                                     characters.append(org_char)
                             characters_info = _build_characters_info(characters)
                         else:
-                            yield await tracker.preparing("✅ 【直接创建模式】无需引入新组织，继续生成大纲")
+                            yield tracker.preparing("✅ 【直接创建模式】无需引入新组织，继续生成大纲")
                             logger.info(f"✅ 【直接创建模式】AI判断无需引入新组织")
                         
                 except Exception as e:
                     logger.error(f"⚠️ 【组织引入】预测性组织引入失败: {e}", exc_info=True)
-                    yield await tracker.warning("组织预测失败，继续生成大纲")
+                    yield tracker.warning("组织预测失败，继续生成大纲")
                     # 不阻断大纲生成流程
         
         # === 批次生成阶段 ===
@@ -2315,7 +2317,7 @@ async def continue_outline_generator(
             # 重置生成进度以便于每批独立计算
             tracker.reset_generating_progress()
             
-            yield await tracker.generating(
+            yield tracker.generating(
                 current_chars=0,
                 estimated_total=estimated_chars_per_batch,
                 message=f"📝 第{str(batch_num + 1)}/{str(total_batches)}批: 生成第{str(current_start_chapter)}-{str(current_start_chapter + current_batch_size - 1)}章"
@@ -2355,7 +2357,7 @@ async def continue_outline_generator(
             # 🧠 构建记忆增强上下文
             memory_context = None
             try:
-                yield await tracker.generating(
+                yield tracker.generating(
                     current_chars=0,
                     estimated_total=estimated_chars_per_batch,
                     message="🧠 构建记忆上下文..."
@@ -2377,7 +2379,7 @@ async def continue_outline_generator(
                 user_ai_service.user_id = user_id
                 user_ai_service.db_session = db
             
-            yield await tracker.generating(
+            yield tracker.generating(
                 current_chars=0,
                 estimated_total=estimated_chars_per_batch,
                 message=f"🤖 调用AI生成第{str(batch_num + 1)}批..."
@@ -2420,30 +2422,31 @@ async def continue_outline_generator(
             accumulated_text = ""
             chunk_count = 0
             
-            async for chunk in user_ai_service.generate_text_stream(
+            async for chunk in batch_text_stream(user_ai_service.generate_text_stream(
                 prompt=prompt,
                 provider=provider_param,
                 model=model_param
-            ):
+            )):
+                if chunk is None:
+                    # 上游空闲时发送心跳保持连接
+                    yield tracker.heartbeat()
+                    continue
+                
                 chunk_count += 1
                 accumulated_text += chunk
                 
                 # 发送内容块
-                yield await tracker.generating_chunk(chunk)
+                yield tracker.generating_chunk(chunk)
                 
                 # 定期更新进度
                 if chunk_count % 10 == 0:
-                    yield await tracker.generating(
+                    yield tracker.generating(
                         current_chars=len(accumulated_text),
                         estimated_total=estimated_chars_per_batch,
                         message=f"📝 第{str(batch_num + 1)}/{str(total_batches)}批生成中"
                     )
-                
-                # 每20个块发送心跳
-                if chunk_count % 20 == 0:
-                    yield await tracker.heartbeat()
             
-            yield await tracker.parsing(f"✅ 第{str(batch_num + 1)}批AI生成完成，正在解析...")
+            yield tracker.parsing(f"✅ 第{str(batch_num + 1)}批AI生成完成，正在解析...")
             
             # 提取内容
             ai_content = accumulated_text
@@ -2465,12 +2468,12 @@ async def continue_outline_generator(
                     if retry_count > max_retries:
                         # 超过最大重试次数，使用fallback数据
                         logger.error(f"❌ 第{batch_num + 1}批解析失败，已达最大重试次数({max_retries})，使用fallback数据")
-                        yield await tracker.warning(f"第{str(batch_num + 1)}批解析失败，使用备用数据")
+                        yield tracker.warning(f"第{str(batch_num + 1)}批解析失败，使用备用数据")
                         outline_data = _parse_ai_response(ai_content, raise_on_error=False)
                         break
                     
                     logger.warning(f"⚠️ 第{batch_num + 1}批JSON解析失败（第{retry_count}次），正在重试...")
-                    yield await tracker.retry(retry_count, max_retries, f"第{str(batch_num + 1)}批解析失败")
+                    yield tracker.retry(retry_count, max_retries, f"第{str(batch_num + 1)}批解析失败")
                     
                     # 重试时重置生成进度
                     tracker.reset_generating_progress()
@@ -2482,20 +2485,21 @@ async def continue_outline_generator(
                     # 在prompt中添加格式强调
                     retry_prompt = prompt + "\n\n【重要提醒】请确保返回完整的JSON数组，不要截断。每个章节对象必须包含完整的title、summary等字段。"
                     
-                    async for chunk in user_ai_service.generate_text_stream(
+                    async for chunk in batch_text_stream(user_ai_service.generate_text_stream(
                         prompt=retry_prompt,
                         provider=provider_param,
                         model=model_param
-                    ):
+                    )):
+                        if chunk is None:
+                            # 上游空闲时发送心跳保持连接
+                            yield tracker.heartbeat()
+                            continue
+                        
                         chunk_count += 1
                         accumulated_text += chunk
                         
                         # 发送内容块
-                        yield await tracker.generating_chunk(chunk)
-                        
-                        # 每20个块发送心跳
-                        if chunk_count % 20 == 0:
-                            yield await tracker.heartbeat()
+                        yield tracker.generating_chunk(chunk)
                     
                     ai_content = accumulated_text
                     ai_response = {"content": ai_content}
@@ -2524,7 +2528,7 @@ async def continue_outline_generator(
             all_new_outlines.extend(batch_outlines)
             current_start_chapter += current_batch_size
             
-            yield await tracker.saving(
+            yield tracker.saving(
                 f"💾 第{str(batch_num + 1)}批保存成功！本批生成{str(len(batch_outlines))}章，累计新增{str(len(all_new_outlines))}章",
                 (batch_num + 1) / total_batches
             )
@@ -2541,10 +2545,10 @@ async def continue_outline_generator(
         )
         all_outlines = final_result.scalars().all()
         
-        yield await tracker.complete()
+        yield tracker.complete()
         
         # 发送最终结果
-        yield await tracker.result({
+        yield tracker.result({
             "message": f"续写完成！共{str(total_batches)}批，新增{str(len(all_new_outlines))}章，总计{str(len(all_outlines))}章",
             "total_batches": total_batches,
             "new_chapters": len(all_new_outlines),
@@ -2563,7 +2567,7 @@ async def continue_outline_generator(
             ]
         })
         
-        yield await tracker.done()
+        yield tracker.done()
         
     except GeneratorExit:
         logger.warning("大纲续写生成器被提前关闭")
@@ -2575,7 +2579,7 @@ async def continue_outline_generator(
         if not db_committed and db.in_transaction():
             await db.rollback()
             logger.info("大纲续写事务已回滚（异常）")
-        yield await tracker.error(f"续写失败: {str(e)}")
+        yield tracker.error(f"续写失败: {str(e)}")
 
 
 @router.post("/generate-stream", summary="AI生成/续写大纲(SSE流式)")
@@ -2659,7 +2663,7 @@ async def expand_outline_generator(
     tracker = WizardProgressTracker("大纲展开")
     
     try:
-        yield await tracker.start()
+        yield tracker.start()
         
         target_chapter_count = int(data.get("target_chapter_count", 3))
         expansion_strategy = data.get("expansion_strategy", "balanced")
@@ -2668,27 +2672,27 @@ async def expand_outline_generator(
         batch_size = int(data.get("batch_size", 5))  # 支持自定义批次大小
         
         # 获取大纲
-        yield await tracker.loading("加载大纲信息...", 0.3)
+        yield tracker.loading("加载大纲信息...", 0.3)
         result = await db.execute(
             select(Outline).where(Outline.id == outline_id)
         )
         outline = result.scalar_one_or_none()
         
         if not outline:
-            yield await tracker.error("大纲不存在", 404)
+            yield tracker.error("大纲不存在", 404)
             return
         
         # 获取项目信息
-        yield await tracker.loading("加载项目信息...", 0.7)
+        yield tracker.loading("加载项目信息...", 0.7)
         project_result = await db.execute(
             select(Project).where(Project.id == outline.project_id)
         )
         project = project_result.scalar_one_or_none()
         if not project:
-            yield await tracker.error("项目不存在", 404)
+            yield tracker.error("项目不存在", 404)
             return
         
-        yield await tracker.preparing(
+        yield tracker.preparing(
             f"准备展开《{outline.title}》为 {target_chapter_count} 章..."
         )
         
@@ -2697,13 +2701,13 @@ async def expand_outline_generator(
         
         # 分析大纲并生成章节规划（支持分批）
         if target_chapter_count > batch_size:
-            yield await tracker.generating(
+            yield tracker.generating(
                 current_chars=0,
                 estimated_total=target_chapter_count * 500,
                 message=f"🤖 AI分批生成章节规划（每批{batch_size}章）..."
             )
         else:
-            yield await tracker.generating(
+            yield tracker.generating(
                 current_chars=0,
                 estimated_total=target_chapter_count * 500,
                 message="🤖 AI分析大纲，生成章节规划..."
@@ -2723,17 +2727,17 @@ async def expand_outline_generator(
         )
         
         if not chapter_plans:
-            yield await tracker.error("AI分析失败，未能生成章节规划", 500)
+            yield tracker.error("AI分析失败，未能生成章节规划", 500)
             return
         
-        yield await tracker.parsing(
+        yield tracker.parsing(
             f"✅ 规划生成完成！共 {len(chapter_plans)} 个章节"
         )
         
         # 根据配置决定是否创建章节记录
         created_chapters = None
         if auto_create_chapters:
-            yield await tracker.saving("💾 创建章节记录...", 0.3)
+            yield tracker.saving("💾 创建章节记录...", 0.3)
             
             created_chapters = await expansion_service.create_chapters_from_plans(
                 outline_id=outline_id,
@@ -2750,12 +2754,12 @@ async def expand_outline_generator(
             for chapter in created_chapters:
                 await db.refresh(chapter)
             
-            yield await tracker.saving(
+            yield tracker.saving(
                 f"✅ 成功创建 {len(created_chapters)} 个章节记录",
                 0.8
             )
         
-        yield await tracker.complete()
+        yield tracker.complete()
         
         # 构建响应数据
         result_data = {
@@ -2779,8 +2783,8 @@ async def expand_outline_generator(
             ] if created_chapters else None
         }
         
-        yield await tracker.result(result_data)
-        yield await tracker.done()
+        yield tracker.result(result_data)
+        yield tracker.done()
         
     except GeneratorExit:
         logger.warning("大纲展开生成器被提前关闭")
@@ -2792,7 +2796,7 @@ async def expand_outline_generator(
         if not db_committed and db.in_transaction():
             await db.rollback()
             logger.info("大纲展开事务已回滚（异常）")
-        yield await tracker.error(f"展开失败: {str(e)}")
+        yield tracker.error(f"展开失败: {str(e)}")
 
 
 @router.post("/{outline_id}/create-single-chapter", summary="一对一创建章节(传统模式)")
@@ -3031,7 +3035,7 @@ async def batch_expand_outlines_generator(
     tracker = WizardProgressTracker("批量大纲展开")
     
     try:
-        yield await tracker.start()
+        yield tracker.start()
         
         project_id = data.get("project_id")
         chapters_per_outline = int(data.get("chapters_per_outline", 3))
@@ -3040,17 +3044,17 @@ async def batch_expand_outlines_generator(
         outline_ids = data.get("outline_ids")
         
         # 获取项目信息
-        yield await tracker.loading("加载项目信息...", 0.5)
+        yield tracker.loading("加载项目信息...", 0.5)
         project_result = await db.execute(
             select(Project).where(Project.id == project_id)
         )
         project = project_result.scalar_one_or_none()
         if not project:
-            yield await tracker.error("项目不存在", 404)
+            yield tracker.error("项目不存在", 404)
             return
         
         # 获取要展开的大纲列表
-        yield await tracker.loading("获取大纲列表...", 0.8)
+        yield tracker.loading("获取大纲列表...", 0.8)
         if outline_ids:
             outlines_result = await db.execute(
                 select(Outline)
@@ -3070,11 +3074,11 @@ async def batch_expand_outlines_generator(
         outlines = outlines_result.scalars().all()
         
         if not outlines:
-            yield await tracker.error("没有找到要展开的大纲", 404)
+            yield tracker.error("没有找到要展开的大纲", 404)
             return
         
         total_outlines = len(outlines)
-        yield await tracker.preparing(
+        yield tracker.preparing(
             f"共找到 {total_outlines} 个大纲，开始批量展开..."
         )
         
@@ -3090,7 +3094,7 @@ async def batch_expand_outlines_generator(
                 # 计算当前子进度 (0.0-1.0)，用于generating阶段
                 sub_progress = idx / max(total_outlines, 1)
                 
-                yield await tracker.generating(
+                yield tracker.generating(
                     current_chars=idx * chapters_per_outline * 500,
                     estimated_total=total_outlines * chapters_per_outline * 500,
                     message=f"📝 处理第 {idx + 1}/{total_outlines} 个大纲: {outline.title}"
@@ -3111,7 +3115,7 @@ async def batch_expand_outlines_generator(
                         "outline_title": outline.title,
                         "reason": "已展开"
                     })
-                    yield await tracker.generating(
+                    yield tracker.generating(
                         current_chars=(idx + 1) * chapters_per_outline * 500,
                         estimated_total=total_outlines * chapters_per_outline * 500,
                         message=f"⏭️ {outline.title} 已展开过，跳过"
@@ -3119,7 +3123,7 @@ async def batch_expand_outlines_generator(
                     continue
                 
                 # 分析大纲生成章节规划
-                yield await tracker.generating(
+                yield tracker.generating(
                     current_chars=idx * chapters_per_outline * 500,
                     estimated_total=total_outlines * chapters_per_outline * 500,
                     message=f"🤖 AI分析大纲: {outline.title}"
@@ -3136,7 +3140,7 @@ async def batch_expand_outlines_generator(
                     model=data.get("model")
                 )
                 
-                yield await tracker.generating(
+                yield tracker.generating(
                     current_chars=(idx + 0.5) * chapters_per_outline * 500,
                     estimated_total=total_outlines * chapters_per_outline * 500,
                     message=f"✅ {outline.title} 规划生成完成 ({len(chapter_plans)} 章)"
@@ -3166,7 +3170,7 @@ async def batch_expand_outlines_generator(
                     ]
                     total_chapters_created += len(chapters)
                     
-                    yield await tracker.generating(
+                    yield tracker.generating(
                         current_chars=(idx + 1) * chapters_per_outline * 500,
                         estimated_total=total_outlines * chapters_per_outline * 500,
                         message=f"💾 {outline.title} 章节创建完成 ({len(chapters)} 章)"
@@ -3186,7 +3190,7 @@ async def batch_expand_outlines_generator(
                 
             except Exception as e:
                 logger.error(f"展开大纲 {outline.id} 失败: {str(e)}", exc_info=True)
-                yield await tracker.warning(
+                yield tracker.warning(
                     f"❌ {outline.title} 展开失败: {str(e)}"
                 )
                 expansion_results.append({
@@ -3200,13 +3204,13 @@ async def batch_expand_outlines_generator(
                     "error": str(e)
                 })
         
-        yield await tracker.parsing("整理结果数据...")
+        yield tracker.parsing("整理结果数据...")
         
         db_committed = True
         
         logger.info(f"批量展开完成: {len(expansion_results)} 个大纲，跳过 {len(skipped_outlines)} 个，共生成 {total_chapters_created} 个章节")
         
-        yield await tracker.complete()
+        yield tracker.complete()
         
         # 发送最终结果
         result_data = {
@@ -3229,8 +3233,8 @@ async def batch_expand_outlines_generator(
             ]
         }
         
-        yield await tracker.result(result_data)
-        yield await tracker.done()
+        yield tracker.result(result_data)
+        yield tracker.done()
         
     except GeneratorExit:
         logger.warning("批量展开生成器被提前关闭")
@@ -3242,7 +3246,7 @@ async def batch_expand_outlines_generator(
         if not db_committed and db.in_transaction():
             await db.rollback()
             logger.info("批量展开事务已回滚（异常）")
-        yield await SSEResponse.send_error(f"批量展开失败: {str(e)}")
+        yield SSEResponse.send_error(f"批量展开失败: {str(e)}")
 
 
 @router.post("/batch-expand-stream", summary="批量展开大纲为多章(SSE流式)")
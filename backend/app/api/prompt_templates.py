@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, delete
 from typing import List, Optional
 from datetime import datetime
+from functools import lru_cache
 import json
 import hashlib
 
@@ -29,6 +30,18 @@ def calculate_content_hash(content: str) -> str:
     """计算模板内容的SHA256哈希值"""
     return hashlib.sha256(content.strip().encode('utf-8')).hexdigest()[:16]
 
+
+@lru_cache(maxsize=None)
+def get_system_parameters_json(template_key: str) -> str:
+    """获取系统模板参数定义的JSON（系统模板在进程内不变，按键缓存序列化结果）"""
+    return json.dumps(PromptService.get_system_template_info(template_key)['parameters'])
+
+
+@lru_cache(maxsize=None)
+def get_system_content_hash(template_key: str) -> str:
+    """获取系统模板内容的哈希值（按键缓存）"""
+    return calculate_content_hash(PromptService.get_system_template_info(template_key)['content'])
+
 router = APIRouter(prefix="/prompt-templates", tags=["提示词模板管理"])
 
 
@@ -122,7 +135,7 @@ async def get_templates_by_category(
                 template_content=sys_template['content'],
                 description=sys_template['description'],
                 category=sys_template['category'],
-                parameters=json.dumps(sys_template['parameters']),
+                parameters=get_system_parameters_json(sys_template['template_key']),
                 is_active=True,
                 is_system_default=True,
                 created_at=current_time,
@@ -240,6 +253,7 @@ async def create_or_update_template(
     
     await db.commit()
     await db.refresh(template)
+    PromptService.invalidate_template_cache(user_id, data.template_key)
     
     return template
 
@@ -277,6 +291,7 @@ async def update_template(
     
     await db.commit()
     await db.refresh(template)
+    PromptService.invalidate_template_cache(user_id, template_key)
     logger.info(f"用户 {user_id} 更新模板 {template_key}")
     
     return template
@@ -309,6 +324,7 @@ async def delete_template(
     
     await db.delete(template)
     await db.commit()
+    PromptService.invalidate_template_cache(user_id, template_key)
     logger.info(f"用户 {user_id} 删除模板 {template_key}")
     
     return {"message": "模板已删除", "template_key": template_key}
@@ -345,6 +361,7 @@ async def reset_to_default(
     if template:
         await db.delete(template)
         await db.commit()
+        PromptService.invalidate_template_cache(user_id, template_key)
         logger.info(f"用户 {user_id} 删除自定义模板 {template_key}，恢复为系统默认")
         return {"message": "已重置为系统默认", "template_key": template_key}
     else:
@@ -388,11 +405,8 @@ async def export_templates(
     # 添加用户自定义的模板
     for user_template in user_templates:
         # 获取对应的系统模板用于计算哈希
-        system_template = next(
-            (t for t in system_templates if t["template_key"] == user_template.template_key),
-            None
-        )
-        system_hash = calculate_content_hash(system_template["content"]) if system_template else None
+        system_template = PromptService.get_system_template_info(user_template.template_key)
+        system_hash = get_system_content_hash(system_template["template_key"]) if system_template else None
         
         export_items.append(PromptTemplateExportItem(
             template_key=user_template.template_key,
@@ -416,10 +430,10 @@ async def export_templates(
                 template_content=sys_template['content'],
                 description=sys_template['description'],
                 category=sys_template['category'],
-                parameters=json.dumps(sys_template['parameters']),
+                parameters=get_system_parameters_json(sys_template['template_key']),
                 is_active=True,
                 is_customized=False,
-                system_content_hash=calculate_content_hash(sys_template['content'])
+                system_content_hash=get_system_content_hash(sys_template['template_key'])
             ))
             system_default_count += 1
     
@@ -467,19 +481,22 @@ async def import_templates(
     converted_to_custom = 0  # 从系统默认转为自定义
     converted_templates = []  # 被转换的模板列表
     
+    # 一次查询取回当前用户已有的、本次导入涉及的自定义模板
+    result = await db.execute(
+        select(PromptTemplate).where(
+            PromptTemplate.user_id == user_id,
+            PromptTemplate.template_key.in_({t.template_key for t in data.templates})
+        )
+    )
+    existing_templates = {t.template_key: t for t in result.scalars().all()}
+    
     for template_data in data.templates:
         template_key = template_data.template_key
         is_customized = template_data.is_customized
         imported_content = template_data.template_content.strip()
         
         # 查找当前用户是否已有该模板的自定义版本
-        result = await db.execute(
-            select(PromptTemplate).where(
-                PromptTemplate.user_id == user_id,
-                PromptTemplate.template_key == template_key
-            )
-        )
-        existing = result.scalar_one_or_none()
+        existing = existing_templates.get(template_key)
         
         # 获取系统默认模板
         system_template = system_template_dict.get(template_key)
@@ -494,6 +511,7 @@ async def import_templates(
                     # 内容一致，删除自定义记录（如果有）
                     if existing:
                         await db.delete(existing)
+                        existing_templates.pop(template_key, None)
                         logger.info(f"用户 {user_id} 的模板 {template_key} 恢复为系统默认（删除自定义）")
                     kept_system_default += 1
                 else:
@@ -519,6 +537,7 @@ async def import_templates(
                             is_active=template_data.is_active
                         )
                         db.add(new_template)
+                        existing_templates[template_key] = new_template
                     
                     converted_to_custom += 1
                     converted_templates.append({
@@ -548,6 +567,7 @@ async def import_templates(
                         is_active=template_data.is_active
                     )
                     db.add(new_template)
+                    existing_templates[template_key] = new_template
                 created_or_updated += 1
         else:
             # 导入的标记为用户自定义，直接创建/更新
@@ -570,9 +590,11 @@ async def import_templates(
                     is_active=template_data.is_active
                 )
                 db.add(new_template)
+                existing_templates[template_key] = new_template
             created_or_updated += 1
     
     await db.commit()
+    PromptService.invalidate_template_cache(user_id)
     
     statistics = {
         "total": len(data.templates),
@@ -605,8 +627,8 @@ async def preview_template(
         raise HTTPException(status_code=401, detail="未登录")
     
     try:
-        # 使用PromptService的format_prompt方法
-        rendered = PromptService.format_prompt(
+        # 预览时未提供的参数保留原占位符，便于边编辑边查看
+        rendered = PromptService.format_prompt_safe(
             data.template_content,
             **data.parameters
         )
@@ -616,12 +638,6 @@ async def preview_template(
             "rendered_content": rendered,
             "parameters_used": list(data.parameters.keys())
         }
-    except KeyError as e:
-        return {
-            "success": False,
-            "error": f"缺少必需的参数: {str(e)}",
-            "rendered_content": None
-        }
     except Exception as e:
         return {
             "success": False,
@@ -656,7 +656,8 @@ async def test_api_connection(data: ApiTestRequest):
             model=llm_model,
             temperature=temperature,
             max_tokens=max_tokens,
-            auto_mcp=False  # 测试时不加载MCP工具
+            auto_mcp=False,  # 测试时不加载MCP工具
+            use_cache=False  # 测试必须真实请求API
         )
         
         end_time = time.time()
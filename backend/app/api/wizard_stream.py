@@ -19,7 +19,7 @@ from app.services.ai_service import AIService
 from app.services.prompt_service import prompt_service, PromptService
 from app.services.plot_expansion_service import PlotExpansionService
 from app.logger import get_logger
-from app.utils.sse_response import SSEResponse, create_sse_response, WizardProgressTracker
+from app.utils.sse_response import SSEResponse, create_sse_response, WizardProgressTracker, batch_text_stream
 from app.api.settings import get_user_ai_service
 
 router = APIRouter(prefix="/wizard-stream", tags=["项目创建向导(流式)"])
@@ -39,7 +39,7 @@ async def world_building_generator(
     
     try:
         # 发送开始消息
-        yield await tracker.start()
+        yield tracker.start()
         
         # 提取参数
         title = data.get("title")
@@ -57,11 +57,11 @@ async def world_building_generator(
         user_id = data.get("user_id")  # 从中间件注入
         
         if not title or not description or not theme or not genre:
-            yield await tracker.error("title、description、theme 和 genre 是必需的参数", 400)
+            yield tracker.error("title、description、theme 和 genre 是必需的参数", 400)
             return
         
         # 获取基础提示词（支持自定义）
-        yield await tracker.preparing("准备AI提示词...")
+        yield tracker.preparing("准备AI提示词...")
         template = await PromptService.get_template("WORLD_BUILDING", user_id, db)
         base_prompt = PromptService.format_prompt(
             template,
@@ -89,7 +89,7 @@ async def world_building_generator(
                 if world_retry_count > 0:
                     tracker.reset_generating_progress()
                 
-                yield await tracker.generating(
+                yield tracker.generating(
                     current_chars=0,
                     estimated_total=estimated_total,
                     retry_count=world_retry_count,
@@ -100,38 +100,39 @@ async def world_building_generator(
                 accumulated_text = ""
                 chunk_count = 0
                 
-                async for chunk in user_ai_service.generate_text_stream(
+                async for chunk in batch_text_stream(user_ai_service.generate_text_stream(
                     prompt=base_prompt,
                     provider=provider,
                     model=model,
                     tool_choice="required",
-                ):
+                )):
+                    if chunk is None:
+                        # 上游空闲时发送心跳保持连接
+                        yield tracker.heartbeat()
+                        continue
+                    
                     chunk_count += 1
                     accumulated_text += chunk
                     
                     # 发送内容块
-                    yield await tracker.generating_chunk(chunk)
+                    yield tracker.generating_chunk(chunk)
                     
                     # 定期更新进度
                     current_len = len(accumulated_text)
                     if chunk_count % 10 == 0:
-                        yield await tracker.generating(
+                        yield tracker.generating(
                             current_chars=current_len,
                             estimated_total=estimated_total,
                             retry_count=world_retry_count,
                             max_retries=MAX_WORLD_RETRIES
                         )
-                    
-                    # 每20个块发送心跳
-                    if chunk_count % 20 == 0:
-                        yield await tracker.heartbeat()
                 
                 # 检查是否返回空响应
                 if not accumulated_text or not accumulated_text.strip():
                     logger.warning(f"⚠️ AI返回空世界观（尝试{world_retry_count+1}/{MAX_WORLD_RETRIES}）")
                     world_retry_count += 1
                     if world_retry_count < MAX_WORLD_RETRIES:
-                        yield await tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "AI返回为空")
+                        yield tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "AI返回为空")
                         continue
                     else:
                         # 达到最大重试次数，使用默认值
@@ -146,7 +147,7 @@ async def world_building_generator(
                         break
                 
                 # 解析结果 - 使用统一的JSON清洗方法
-                yield await tracker.parsing("解析世界观数据...")
+                yield tracker.parsing("解析世界观数据...")
                 
                 try:
                     logger.info(f"🔍 开始清洗JSON，原始长度: {len(accumulated_text)}")
@@ -167,7 +168,7 @@ async def world_building_generator(
                     logger.error(f"   原始内容预览: {accumulated_text[:200]}")
                     world_retry_count += 1
                     if world_retry_count < MAX_WORLD_RETRIES:
-                        yield await tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "JSON解析失败")
+                        yield tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "JSON解析失败")
                         continue
                     else:
                         # 达到最大重试次数，使用默认值
@@ -183,7 +184,7 @@ async def world_building_generator(
                 logger.error(f"❌ 世界构建生成异常（尝试{world_retry_count+1}/{MAX_WORLD_RETRIES}）: {type(e).__name__}: {e}")
                 world_retry_count += 1
                 if world_retry_count < MAX_WORLD_RETRIES:
-                    yield await tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "生成异常")
+                    yield tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "生成异常")
                     continue
                 else:
                     # 最后一次重试仍失败，抛出异常
@@ -191,11 +192,11 @@ async def world_building_generator(
                     raise
         
         # 保存到数据库
-        yield await tracker.saving("保存世界观到数据库...")
+        yield tracker.saving("保存世界观到数据库...")
         
         # 确保user_id存在
         if not user_id:
-            yield await SSEResponse.send_error("用户ID缺失，无法创建项目", 401)
+            yield SSEResponse.send_error("用户ID缺失，无法创建项目", 401)
             return
         
         project = Project(
@@ -252,10 +253,10 @@ async def world_building_generator(
         # ===== 世界观生成完成 =====
         db_committed = True
         
-        yield await tracker.complete()
+        yield tracker.complete()
         
         # 发送世界观结果
-        yield await tracker.result({
+        yield tracker.result({
             "project_id": project.id,
             "time_period": world_data.get("time_period"),
             "location": world_data.get("location"),
@@ -264,7 +265,7 @@ async def world_building_generator(
         })
         
         # 发送世界观完成信号
-        yield await tracker.done()
+        yield tracker.done()
         
         logger.info(f"✅ 世界观生成完成，项目ID: {project.id}")
         
@@ -280,7 +281,7 @@ async def world_building_generator(
         if not db_committed and db.in_transaction():
             await db.rollback()
             logger.info("世界构建事务已回滚（异常）")
-        yield await tracker.error(f"生成失败: {str(e)}")
+        yield tracker.error(f"生成失败: {str(e)}")
 
 
 @router.post("/world-building", summary="流式生成世界构建")
@@ -312,7 +313,7 @@ async def career_system_generator(
     tracker = WizardProgressTracker("职业体系")
     
     try:
-        yield await tracker.start()
+        yield tracker.start()
         
         # 提取参数
         project_id = data.get("project_id")
@@ -321,17 +322,17 @@ async def career_system_generator(
         user_id = data.get("user_id")
         
         if not project_id:
-            yield await tracker.error("project_id 是必需的参数", 400)
+            yield tracker.error("project_id 是必需的参数", 400)
             return
         
         # 获取项目信息
-        yield await tracker.loading("加载项目信息...")
+        yield tracker.loading("加载项目信息...")
         result = await db.execute(
             select(Project).where(Project.id == project_id)
         )
         project = result.scalar_one_or_none()
         if not project:
-            yield await tracker.error("项目不存在", 404)
+            yield tracker.error("项目不存在", 404)
             return
         
         # 设置用户信息以启用MCP
@@ -348,7 +349,7 @@ async def career_system_generator(
         }
         
         # 获取职业生成提示词模板（支持用户自定义）
-        yield await tracker.preparing("准备AI提示词...")
+        yield tracker.preparing("准备AI提示词...")
         template = await PromptService.get_template("CAREER_SYSTEM_GENERATION", user_id, db)
         career_prompt = PromptService.format_prompt(
             template,
@@ -372,7 +373,7 @@ async def career_system_generator(
                 if career_retry_count > 0:
                     tracker.reset_generating_progress()
                 
-                yield await tracker.generating(
+                yield tracker.generating(
                     current_chars=0,
                     estimated_total=estimated_total,
                     retry_count=career_retry_count,
@@ -383,42 +384,43 @@ async def career_system_generator(
                 career_response = ""
                 chunk_count = 0
                 
-                async for chunk in user_ai_service.generate_text_stream(
+                async for chunk in batch_text_stream(user_ai_service.generate_text_stream(
                     prompt=career_prompt,
                     provider=provider,
                     model=model,
-                ):
+                )):
+                    if chunk is None:
+                        # 上游空闲时发送心跳保持连接
+                        yield tracker.heartbeat()
+                        continue
+                    
                     chunk_count += 1
                     career_response += chunk
                     
                     # 发送内容块
-                    yield await tracker.generating_chunk(chunk)
+                    yield tracker.generating_chunk(chunk)
                     
                     # 定期更新进度
                     current_len = len(career_response)
                     if chunk_count % 10 == 0:
-                        yield await tracker.generating(
+                        yield tracker.generating(
                             current_chars=current_len,
                             estimated_total=estimated_total,
                             retry_count=career_retry_count,
                             max_retries=MAX_CAREER_RETRIES
                         )
-                    
-                    # 每20个块发送心跳
-                    if chunk_count % 20 == 0:
-                        yield await tracker.heartbeat()
                 
                 if not career_response or not career_response.strip():
                     logger.warning(f"⚠️ AI返回空职业体系（尝试{career_retry_count+1}/{MAX_CAREER_RETRIES}）")
                     career_retry_count += 1
                     if career_retry_count < MAX_CAREER_RETRIES:
-                        yield await tracker.retry(career_retry_count, MAX_CAREER_RETRIES, "AI返回为空")
+                        yield tracker.retry(career_retry_count, MAX_CAREER_RETRIES, "AI返回为空")
                         continue
                     else:
-                        yield await tracker.error("职业体系生成失败（AI多次返回为空）")
+                        yield tracker.error("职业体系生成失败（AI多次返回为空）")
                         return
                 
-                yield await tracker.parsing("解析职业体系数据...")
+                yield tracker.parsing("解析职业体系数据...")
                 
                 # 清洗并解析JSON
                 try:
@@ -426,7 +428,7 @@ async def career_system_generator(
                     career_data = json.loads(cleaned_response)
                     logger.info(f"✅ 职业体系JSON解析成功（尝试{career_retry_count+1}/{MAX_CAREER_RETRIES}）")
                     
-                    yield await tracker.saving("保存职业数据...")
+                    yield tracker.saving("保存职业数据...")
                     
                     # 保存主职业
                     main_careers_created = []
@@ -499,10 +501,10 @@ async def career_system_generator(
                     career_generation_success = True
                     logger.info(f"🎉 职业体系生成完成：主职业{len(main_careers_created)}个，副职业{len(sub_careers_created)}个")
                     
-                    yield await tracker.complete()
+                    yield tracker.complete()
                     
                     # 发送结果
-                    yield await tracker.result({
+                    yield tracker.result({
                         "project_id": project.id,
                         "main_careers_count": len(main_careers_created),
                         "sub_careers_count": len(sub_careers_created),
@@ -510,35 +512,35 @@ async def career_system_generator(
                         "sub_careers": sub_careers_created
                     })
                     
-                    yield await tracker.done()
+                    yield tracker.done()
                     
                 except json.JSONDecodeError as e:
                     logger.error(f"❌ 职业体系JSON解析失败（尝试{career_retry_count+1}/{MAX_CAREER_RETRIES}）: {e}")
                     career_retry_count += 1
                     if career_retry_count < MAX_CAREER_RETRIES:
-                        yield await tracker.retry(career_retry_count, MAX_CAREER_RETRIES, "JSON解析失败")
+                        yield tracker.retry(career_retry_count, MAX_CAREER_RETRIES, "JSON解析失败")
                         continue
                     else:
-                        yield await tracker.error("职业体系解析失败（已达最大重试次数）")
+                        yield tracker.error("职业体系解析失败（已达最大重试次数）")
                         return
                 except Exception as e:
                     logger.error(f"❌ 职业体系保存失败（尝试{career_retry_count+1}/{MAX_CAREER_RETRIES}）: {e}")
                     career_retry_count += 1
                     if career_retry_count < MAX_CAREER_RETRIES:
-                        yield await tracker.retry(career_retry_count, MAX_CAREER_RETRIES, "保存失败")
+                        yield tracker.retry(career_retry_count, MAX_CAREER_RETRIES, "保存失败")
                         continue
                     else:
-                        yield await tracker.error("职业体系保存失败（已达最大重试次数）")
+                        yield tracker.error("职业体系保存失败（已达最大重试次数）")
                         return
             
             except Exception as e:
                 logger.error(f"❌ 职业体系生成异常（尝试{career_retry_count+1}/{MAX_CAREER_RETRIES}）: {e}")
                 career_retry_count += 1
                 if career_retry_count < MAX_CAREER_RETRIES:
-                    yield await tracker.retry(career_retry_count, MAX_CAREER_RETRIES, "生成异常")
+                    yield tracker.retry(career_retry_count, MAX_CAREER_RETRIES, "生成异常")
                     continue
                 else:
-                    yield await tracker.error(f"职业体系生成失败: {str(e)}")
+                    yield tracker.error(f"职业体系生成失败: {str(e)}")
                     return
         
     except GeneratorExit:
@@ -551,7 +553,7 @@ async def career_system_generator(
         if not db_committed and db.in_transaction():
             await db.rollback()
             logger.info("职业体系事务已回滚（异常）")
-        yield await tracker.error(f"生成失败: {str(e)}")
+        yield tracker.error(f"生成失败: {str(e)}")
 
 
 @router.post("/career-system", summary="流式生成职业体系")
@@ -583,7 +585,7 @@ async def characters_generator(
     tracker = WizardProgressTracker("角色")
     
     try:
-        yield await tracker.start()
+        yield tracker.start()
         
         project_id = data.get("project_id")
         count = data.get("count", 5)
@@ -597,13 +599,13 @@ async def characters_generator(
         user_id = data.get("user_id")  # 从中间件注入
         
         # 验证项目
-        yield await tracker.loading("验证项目...", 0.3)
+        yield tracker.loading("验证项目...", 0.3)
         result = await db.execute(
             select(Project).where(Project.id == project_id)
         )
         project = result.scalar_one_or_none()
         if not project:
-            yield await tracker.error("项目不存在", 404)
+            yield tracker.error("项目不存在", 404)
             return
         
         project.wizard_step = 2
@@ -621,7 +623,7 @@ async def characters_generator(
             user_ai_service.db_session = db
         
         # 获取项目的职业列表，用于角色职业分配
-        yield await tracker.loading("加载职业体系...", 0.8)
+        yield tracker.loading("加载职业体系...", 0.8)
         career_result = await db.execute(
             select(Career).where(Career.project_id == project_id).order_by(Career.type, Career.id)
         )
@@ -683,7 +685,7 @@ async def characters_generator(
                     if retry_count > 0:
                         tracker.reset_generating_progress()
                     
-                    yield await tracker.generating(
+                    yield tracker.generating(
                         current_chars=0,
                         estimated_total=BATCH_SIZE * 800,
                         message=f"生成第{batch_idx+1}/{total_batches}批角色 ({current_batch_size}个)",
@@ -735,32 +737,33 @@ async def characters_generator(
                     
                     estimated_total = BATCH_SIZE * 800
                     
-                    async for chunk in user_ai_service.generate_text_stream(
+                    async for chunk in batch_text_stream(user_ai_service.generate_text_stream(
                         prompt=prompt,
                         provider=provider,
                         model=model,
                         tool_choice="required",
-                    ):
+                    )):
+                        if chunk is None:
+                            # 上游空闲时发送心跳保持连接
+                            yield tracker.heartbeat()
+                            continue
+                        
                         chunk_count += 1
                         accumulated_text += chunk
                         
                         # 发送内容块
-                        yield await tracker.generating_chunk(chunk)
+                        yield tracker.generating_chunk(chunk)
                         
                         # 定期更新进度
                         current_len = len(accumulated_text)
                         if chunk_count % 10 == 0:
-                            yield await tracker.generating(
+                            yield tracker.generating(
                                 current_chars=current_len,
                                 estimated_total=estimated_total,
                                 message=f"生成第{batch_idx+1}/{total_batches}批角色中",
                                 retry_count=retry_count,
                                 max_retries=MAX_RETRIES
                             )
-                        
-                        # 每20个块发送心跳
-                        if chunk_count % 20 == 0:
-                            yield await tracker.heartbeat()
                     
                     # 解析批次结果 - 使用统一的JSON清洗方法
                     cleaned_text = user_ai_service._clean_json_response(accumulated_text)
@@ -776,11 +779,11 @@ async def characters_generator(
                         # 如果还有重试机会，继续重试
                         if retry_count < MAX_RETRIES - 1:
                             retry_count += 1
-                            yield await tracker.retry(retry_count, MAX_RETRIES, error_msg)
+                            yield tracker.retry(retry_count, MAX_RETRIES, error_msg)
                             continue
                         else:
                             # 最后一次重试仍失败，直接返回错误
-                            yield await tracker.error(error_msg)
+                            yield tracker.error(error_msg)
                             return
                     
                     all_characters.extend(characters_data)
@@ -792,13 +795,13 @@ async def characters_generator(
                     batch_error_message = f"JSON解析失败: {str(e)}"
                     retry_count += 1
                     if retry_count < MAX_RETRIES:
-                        yield await tracker.retry(retry_count, MAX_RETRIES, "JSON解析失败")
+                        yield tracker.retry(retry_count, MAX_RETRIES, "JSON解析失败")
                 except Exception as e:
                     logger.error(f"批次{batch_idx+1}生成异常(尝试{retry_count+1}/{MAX_RETRIES}): {e}")
                     batch_error_message = f"生成异常: {str(e)}"
                     retry_count += 1
                     if retry_count < MAX_RETRIES:
-                        yield await tracker.retry(retry_count, MAX_RETRIES, "生成异常")
+                        yield tracker.retry(retry_count, MAX_RETRIES, "生成异常")
             
             # 检查批次是否成功
             if not batch_success:
@@ -806,11 +809,11 @@ async def characters_generator(
                 if batch_error_message:
                     error_msg += f": {batch_error_message}"
                 logger.error(error_msg)
-                yield await tracker.error(error_msg)
+                yield tracker.error(error_msg)
                 return
         
         # 保存到数据库 - 分阶段处理以保证一致性
-        yield await tracker.parsing("验证角色数据...")
+        yield tracker.parsing("验证角色数据...")
         
         # 预处理：构建本批次所有实体的名称集合
         valid_entity_names = set()
@@ -854,9 +857,9 @@ async def characters_generator(
         
         if cleaned_count > 0:
             logger.info(f"✨ 清理了{cleaned_count}个AI幻觉引用")
-            yield await tracker.parsing(f"已清理{cleaned_count}个无效引用", 0.7)
+            yield tracker.parsing(f"已清理{cleaned_count}个无效引用", 0.7)
         
-        yield await tracker.saving("保存角色到数据库...")
+        yield tracker.saving("保存角色到数据库...")
         
         # 第一阶段：创建所有Character记录
         created_characters = []
@@ -907,7 +910,7 @@ async def characters_generator(
         
         # 第二阶段：为角色分配职业并创建CharacterCareer关联
         if main_careers or sub_careers:
-            yield await tracker.saving("分配角色职业...", 0.3)
+            yield tracker.saving("分配角色职业...", 0.3)
             careers_assigned = 0
             
             # 构建职业名称到对象的映射
@@ -991,7 +994,7 @@ async def characters_generator(
             
             await db.flush()
             logger.info(f"💼 职业分配完成：共分配{careers_assigned}个职业")
-            yield await tracker.saving(f"已分配{careers_assigned}个职业", 0.4)
+            yield tracker.saving(f"已分配{careers_assigned}个职业", 0.4)
         
         # 刷新并建立名称映射
         for character, _ in created_characters:
@@ -1000,7 +1003,7 @@ async def characters_generator(
             logger.info(f"向导创建角色：{character.name} (ID: {character.id}, 是否组织: {character.is_organization})")
         
         # 第三阶段：为is_organization=True的角色创建Organization记录
-        yield await tracker.saving("创建组织记录...", 0.5)
+        yield tracker.saving("创建组织记录...", 0.5)
         organization_name_to_obj = {}  # 组织名称到Organization对象的映射
         
         for character, char_data in created_characters:
@@ -1037,7 +1040,7 @@ async def characters_generator(
             await db.refresh(character)
         
         # 第四阶段：创建角色间的关系
-        yield await tracker.saving("创建角色关系...", 0.7)
+        yield tracker.saving("创建角色关系...", 0.7)
         relationships_created = 0
         
         for character, char_data in created_characters:
@@ -1105,7 +1108,7 @@ async def characters_generator(
                         continue
             
         # 第五阶段：创建组织成员关系
-        yield await tracker.saving("创建组织成员关系...", 0.9)
+        yield tracker.saving("创建组织成员关系...", 0.9)
         members_created = 0
         
         for character, char_data in created_characters:
@@ -1181,10 +1184,10 @@ async def characters_generator(
         # 重新提取character对象
         created_characters = [char for char, _ in created_characters]
         
-        yield await tracker.complete()
+        yield tracker.complete()
         
         # 发送结果
-        yield await tracker.result({
+        yield tracker.result({
             "message": f"成功生成{len(created_characters)}个角色/组织（分{total_batches}批完成）",
             "count": len(created_characters),
             "batches": total_batches,
@@ -1211,7 +1214,7 @@ async def characters_generator(
             ]
         })
         
-        yield await tracker.done()
+        yield tracker.done()
         
     except GeneratorExit:
         logger.warning("角色生成器被提前关闭")
@@ -1223,7 +1226,7 @@ async def characters_generator(
         if not db_committed and db.in_transaction():
             await db.rollback()
             logger.info("角色生成事务已回滚（异常）")
-        yield await tracker.error(f"生成失败: {str(e)}")
+        yield tracker.error(f"生成失败: {str(e)}")
 
 
 @router.post("/characters", summary="流式批量生成角色")
@@ -1255,7 +1258,7 @@ async def outline_generator(
     tracker = WizardProgressTracker("大纲")
     
     try:
-        yield await tracker.start()
+        yield tracker.start()
         
         project_id = data.get("project_id")
         # 向导固定生成3个大纲节点（不展开）
@@ -1269,17 +1272,17 @@ async def outline_generator(
         user_id = data.get("user_id")  # 从中间件注入
         
         # 获取项目信息
-        yield await tracker.loading("加载项目信息...", 0.3)
+        yield tracker.loading("加载项目信息...", 0.3)
         result = await db.execute(
             select(Project).where(Project.id == project_id)
         )
         project = result.scalar_one_or_none()
         if not project:
-            yield await tracker.error("项目不存在", 404)
+            yield tracker.error("项目不存在", 404)
             return
         
         # 获取角色信息
-        yield await tracker.loading("加载角色信息...", 0.8)
+        yield tracker.loading("加载角色信息...", 0.8)
         result = await db.execute(
             select(Character).where(Character.project_id == project_id)
         )
@@ -1291,7 +1294,7 @@ async def outline_generator(
         ])
         
         # 准备提示词
-        yield await tracker.preparing(f"准备生成{outline_count}个大纲节点...")
+        yield tracker.preparing(f"准备生成{outline_count}个大纲节点...")
         
         outline_requirements = f"{requirements}\n\n【重要说明】这是小说的开局部分，请生成{outline_count}个大纲节点，重点关注：\n"
         outline_requirements += "1. 引入主要角色和世界观设定\n"
@@ -1324,33 +1327,34 @@ async def outline_generator(
         accumulated_text = ""
         chunk_count = 0
         
-        yield await tracker.generating(current_chars=0, estimated_total=estimated_total)
+        yield tracker.generating(current_chars=0, estimated_total=estimated_total)
         
-        async for chunk in user_ai_service.generate_text_stream(
+        async for chunk in batch_text_stream(user_ai_service.generate_text_stream(
             prompt=outline_prompt,
             provider=provider,
             model=model,
-        ):
+        )):
+            if chunk is None:
+                # 上游空闲时发送心跳保持连接
+                yield tracker.heartbeat()
+                continue
+            
             chunk_count += 1
             accumulated_text += chunk
             
             # 发送内容块
-            yield await tracker.generating_chunk(chunk)
+            yield tracker.generating_chunk(chunk)
             
             # 定期更新进度
             current_len = len(accumulated_text)
             if chunk_count % 10 == 0:
-                yield await tracker.generating(
+                yield tracker.generating(
                     current_chars=current_len,
                     estimated_total=estimated_total
                 )
-            
-            # 每20个块发送心跳
-            if chunk_count % 20 == 0:
-                yield await tracker.heartbeat()
         
         # 解析大纲结果 - 使用统一的JSON清洗方法
-        yield await tracker.parsing("解析大纲数据...")
+        yield tracker.parsing("解析大纲数据...")
         
         try:
             cleaned_text = user_ai_service._clean_json_response(accumulated_text)
@@ -1359,11 +1363,11 @@ async def outline_generator(
                 outline_data = [outline_data]
         except json.JSONDecodeError as e:
             logger.error(f"大纲JSON解析失败: {e}")
-            yield await tracker.error("大纲生成失败，请重试")
+            yield tracker.error("大纲生成失败，请重试")
             return
         
         # 保存大纲到数据库
-        yield await tracker.saving("保存大纲到数据库...")
+        yield tracker.saving("保存大纲到数据库...")
         created_outlines = []
         for index, outline_item in enumerate(outline_data[:outline_count], 1):
             outline = Outline(
@@ -1386,7 +1390,7 @@ async def outline_generator(
         created_chapters = []
         if project.outline_mode == 'one-to-one':
             # 一对一模式：自动为每个大纲创建对应的章节
-            yield await tracker.saving("一对一模式：自动创建章节...", 0.7)
+            yield tracker.saving("一对一模式：自动创建章节...", 0.7)
             
             for outline in created_outlines:
                 chapter = Chapter(
@@ -1405,10 +1409,10 @@ async def outline_generator(
                 await db.refresh(chapter)
             
             logger.info(f"✅ 一对一模式：自动创建了{len(created_chapters)}个章节")
-            yield await tracker.saving(f"已自动创建{len(created_chapters)}个章节", 0.9)
+            yield tracker.saving(f"已自动创建{len(created_chapters)}个章节", 0.9)
         else:
             # 一对多模式：跳过自动创建，用户可手动展开
-            yield await tracker.saving("细化模式：跳过自动创建章节", 0.9)
+            yield tracker.saving("细化模式：跳过自动创建章节", 0.9)
             logger.info(f"📝 细化模式：跳过章节创建，用户可在大纲页面手动展开")
         
         # 更新项目信息
@@ -1436,10 +1440,10 @@ async def outline_generator(
             result_message = f"成功生成{len(created_outlines)}个大纲节点（细化模式，可在大纲页面手动展开）"
             result_note = "可在大纲页面展开为多个章节"
         
-        yield await tracker.complete()
+        yield tracker.complete()
         
         # 发送结果
-        yield await tracker.result({
+        yield tracker.result({
             "message": result_message,
             "outline_count": len(created_outlines),
             "chapter_count": len(created_chapters),
@@ -1463,7 +1467,7 @@ async def outline_generator(
             ] if created_chapters else []
         })
         
-        yield await tracker.done()
+        yield tracker.done()
         
     except GeneratorExit:
         logger.warning("大纲生成器被提前关闭")
@@ -1475,7 +1479,7 @@ async def outline_generator(
         if not db_committed and db.in_transaction():
             await db.rollback()
             logger.info("大纲生成事务已回滚（异常）")
-        yield await tracker.error(f"生成失败: {str(e)}")
+        yield tracker.error(f"生成失败: {str(e)}")
 
 @router.post("/outline", summary="流式生成完整大纲")
 async def generate_outline_stream(
@@ -1501,16 +1505,16 @@ async def world_building_regenerate_generator(
     tracker = WizardProgressTracker("世界观")
     
     try:
-        yield await tracker.start("开始重新生成世界观...")
+        yield tracker.start("开始重新生成世界观...")
         
         # 获取项目信息
-        yield await tracker.loading("加载项目信息...")
+        yield tracker.loading("加载项目信息...")
         result = await db.execute(
             select(Project).where(Project.id == project_id)
         )
         project = result.scalar_one_or_none()
         if not project:
-            yield await tracker.error("项目不存在", 404)
+            yield tracker.error("项目不存在", 404)
             return
         
         # 提取参数
@@ -1520,7 +1524,7 @@ async def world_building_regenerate_generator(
         user_id = data.get("user_id")
         
         # 获取基础提示词（支持自定义）
-        yield await tracker.preparing("准备AI提示词...")
+        yield tracker.preparing("准备AI提示词...")
         template = await PromptService.get_template("WORLD_BUILDING", user_id, db)
         base_prompt = PromptService.format_prompt(
             template,
@@ -1548,7 +1552,7 @@ async def world_building_regenerate_generator(
                 if world_retry_count > 0:
                     tracker.reset_generating_progress()
                 
-                yield await tracker.generating(
+                yield tracker.generating(
                     current_chars=0,
                     estimated_total=estimated_total,
                     message="重新生成世界观",
@@ -1560,37 +1564,39 @@ async def world_building_regenerate_generator(
                 accumulated_text = ""
                 chunk_count = 0
                 
-                async for chunk in user_ai_service.generate_text_stream(
+                async for chunk in batch_text_stream(user_ai_service.generate_text_stream(
                     prompt=base_prompt,
                     provider=provider,
                     model=model,
                     tool_choice="required",
-                ):
+                )):
+                    if chunk is None:
+                        # 上游空闲时发送心跳保持连接
+                        yield tracker.heartbeat()
+                        continue
+                    
                     chunk_count += 1
                     accumulated_text += chunk
                     
-                    yield await tracker.generating_chunk(chunk)
+                    yield tracker.generating_chunk(chunk)
                     
                     # 定期更新进度
                     current_len = len(accumulated_text)
                     if chunk_count % 10 == 0:
-                        yield await tracker.generating(
+                        yield tracker.generating(
                             current_chars=current_len,
                             estimated_total=estimated_total,
                             message="重新生成世界观",
                             retry_count=world_retry_count,
                             max_retries=MAX_WORLD_RETRIES
                         )
-                    
-                    if chunk_count % 20 == 0:
-                        yield await tracker.heartbeat()
                 
                 # 检查是否返回空响应
                 if not accumulated_text or not accumulated_text.strip():
                     logger.warning(f"⚠️ AI返回空世界观（尝试{world_retry_count+1}/{MAX_WORLD_RETRIES}）")
                     world_retry_count += 1
                     if world_retry_count < MAX_WORLD_RETRIES:
-                        yield await tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "AI返回为空")
+                        yield tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "AI返回为空")
                         continue
                     else:
                         # 达到最大重试次数，使用默认值
@@ -1605,7 +1611,7 @@ async def world_building_regenerate_generator(
                         break
                 
                 # 解析结果 - 使用统一的JSON清洗方法
-                yield await tracker.parsing("解析AI返回结果...")
+                yield tracker.parsing("解析AI返回结果...")
                 
                 try:
                     logger.info(f"🔍 开始清洗JSON，原始长度: {len(accumulated_text)}")
@@ -1622,7 +1628,7 @@ async def world_building_regenerate_generator(
                     logger.error(f"   原始内容预览: {accumulated_text[:200]}")
                     world_retry_count += 1
                     if world_retry_count < MAX_WORLD_RETRIES:
-                        yield await tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "JSON解析失败")
+                        yield tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "JSON解析失败")
                         continue
                     else:
                         # 达到最大重试次数，使用默认值
@@ -1638,7 +1644,7 @@ async def world_building_regenerate_generator(
                 logger.error(f"❌ 世界观重新生成异常（尝试{world_retry_count+1}/{MAX_WORLD_RETRIES}）: {type(e).__name__}: {e}")
                 world_retry_count += 1
                 if world_retry_count < MAX_WORLD_RETRIES:
-                    yield await tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "生成异常")
+                    yield tracker.retry(world_retry_count, MAX_WORLD_RETRIES, "生成异常")
                     continue
                 else:
                     # 最后一次重试仍失败，抛出异常
@@ -1646,19 +1652,19 @@ async def world_building_regenerate_generator(
                     raise
         
         # 不保存到数据库，仅返回生成结果供用户预览
-        yield await tracker.saving("生成完成，等待用户确认...", 0.5)
+        yield tracker.saving("生成完成，等待用户确认...", 0.5)
         
-        yield await tracker.complete()
+        yield tracker.complete()
         
         # 发送最终结果（不包含project_id，表示未保存）
-        yield await tracker.result({
+        yield tracker.result({
             "time_period": world_data.get("time_period"),
             "location": world_data.get("location"),
             "atmosphere": world_data.get("atmosphere"),
             "rules": world_data.get("rules")
         })
         
-        yield await tracker.done()
+        yield tracker.done()
         
     except GeneratorExit:
         logger.warning("世界观重新生成器被提前关闭")
@@ -1670,7 +1676,7 @@ async def world_building_regenerate_generator(
         if not db_committed and db.in_transaction():
             await db.rollback()
             logger.info("世界观重新生成事务已回滚（异常）")
-        yield await tracker.error(f"生成失败: {str(e)}")
+        yield tracker.error(f"生成失败: {str(e)}")
 
 
 @router.post("/world-building/{project_id}/regenerate", summary="流式重新生成世界观")
@@ -111,6 +111,7 @@ class Settings(BaseSettings):
     WORKSHOP_MODE: str = "client"  # client: 本地部署实例, server: 云端中央服务器
     WORKSHOP_CLOUD_URL: str = "https://mumuverse.space:1566"  # 云端服务地址
     WORKSHOP_API_TIMEOUT: int = 30  # 云端API请求超时时间（秒）
+    WORKSHOP_CA_BUNDLE: Optional[str] = None  # 校验云端服务TLS证书使用的CA证书路径，未设置时使用系统默认CA
     
     class Config:
         env_file = ".env"
@@ -41,6 +41,10 @@ async def lifespan(app: FastAPI):
     from app.services.ai_service import cleanup_http_clients
     await cleanup_http_clients()
     
+    # 关闭云端工坊客户端
+    from app.services.workshop_client import workshop_client
+    await workshop_client.aclose()
+    
     # 关闭数据库连接
     await close_db()
     
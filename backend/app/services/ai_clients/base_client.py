@@ -1,6 +1,7 @@
 """AI 客户端基类"""
 import asyncio
 import hashlib
+import json
 from abc import ABC, abstractmethod
 from typing import Any, AsyncGenerator, Dict, Optional
 
@@ -85,7 +86,9 @@ class BaseAIClient(ABC):
     ) -> Any:
         """带重试的 HTTP 请求"""
         url = f"{self.base_url}{endpoint}"
-        headers = self._build_headers()
+        headers = {**self._build_headers(), "Content-Type": "application/json"}
+        # 请求体只编码一次为UTF-8字节，重试时直接复用，避免每次尝试重新序列化整段提示词
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
         retry_cfg = self.config.retry
         rate_cfg = self.config.rate_limit
 
@@ -105,9 +108,9 @@ class BaseAIClient(ABC):
                         await asyncio.sleep(delay)
 
                     if stream:
-                        return self.http_client.stream(method, url, headers=headers, json=payload)
+                        return self.http_client.stream(method, url, headers=headers, content=body)
 
-                    response = await self.http_client.request(method, url, headers=headers, json=payload)
+                    response = await self.http_client.request(method, url, headers=headers, content=body)
                     response.raise_for_status()
                     return response.json()
 
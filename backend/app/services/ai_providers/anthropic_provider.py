@@ -7,6 +7,10 @@ from .base_provider import BaseAIProvider
 
 logger = get_logger(__name__)
 
+# 稳定前缀短于此长度（字符）时不标记缓存断点：低于 Anthropic 的最小可缓存长度时
+# 缓存不会生效，标记只会多付缓存写入费用
+_MIN_CACHE_PREFIX_CHARS = 2048
+
 
 class AnthropicProvider(BaseAIProvider):
     """Anthropic 提供商"""
@@ -14,6 +18,30 @@ class AnthropicProvider(BaseAIProvider):
     def __init__(self, client: AnthropicClient):
         self.client = client
 
+    @staticmethod
+    def _build_user_content(prompt: str, cache_prefix: Optional[str]):
+        """
+        构建用户消息内容，在调用方指定的稳定前缀之后放置缓存断点
+        
+        Args:
+            prompt: 完整提示词
+            cache_prefix: prompt 的稳定前缀（可选）
+        
+        Returns:
+            未指定或前缀不可用时返回原始字符串，否则返回带 cache_control 的内容块列表
+        """
+        if (
+            not cache_prefix
+            or len(cache_prefix) < _MIN_CACHE_PREFIX_CHARS
+            or len(cache_prefix) >= len(prompt)
+            or not prompt.startswith(cache_prefix)
+        ):
+            return prompt
+        return [
+            {"type": "text", "text": cache_prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": prompt[len(cache_prefix):]},
+        ]
+
     async def generate(
         self,
         prompt: str,
@@ -45,11 +73,12 @@ class AnthropicProvider(BaseAIProvider):
         tools: Optional[List[Dict]] = None,
         tool_choice: Optional[str] = None,
         user_id: Optional[str] = None,
+        cache_prefix: Optional[str] = None,
     ) -> AsyncGenerator[str, None]:
         # 如果有工具，使用真正的流式工具调用
         if tools:
             logger.debug(f"🔧 AnthropicProvider: 有 {len(tools)} 个工具，使用流式处理")
-            messages = [{"role": "user", "content": prompt}]
+            messages = [{"role": "user", "content": self._build_user_content(prompt, cache_prefix)}]
             actual_tool_choice = tool_choice if tool_choice else "auto"
             
             tool_calls_buffer = []
@@ -98,7 +127,7 @@ class AnthropicProvider(BaseAIProvider):
             return
         
         # 无工具时普通流式生成
-        messages = [{"role": "user", "content": prompt}]
+        messages = [{"role": "user", "content": self._build_user_content(prompt, cache_prefix)}]
         async for chunk in self.client.chat_completion_stream(
             messages=messages,
             model=model,
@@ -31,6 +31,11 @@ class BaseAIProvider(ABC):
         tools: Optional[List[Dict]] = None,
         tool_choice: Optional[str] = None,
         user_id: Optional[str] = None,
+        cache_prefix: Optional[str] = None,
     ) -> AsyncGenerator[str, None]:
-        """流式生成"""
+        """
+        流式生成
+        
+        cache_prefix 为 prompt 中可缓存的稳定前缀，仅需要显式标记缓存断点的提供商使用
+        """
         pass
\ No newline at end of file
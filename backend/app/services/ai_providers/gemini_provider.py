@@ -43,6 +43,7 @@ class GeminiProvider(BaseAIProvider):
         tools: Optional[List[Dict]] = None,
         tool_choice: Optional[str] = None,
         user_id: Optional[str] = None,
+        cache_prefix: Optional[str] = None,
     ) -> AsyncGenerator[str, None]:
         # 如果有工具，使用真正的流式工具调用
         if tools:
@@ -48,6 +48,7 @@ class OpenAIProvider(BaseAIProvider):
         tools: Optional[List[Dict]] = None,
         tool_choice: Optional[str] = None,
         user_id: Optional[str] = None,
+        cache_prefix: Optional[str] = None,
     ) -> AsyncGenerator[str, None]:
         messages = []
         if system_prompt:
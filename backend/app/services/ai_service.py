@@ -5,7 +5,10 @@
 - 如果有启用的MCP插件且有可用工具，自动发送tools
 - 通过 auto_mcp 参数控制是否启用自动工具加载
 """
+from dataclasses import dataclass
 from typing import Optional, AsyncGenerator, List, Dict, Any, Union
+import hashlib
+import time
 
 from app.config import settings as app_settings
 from app.logger import get_logger
@@ -26,6 +29,39 @@ cleanup_http_clients = cleanup_all_clients
 logger = get_logger(__name__)
 
 
+# 响应缓存：调用方显式开启时，仅缓存低温度（近似确定性）、不带工具的非流式请求
+_RESPONSE_CACHE_TTL = 3600  # 秒
+_RESPONSE_CACHE_MAX_ENTRIES = 256
+_RESPONSE_CACHE_MAX_TEMPERATURE = 0.2
+
+
+@dataclass
+class _ResponseCacheEntry:
+    """AI响应缓存条目"""
+    response: Dict[str, Any]
+    expire_time: float
+
+
+# 缓存键(sha256) -> 缓存条目
+_response_cache: Dict[str, _ResponseCacheEntry] = {}
+
+
+def _response_cache_key(*parts: Any) -> str:
+    """由账户范围、提供商、模型、参数与完整提示词生成缓存键"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def clear_response_cache():
+    """清空AI响应缓存（如修改提示词模板或切换模型后需要重新生成时调用）"""
+    count = len(_response_cache)
+    _response_cache.clear()
+    logger.info(f"🧹 清理AI响应缓存 ({count}个)")
+
+
 class AIService:
     """
     AI服务统一接口
@@ -79,6 +115,7 @@ class AIService:
         enable_mcp: bool = True,
     ):
         self.api_provider = api_provider or app_settings.default_ai_provider
+        self.api_base_url = api_base_url
         self.default_model = default_model or app_settings.default_model
         self.default_temperature = default_temperature or app_settings.default_temperature
         self.default_max_tokens = default_max_tokens or app_settings.default_max_tokens
@@ -92,6 +129,9 @@ class AIService:
         self._cached_tools: Optional[List[Dict]] = None
         self._tools_loaded = False
         
+        # 响应缓存按用户和API Key隔离（只保存摘要），不同账户之间不共享缓存条目
+        self._cache_scope = _response_cache_key(user_id, api_key)
+        
         self._openai_provider: Optional[OpenAIProvider] = None
         self._anthropic_provider: Optional[AnthropicProvider] = None
         self._gemini_provider: Optional[GeminiProvider] = None
@@ -329,6 +369,7 @@ class AIService:
         auto_mcp: bool = True,
         handle_tool_calls: bool = True,
         mcp_max_rounds: Optional[int] = None,
+        use_cache: bool = False,
     ) -> Dict[str, Any]:
         """
         生成文本（自动支持MCP工具）
@@ -345,6 +386,8 @@ class AIService:
             auto_mcp: 是否自动加载MCP工具（默认True）
             handle_tool_calls: 是否自动处理工具调用（默认True）
             mcp_max_rounds: 最大工具调用轮数（None使用默认值3）
+            use_cache: 是否使用响应缓存（默认关闭，由调用方显式开启；仅对低温度、无工具的请求生效）。
+                用户触发的重新生成、润色等需要新结果的调用不应开启
             
         Returns:
             包含生成内容的字典
@@ -358,16 +401,50 @@ class AIService:
             tools = await self._prepare_mcp_tools(auto_mcp=auto_mcp)
         
         prov = self._get_provider(provider)
+        effective_model = model or self.default_model
+        effective_temperature = temperature or self.default_temperature
+        effective_max_tokens = max_tokens or self.default_max_tokens
+        effective_system_prompt = system_prompt or self.default_system_prompt
+        
+        # 低温度且不带工具的请求结果近似确定，相同输入直接复用缓存的响应
+        cache_key = None
+        if use_cache and not tools and effective_temperature <= _RESPONSE_CACHE_MAX_TEMPERATURE:
+            cache_key = _response_cache_key(
+                self._cache_scope,
+                provider or self.api_provider,
+                self.api_base_url,
+                effective_model,
+                effective_temperature,
+                effective_max_tokens,
+                effective_system_prompt,
+                prompt,
+            )
+            cache_entry = _response_cache.get(cache_key)
+            if cache_entry is not None:
+                if time.monotonic() < cache_entry.expire_time:
+                    logger.debug(f"🎯 AI响应缓存命中: model={effective_model}")
+                    return dict(cache_entry.response)
+                del _response_cache[cache_key]
+        
         response = await prov.generate(
             prompt=prompt,
-            model=model or self.default_model,
-            temperature=temperature or self.default_temperature,
-            max_tokens=max_tokens or self.default_max_tokens,
-            system_prompt=system_prompt or self.default_system_prompt,
+            model=effective_model,
+            temperature=effective_temperature,
+            max_tokens=effective_max_tokens,
+            system_prompt=effective_system_prompt,
             tools=tools,
             tool_choice=tool_choice,
         )
         
+        if cache_key is not None and not response.get("tool_calls"):
+            if len(_response_cache) >= _RESPONSE_CACHE_MAX_ENTRIES:
+                # 淘汰最早写入的条目
+                del _response_cache[next(iter(_response_cache))]
+            _response_cache[cache_key] = _ResponseCacheEntry(
+                response=dict(response),
+                expire_time=time.monotonic() + _RESPONSE_CACHE_TTL
+            )
+        
         # 处理工具调用
         if handle_tool_calls and response.get("tool_calls"):
             return await self._handle_tool_calls(
@@ -395,6 +472,7 @@ class AIService:
         tool_choice: Optional[str] = None,
         auto_mcp: bool = True,
         mcp_max_rounds: Optional[int] = None,
+        cache_prefix: Optional[str] = None,
     ) -> AsyncGenerator[str, None]:
         """
         流式生成文本（自动支持MCP工具）
@@ -411,6 +489,7 @@ class AIService:
             tool_choice: 工具选择策略（"auto"/"none"/"required"）
             auto_mcp: 是否自动加载MCP工具
             mcp_max_rounds: 最大工具调用轮数（None使用默认值3）
+            cache_prefix: prompt 中跨请求保持不变的前缀，由调用方显式指定以启用提供商的提示词缓存
             
         Yields:
             生成的文本块
@@ -437,6 +516,7 @@ class AIService:
             tools=tools_to_use,
             tool_choice=tool_choice,
             user_id=self.user_id,
+            cache_prefix=cache_prefix,
         ):
             yield chunk
 
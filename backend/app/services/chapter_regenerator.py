@@ -1,5 +1,5 @@
 """章节重新生成服务"""
-from typing import Dict, Any, AsyncGenerator, Optional, List
+from typing import Dict, Any, AsyncGenerator, Optional, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.ai_service import AIService
 from app.services.prompt_service import prompt_service, PromptService
@@ -7,6 +7,7 @@ from app.models.chapter import Chapter
 from app.models.memory import PlotAnalysis
 from app.schemas.regeneration import ChapterRegenerateRequest, PreserveElementsConfig
 from app.logger import get_logger
+from app.utils.sse_response import batch_text_stream
 import difflib
 
 logger = get_logger(__name__)
@@ -42,7 +43,7 @@ class ChapterRegenerator:
             db: 数据库会话（用于查询自定义提示词）
         
         Yields:
-            包含类型和数据的字典: {'type': 'progress'/'chunk', 'data': ...}
+            包含类型和数据的字典: {'type': 'progress'/'chunk'/'heartbeat', 'data': ...}
         """
         try:
             logger.info(f"🔄 开始重新生成章节: 第{chapter.chapter_number}章")
@@ -58,7 +59,7 @@ class ChapterRegenerator:
             
             # 2. 构建完整提示词
             yield {'type': 'progress', 'progress': 10, 'message': '正在构建生成提示词...'}
-            full_prompt = await self._build_regeneration_prompt(
+            full_prompt, cache_prefix = await self._build_regeneration_prompt(
                 chapter=chapter,
                 modification_instructions=modification_instructions,
                 project_context=project_context,
@@ -86,11 +87,17 @@ class ChapterRegenerator:
             target_word_count = regenerate_request.target_word_count
             accumulated_length = 0
             
-            async for chunk in self.ai_service.generate_text_stream(
+            async for chunk in batch_text_stream(self.ai_service.generate_text_stream(
                 prompt=full_prompt,
                 system_prompt=system_prompt_with_style,
-                temperature=0.7
-            ):
+                temperature=0.7,
+                cache_prefix=cache_prefix
+            )):
+                if chunk is None:
+                    # 上游空闲，通知调用方发送心跳
+                    yield {'type': 'heartbeat'}
+                    continue
+                
                 # 发送内容块
                 yield {'type': 'chunk', 'content': chunk}
                 
@@ -187,11 +194,11 @@ class ChapterRegenerator:
         style_content: str = "",
         user_id: str = None,
         db: AsyncSession = None
-    ) -> str:
-        """构建完整的重新生成提示词"""
-        # 使用PromptService的get_chapter_regeneration_prompt方法
+    ) -> Tuple[str, Optional[str]]:
+        """构建完整的重新生成提示词，同时返回其中项目级的稳定前缀"""
+        # 使用PromptService的get_chapter_regeneration_prompt_parts方法
         # 该方法会处理自定义模板加载和完整提示词构建
-        return await PromptService.get_chapter_regeneration_prompt(
+        return await PromptService.get_chapter_regeneration_prompt_parts(
             chapter_number=chapter.chapter_number,
             title=chapter.title,
             word_count=chapter.word_count,
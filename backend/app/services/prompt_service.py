@@ -1,6 +1,488 @@
 """提示词管理服务"""
-from typing import Dict, Any, Optional
-import json
+from dataclasses import dataclass
+from functools import lru_cache
+from string import Formatter
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import io
+import re
+import sys
+import time
+
+from sqlalchemy import select
+
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# 模板解析器（仅用于解析，无状态，可全局复用）
+_FORMATTER = Formatter()
+
+# 模板片段: (字面量, 字段名, 格式说明, 转换符)
+_Segment = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+# 行尾空白与3个以上连续换行（用于规范化模板字面量与最终提示词）
+_TRAILING_SPACE_RE = re.compile(r"[ \t]+$", re.MULTILINE)
+_EXTRA_NEWLINES_RE = re.compile(r"\n{3,}")
+
+
+@lru_cache(maxsize=256)
+def _normalize_template(template: str) -> str:
+    """
+    去除模板的行尾空白并压缩多余空行，减少每次发送给模型的字节与token
+    
+    预编译渲染与 str.format 回退两条路径都先经过这里，保证同一模板的输出一致。
+    """
+    template = _TRAILING_SPACE_RE.sub("", template)
+    return _EXTRA_NEWLINES_RE.sub("\n\n", template)
+
+
+@lru_cache(maxsize=256)
+def _parse_template(template: str) -> Optional[Tuple[_Segment, ...]]:
+    """
+    解析提示词模板并缓存解析结果
+    
+    按模板内容缓存（而非id），用户自定义模板每次从数据库读出都是新对象，
+    内容相同即可复用同一份解析结果。
+    
+    Args:
+        template: 提示词模板
+        
+    Returns:
+        片段元组；模板含位置参数、属性/下标访问或嵌套格式说明时返回None，交由str.format处理
+    """
+    segments = tuple(_FORMATTER.parse(template))
+    for _, field_name, format_spec, _ in segments:
+        if field_name is None:
+            continue
+        if not field_name.isidentifier() or "{" in format_spec:
+            return None
+    return segments
+
+
+
+@lru_cache(maxsize=256)
+def _compile_template(template: str) -> Optional[Callable[[Dict[str, Any]], str]]:
+    """
+    将提示词模板编译为渲染函数并缓存
+    
+    根据解析出的片段生成 ``def _render(kw): return f"..."`` 源码并exec，
+    字面量与格式说明作为命名空间常量引用，渲染时只剩一次f-string拼接，
+    不再逐次遍历片段、调用format()。
+    
+    Args:
+        template: 提示词模板
+        
+    Returns:
+        接收参数字典的渲染函数；模板无法编译时返回None，交由str.format处理
+    """
+    segments = _parse_template(_normalize_template(template))
+    if segments is None:
+        return None
+    
+    namespace: Dict[str, Any] = {}
+    pieces = []
+    # 解析器会在每个转义的 {{ / }} 处切分字面量（JSON示例块尤其多），
+    # 相邻字面量先合并为一个常量，渲染时的拼接片段数只与字段数相关；
+    # 常量经 sys.intern 驻留，不同模板（及内容相同的自定义模板）间相同的片段共用一份
+    # （字段名作为生成源码中的标识符式常量，由编译器自动驻留）
+    pending = []
+    
+    def flush_literal() -> None:
+        if pending:
+            name = f"_c{len(namespace)}"
+            namespace[name] = sys.intern("".join(pending))
+            pieces.append(f"{{{name}}}")
+            pending.clear()
+    
+    for literal, field_name, format_spec, conversion in segments:
+        if literal:
+            pending.append(literal)
+        if field_name is None:
+            continue
+        flush_literal()
+        if conversion and conversion not in "sra":
+            return None
+        expr = f"kw[{field_name!r}]"
+        if conversion:
+            expr += f"!{conversion}"
+        if format_spec:
+            name = f"_c{len(namespace)}"
+            namespace[name] = format_spec
+            expr += f":{{{name}}}"
+        pieces.append(f"{{{expr}}}")
+    flush_literal()
+    
+    source = f'def _render(kw):\n    return f"{"".join(pieces)}"\n'
+    exec(source, namespace)
+    render = namespace["_render"]
+    # 模板用到的全部字段，用于缺参时一次性报告所有缺失的参数
+    render.required_fields = frozenset(
+        field_name for _, field_name, _, _ in segments if field_name is not None
+    )
+    return render
+
+
+def _format_keep_missing(template: str, params: Dict[str, Any]) -> str:
+    """
+    容错渲染：无法取值的字段原样保留占位符（含转换符与格式说明）
+    
+    Args:
+        template: 已规范化的提示词模板
+        params: 模板参数
+        
+    Returns:
+        渲染结果
+    """
+    pieces = []
+    for literal, field_name, format_spec, conversion in _FORMATTER.parse(template):
+        pieces.append(literal)
+        if field_name is None:
+            continue
+        try:
+            value, _ = _FORMATTER.get_field(field_name, (), params)
+            value = _FORMATTER.convert_field(value, conversion)
+            pieces.append(format(value, _FORMATTER.vformat(format_spec, (), params)))
+        except (KeyError, IndexError, AttributeError):
+            placeholder = field_name
+            if conversion:
+                placeholder += f"!{conversion}"
+            if format_spec:
+                placeholder += f":{format_spec}"
+            pieces.append(f"{{{placeholder}}}")
+    return "".join(pieces)
+
+
+
+def _canonicalize_prompt(text: str) -> str:
+    """
+    规范化提示词文本，保证相同的逻辑输入得到逐字节相同的输出
+    
+    去除行尾空白、将连续空行压缩为一个空行，并统一以单个换行结尾，
+    避免条件片段拼接产生的空白差异破坏模型服务端的前缀缓存。
+    """
+    text = _TRAILING_SPACE_RE.sub("", text)
+    text = _EXTRA_NEWLINES_RE.sub("\n\n", text)
+    return text.rstrip("\n") + "\n"
+
+
+@dataclass
+class _TemplateCacheEntry:
+    """用户自定义模板缓存条目"""
+    content: Optional[str]  # 自定义模板内容，None表示用户未自定义
+    template_name: Optional[str]
+    expire_time: float
+
+
+# 用户自定义模板缓存: (user_id, template_key) -> _TemplateCacheEntry
+_template_cache: Dict[Tuple[str, str], _TemplateCacheEntry] = {}
+
+# 缓存TTL（秒）
+_TEMPLATE_CACHE_TTL = 60
+
+
+# ========== 章节重写提示词片段 ==========
+# 各片段在模块加载时定义一次，渲染时复用format_prompt缓存的解析结果
+
+# 修改指令与创作要求之间的分隔线
+_CHAPTER_REGEN_SEPARATOR = "\n---\n"
+
+_CHAPTER_REGEN_ORIGINAL = """## 📖 原始章节信息
+
+**章节**：第{chapter_number}章
+**标题**：{title}
+**字数**：{word_count}字
+
+**原始内容**：
+{content}
+
+---
+"""
+
+_CHAPTER_REGEN_PROJECT = """## 🌍 项目背景信息
+
+**小说标题**：{project_title}
+**题材**：{genre}
+**主题**：{theme}
+**叙事视角**：{narrative_perspective}
+**世界观设定**：
+- 时代背景：{time_period}
+- 地理位置：{location}
+- 氛围基调：{atmosphere}
+
+---
+"""
+
+_CHAPTER_REGEN_CHARACTERS = """## 👥 角色信息
+
+{characters_info}
+
+---
+"""
+
+_CHAPTER_REGEN_OUTLINE = """## 📝 本章大纲
+
+{chapter_outline}
+
+---
+"""
+
+_CHAPTER_REGEN_PREVIOUS = """## 📚 前置章节上下文
+
+{previous_context}
+
+---
+"""
+
+_CHAPTER_REGEN_STYLE = """## 🎨 写作风格要求
+
+{style_content}
+
+请在重新创作时严格遵循上述写作风格。
+
+---
+"""
+
+_CHAPTER_REGEN_REQUIREMENTS = """## ✨ 创作要求
+
+1. **解决问题**：针对上述修改指令中提到的所有问题进行改进
+2. **保持连贯**：确保与前后章节的情节、人物、风格保持一致
+3. **提升质量**：在节奏、情感、描写等方面明显优于原版
+4. **保留精华**：保持原章节中优秀的部分和关键情节
+5. **字数控制**：目标字数约{target_word_count}字（可适当浮动±20%）
+{style_requirement}
+
+---
+
+## 🎬 开始创作
+
+请现在开始创作改进后的新版本章节内容。
+
+**重要提示**：
+- 直接输出章节正文内容，从故事内容开始写
+- **不要**输出章节标题（如"第X章"、"第X章：XXX"等）
+- **不要**输出任何额外的说明、注释或元数据
+- 只需要纯粹的故事正文内容
+
+现在开始：
+"""
+
+
+# ========== 系统模板元信息 ==========
+# 所有系统模板的显示名称、分类、描述及参数定义
+_TEMPLATE_DEFINITIONS: Dict[str, Dict[str, Any]] = {
+    "WORLD_BUILDING": {
+        "name": "世界构建",
+        "category": "世界构建",
+        "description": "用于生成小说世界观设定，包括时间背景、地理位置、氛围基调和世界规则",
+        "parameters": ["title", "theme", "genre", "description"]
+    },
+    "CHARACTERS_BATCH_GENERATION": {
+        "name": "批量角色生成",
+        "category": "角色生成",
+        "description": "批量生成多个角色和组织，建立角色关系网络",
+        "parameters": ["count", "time_period", "location", "atmosphere", "rules", "theme", "genre", "requirements"]
+    },
+    "SINGLE_CHARACTER_GENERATION": {
+        "name": "单个角色生成",
+        "category": "角色生成",
+        "description": "生成单个角色的详细设定",
+        "parameters": ["project_context", "user_input"]
+    },
+    "SINGLE_ORGANIZATION_GENERATION": {
+        "name": "组织生成",
+        "category": "角色生成",
+        "description": "生成组织/势力的详细设定",
+        "parameters": ["project_context", "user_input"]
+    },
+    "OUTLINE_CREATE": {
+        "name": "初始大纲生成",
+        "category": "大纲生成",
+        "description": "根据项目信息生成完整的章节大纲",
+        "parameters": ["title", "theme", "genre", "chapter_count", "narrative_perspective", "target_words", 
+                     "time_period", "location", "atmosphere", "rules", "characters_info", "requirements", "mcp_references"]
+    },
+    "OUTLINE_CONTINUE": {
+        "name": "大纲续写",
+        "category": "大纲生成",
+        "description": "基于已有章节续写大纲",
+        "parameters": ["title", "theme", "genre", "narrative_perspective", "chapter_count", "time_period", 
+                     "location", "atmosphere", "rules", "characters_info", "current_chapter_count", 
+                     "all_chapters_brief", "recent_plot", "memory_context", "mcp_references", 
+                     "plot_stage_instruction", "start_chapter", "end_chapter", "story_direction", "requirements"]
+    },
+    "CHAPTER_GENERATION_V2": {
+        "name": "章节创作V2（首章）",
+        "category": "章节创作",
+        "description": "根据大纲创作章节内容（用于第1章，无前置章节）",
+        "parameters": ["project_title", "genre", "chapter_number", "chapter_title", "chapter_outline",
+                     "target_word_count", "narrative_perspective", "characters_info"]
+    },
+    "CHAPTER_GENERATION_V2_WITH_CONTEXT": {
+        "name": "章节创作V2（续章）",
+        "category": "章节创作",
+        "description": "基于前置章节内容创作新章节（用于第2章及以后）",
+        "parameters": ["project_title", "genre", "chapter_number", "chapter_title", "chapter_outline",
+                     "target_word_count", "narrative_perspective", "characters_info", "continuation_point",
+                     "foreshadow_reminders", "relevant_memories", "story_skeleton", "previous_chapter_summary"]
+    },
+    "CHAPTER_REGENERATION_SYSTEM": {
+        "name": "章节重写系统提示",
+        "category": "章节重写",
+        "description": "用于章节重写的系统提示词",
+        "parameters": ["chapter_number", "title", "word_count", "content", "modification_instructions",
+                     "project_context", "style_content", "target_word_count"]
+    },
+    "PARTIAL_REGENERATE": {
+        "name": "局部重写",
+        "category": "章节重写",
+        "description": "根据用户修改要求重写选中的段落内容",
+        "parameters": ["context_before", "original_word_count", "selected_text", "context_after",
+                     "user_instructions", "length_requirement", "style_content"]
+    },
+    "PLOT_ANALYSIS": {
+        "name": "情节分析",
+        "category": "情节分析",
+        "description": "深度分析章节的剧情、钩子、伏笔等",
+        "parameters": ["chapter_number", "title", "content", "word_count"]
+    },
+    "OUTLINE_EXPAND_SINGLE": {
+        "name": "大纲单批次展开",
+        "category": "情节展开",
+        "description": "将大纲节点展开为详细章节规划（单批次）",
+        "parameters": ["project_title", "project_genre", "project_theme", "project_narrative_perspective", 
+                     "project_world_time_period", "project_world_location", "project_world_atmosphere", 
+                     "characters_info", "outline_order_index", "outline_title", "outline_content", 
+                     "context_info", "strategy_instruction", "target_chapter_count", "scene_instruction", "scene_field"]
+    },
+    "OUTLINE_EXPAND_MULTI": {
+        "name": "大纲分批展开",
+        "category": "情节展开",
+        "description": "将大纲节点展开为详细章节规划（分批）",
+        "parameters": ["project_title", "project_genre", "project_theme", "project_narrative_perspective", 
+                     "project_world_time_period", "project_world_location", "project_world_atmosphere", 
+                     "characters_info", "outline_order_index", "outline_title", "outline_content", 
+                     "context_info", "previous_context", "strategy_instruction", "start_index", 
+                     "end_index", "target_chapter_count", "scene_instruction", "scene_field"]
+    },
+    "MCP_TOOL_TEST": {
+        "name": "MCP工具测试(用户提示词)",
+        "category": "MCP测试",
+        "description": "用于测试MCP插件功能的用户提示词",
+        "parameters": ["plugin_name"]
+    },
+    "MCP_TOOL_TEST_SYSTEM": {
+        "name": "MCP工具测试(系统提示词)",
+        "category": "MCP测试",
+        "description": "用于测试MCP插件功能的系统提示词",
+        "parameters": []
+    },
+    "MCP_WORLD_BUILDING_PLANNING": {
+        "name": "MCP世界观规划",
+        "category": "MCP增强",
+        "description": "使用MCP工具搜索资料辅助世界观设计",
+        "parameters": ["title", "genre", "theme", "description"]
+    },
+    "MCP_CHARACTER_PLANNING": {
+        "name": "MCP角色规划",
+        "category": "MCP增强",
+        "description": "使用MCP工具搜索资料辅助角色设计",
+        "parameters": ["title", "genre", "theme", "time_period", "location"]
+    },
+    "AUTO_CHARACTER_ANALYSIS": {
+        "name": "自动角色分析",
+        "category": "自动角色引入",
+        "description": "分析新生成的大纲，判断是否需要引入新角色",
+        "parameters": ["title", "genre", "theme", "time_period", "location", "atmosphere",
+                     "existing_characters", "new_outlines", "start_chapter", "end_chapter"]
+    },
+    "AUTO_CHARACTER_GENERATION": {
+        "name": "自动角色生成",
+        "category": "自动角色引入",
+        "description": "根据剧情需求自动生成新角色的完整设定",
+        "parameters": ["title", "genre", "theme", "time_period", "location", "atmosphere", "rules",
+                     "existing_characters", "plot_context", "character_specification", "mcp_references"]
+    },
+    "AUTO_ORGANIZATION_ANALYSIS": {
+        "name": "自动组织分析",
+        "category": "自动组织引入",
+        "description": "分析新生成的大纲，判断是否需要引入新组织",
+        "parameters": ["title", "genre", "theme", "time_period", "location", "atmosphere",
+                     "existing_organizations", "existing_characters", "all_chapters_brief", "start_chapter", "chapter_count", "plot_stage", "story_direction"]
+    },
+    "AUTO_ORGANIZATION_GENERATION": {
+        "name": "自动组织生成",
+        "category": "自动组织引入",
+        "description": "根据剧情需求自动生成新组织的完整设定",
+        "parameters": ["title", "genre", "theme", "time_period", "location", "atmosphere", "rules",
+                     "existing_organizations", "existing_characters", "plot_context", "organization_specification", "mcp_references"]
+    },
+    "CAREER_SYSTEM_GENERATION": {
+        "name": "职业体系生成",
+        "category": "世界构建",
+        "description": "根据世界观自动生成完整的职业体系，包括主职业和副职业",
+        "parameters": ["title", "genre", "theme", "time_period", "location", "atmosphere", "rules"]
+    },
+    "INSPIRATION_TITLE_SYSTEM": {
+        "name": "灵感模式-书名生成(系统提示词)",
+        "category": "灵感模式",
+        "description": "根据用户的原始想法生成6个书名建议的系统提示词",
+        "parameters": ["initial_idea"]
+    },
+    "INSPIRATION_TITLE_USER": {
+        "name": "灵感模式-书名生成(用户提示词)",
+        "category": "灵感模式",
+        "description": "根据用户的原始想法生成6个书名建议的用户提示词",
+        "parameters": ["initial_idea"]
+    },
+    "INSPIRATION_DESCRIPTION_SYSTEM": {
+        "name": "灵感模式-简介生成(系统提示词)",
+        "category": "灵感模式",
+        "description": "根据用户想法和书名生成6个简介选项的系统提示词",
+        "parameters": ["initial_idea", "title"]
+    },
+    "INSPIRATION_DESCRIPTION_USER": {
+        "name": "灵感模式-简介生成(用户提示词)",
+        "category": "灵感模式",
+        "description": "根据用户想法和书名生成6个简介选项的用户提示词",
+        "parameters": ["initial_idea", "title"]
+    },
+    "INSPIRATION_THEME_SYSTEM": {
+        "name": "灵感模式-主题生成(系统提示词)",
+        "category": "灵感模式",
+        "description": "根据书名和简介生成6个深刻的主题选项的系统提示词",
+        "parameters": ["initial_idea", "title", "description"]
+    },
+    "INSPIRATION_THEME_USER": {
+        "name": "灵感模式-主题生成(用户提示词)",
+        "category": "灵感模式",
+        "description": "根据书名和简介生成6个深刻的主题选项的用户提示词",
+        "parameters": ["initial_idea", "title", "description"]
+    },
+    "INSPIRATION_GENRE_SYSTEM": {
+        "name": "灵感模式-类型生成(系统提示词)",
+        "category": "灵感模式",
+        "description": "根据小说信息生成6个合适的类型标签的系统提示词",
+        "parameters": ["initial_idea", "title", "description", "theme"]
+    },
+    "INSPIRATION_GENRE_USER": {
+        "name": "灵感模式-类型生成(用户提示词)",
+        "category": "灵感模式",
+        "description": "根据小说信息生成6个合适的类型标签的用户提示词",
+        "parameters": ["initial_idea", "title", "description", "theme"]
+    },
+    "INSPIRATION_QUICK_COMPLETE": {
+        "name": "灵感模式-智能补全",
+        "category": "灵感模式",
+        "description": "根据用户提供的部分信息智能补全完整的小说方案",
+        "parameters": ["existing"]
+    }
+}
+
+
+# 写作风格拼接用的固定片段
+_STYLE_SEP = "\n\n"
+_STYLE_TAIL = "\n\n请直接输出章节正文内容，不要包含章节标题和其他说明文字。"
 
 
 class WritingStyleManager:
@@ -18,8 +500,8 @@ class WritingStyleManager:
         Returns:
             组合后的提示词
         """
-        # 在基础提示词末尾添加风格要求
-        return f"{base_prompt}\n\n{style_content}\n\n请直接输出章节正文内容，不要包含章节标题和其他说明文字。"
+        # 在基础提示词末尾添加风格要求（一次join按总长度分配，只拷贝一遍）
+        return "".join((base_prompt, _STYLE_SEP, style_content, _STYLE_TAIL))
 
 
 class PromptService:
@@ -2156,6 +2638,9 @@ class PromptService:
         """
         格式化提示词模板
         
+        模板会先去除行尾空白并压缩连续空行（只含空白的行视为空行），
+        因此输出与直接调用 str.format 并非逐字节一致，但不改变提示词语义。
+        
         Args:
             template: 提示词模板
             **kwargs: 模板参数
@@ -2163,11 +2648,37 @@ class PromptService:
         Returns:
             格式化后的提示词
         """
+        render = _compile_template(template)
         try:
-            return template.format(**kwargs)
+            if render is None:
+                return _normalize_template(template).format(**kwargs)
+            
+            # 调用预编译的渲染函数，跳过str.format对整段模板的重复解析
+            return render(kwargs)
         except KeyError as e:
+            if render is not None:
+                missing = sorted(render.required_fields - kwargs.keys())
+                if missing:
+                    raise ValueError(f"缺少必需的参数: {', '.join(map(repr, missing))}")
             raise ValueError(f"缺少必需的参数: {e}")
     
+    @staticmethod
+    def format_prompt_safe(template: str, **kwargs) -> str:
+        """
+        容错格式化提示词模板，缺失的参数保留原占位符而不是报错
+        
+        Args:
+            template: 提示词模板
+            **kwargs: 模板参数（可缺省）
+            
+        Returns:
+            格式化后的提示词
+        """
+        render = _compile_template(template)
+        if render is not None and render.required_fields <= kwargs.keys():
+            return render(kwargs)
+        return _format_keep_missing(_normalize_template(template), kwargs)
+    
 
     @classmethod
     async def get_chapter_regeneration_prompt(cls, chapter_number: int, title: str, word_count: int, content: str,
@@ -2192,110 +2703,122 @@ class PromptService:
         Returns:
             完整的章节重写提示词
         """
+        prompt, _ = await cls.get_chapter_regeneration_prompt_parts(
+            chapter_number, title, word_count, content,
+            modification_instructions, project_context,
+            style_content, target_word_count,
+            user_id=user_id, db=db
+        )
+        return prompt
+
+    @classmethod
+    async def get_chapter_regeneration_prompt_parts(cls, chapter_number: int, title: str, word_count: int, content: str,
+                                              modification_instructions: str, project_context: Dict[str, Any],
+                                              style_content: str, target_word_count: int,
+                                              user_id: str = None, db = None) -> Tuple[str, Optional[str]]:
+        """
+        获取章节重写提示词及其项目级稳定前缀（供调用方标记提供商缓存断点）
+        
+        Args:
+            chapter_number: 章节序号
+            title: 章节标题
+            word_count: 原始字数
+            content: 原始内容
+            modification_instructions: 修改指令
+            project_context: 项目上下文
+            style_content: 写作风格
+            target_word_count: 目标字数
+            user_id: 用户ID（可选，用于获取自定义模板）
+            db: 数据库会话（可选，用于查询自定义模板）
+            
+        Returns:
+            (完整的章节重写提示词, 稳定前缀)，无法确定稳定前缀时前缀为 None
+        """
         # 获取系统提示词模板（支持用户自定义）
-        if user_id and db:
-            system_template = await cls.get_template("CHAPTER_REGENERATION_SYSTEM", user_id, db)
-        else:
-            system_template = cls.CHAPTER_REGENERATION_SYSTEM
+        system_template = await cls.get_template_with_fallback("CHAPTER_REGENERATION_SYSTEM", user_id, db)
         
-        prompt_parts = [system_template]
+        # 按"稳定→易变"排列：系统提示词与项目级信息在同一项目的多次重写中保持不变，
+        # 放在最前面形成相同前缀，便于模型服务端的前缀缓存命中；章节级内容放在其后
+        # 各片段直接写入同一个缓冲区，每个片段后跟一个换行，省去中间列表与最终 join 的整体拷贝
+        buf = io.StringIO()
         
-        # 原始章节信息
-        prompt_parts.append(f"""## 📖 原始章节信息
-
-**章节**：第{chapter_number}章
-**标题**：{title}
-**字数**：{word_count}字
-
-**原始内容**：
-{content}
-
----
-""")
+        def write_part(part: str) -> None:
+            buf.write(part)
+            buf.write("\n")
         
-        # 修改指令
-        prompt_parts.append(modification_instructions)
-        prompt_parts.append("\n---\n")
+        write_part(system_template)
         
         # 项目背景信息
-        prompt_parts.append(f"""## 🌍 项目背景信息
-
-**小说标题**：{project_context.get('project_title', '未知')}
-**题材**：{project_context.get('genre', '未设定')}
-**主题**：{project_context.get('theme', '未设定')}
-**叙事视角**：{project_context.get('narrative_perspective', '第三人称')}
-**世界观设定**：
-- 时代背景：{project_context.get('time_period', '未设定')}
-- 地理位置：{project_context.get('location', '未设定')}
-- 氛围基调：{project_context.get('atmosphere', '未设定')}
-
----
-""")
+        write_part(cls.format_prompt(
+            _CHAPTER_REGEN_PROJECT,
+            project_title=project_context.get('project_title', '未知'),
+            genre=project_context.get('genre', '未设定'),
+            theme=project_context.get('theme', '未设定'),
+            narrative_perspective=project_context.get('narrative_perspective', '第三人称'),
+            time_period=project_context.get('time_period', '未设定'),
+            location=project_context.get('location', '未设定'),
+            atmosphere=project_context.get('atmosphere', '未设定')
+        ))
         
         # 角色信息
-        if project_context.get('characters_info'):
-            prompt_parts.append(f"""## 👥 角色信息
-
-{project_context['characters_info']}
-
----
-""")
+        characters_info = project_context.get('characters_info')
+        if characters_info:
+            write_part(cls.format_prompt(
+                _CHAPTER_REGEN_CHARACTERS,
+                characters_info=characters_info
+            ))
+        
+        # 写作风格要求
+        if style_content:
+            write_part(cls.format_prompt(
+                _CHAPTER_REGEN_STYLE,
+                style_content=style_content
+            ))
+        
+        # 以上为项目级稳定部分，以下为章节级内容
+        stable_length = buf.tell()
         
         # 章节大纲
-        if project_context.get('chapter_outline'):
-            prompt_parts.append(f"""## 📝 本章大纲
-
-{project_context['chapter_outline']}
-
----
-""")
+        chapter_outline = project_context.get('chapter_outline')
+        if chapter_outline:
+            write_part(cls.format_prompt(
+                _CHAPTER_REGEN_OUTLINE,
+                chapter_outline=chapter_outline
+            ))
         
         # 前置章节上下文
-        if project_context.get('previous_context'):
-            prompt_parts.append(f"""## 📚 前置章节上下文
-
-{project_context['previous_context']}
-
----
-""")
+        previous_context = project_context.get('previous_context')
+        if previous_context:
+            write_part(cls.format_prompt(
+                _CHAPTER_REGEN_PREVIOUS,
+                previous_context=previous_context
+            ))
         
-        # 写作风格要求
-        if style_content:
-            prompt_parts.append(f"""## 🎨 写作风格要求
-
-{style_content}
-
-请在重新创作时严格遵循上述写作风格。
-
----
-""")
+        # 原始章节信息
+        write_part(cls.format_prompt(
+            _CHAPTER_REGEN_ORIGINAL,
+            chapter_number=chapter_number,
+            title=title,
+            word_count=word_count,
+            content=content
+        ))
+        
+        # 修改指令
+        write_part(modification_instructions)
+        write_part(_CHAPTER_REGEN_SEPARATOR)
         
         # 创作要求
-        prompt_parts.append(f"""## ✨ 创作要求
-
-1. **解决问题**：针对上述修改指令中提到的所有问题进行改进
-2. **保持连贯**：确保与前后章节的情节、人物、风格保持一致
-3. **提升质量**：在节奏、情感、描写等方面明显优于原版
-4. **保留精华**：保持原章节中优秀的部分和关键情节
-5. **字数控制**：目标字数约{target_word_count}字（可适当浮动±20%）
-{f'6. **风格一致**：严格按照上述写作风格进行创作' if style_content else ''}
-
----
-
-## 🎬 开始创作
-
-请现在开始创作改进后的新版本章节内容。
-
-**重要提示**：
-- 直接输出章节正文内容，从故事内容开始写
-- **不要**输出章节标题（如"第X章"、"第X章：XXX"等）
-- **不要**输出任何额外的说明、注释或元数据
-- 只需要纯粹的故事正文内容
-
-现在开始：
-""")
+        write_part(cls.format_prompt(
+            _CHAPTER_REGEN_REQUIREMENTS,
+            target_word_count=target_word_count,
+            style_requirement='6. **风格一致**：严格按照上述写作风格进行创作' if style_content else ''
+        ))
         
-        return "\n".join(prompt_parts)
+        prompt = _canonicalize_prompt(buf.getvalue())
+        
+        # 规范化只处理空白，稳定部分规范化后仍应是完整提示词的前缀，否则放弃标记
+        cache_prefix = _canonicalize_prompt(buf.getvalue()[:stable_length])
+        return prompt, (cache_prefix if prompt.startswith(cache_prefix) else None)
 
     @classmethod
     async def get_mcp_tool_test_prompts(
@@ -2315,25 +2838,31 @@ class PromptService:
         Returns:
             包含user和system提示词的字典
         """
-        # 获取用户自定义或系统默认的user提示词
-        if user_id and db:
-            user_template = await cls.get_template("MCP_TOOL_TEST", user_id, db)
-        else:
-            user_template = cls.MCP_TOOL_TEST
-        
-        # 获取用户自定义或系统默认的system提示词
-        if user_id and db:
-            system_template = await cls.get_template("MCP_TOOL_TEST_SYSTEM", user_id, db)
-        else:
-            system_template = cls.MCP_TOOL_TEST_SYSTEM
+        # 获取用户自定义或系统默认的user/system提示词（一次查询取回两个模板）
+        templates = await cls.get_templates_with_fallback(
+            ["MCP_TOOL_TEST", "MCP_TOOL_TEST_SYSTEM"], user_id, db
+        )
         
         return {
-            "user": cls.format_prompt(user_template, plugin_name=plugin_name),
-            "system": system_template
+            "user": cls.format_prompt(templates["MCP_TOOL_TEST"], plugin_name=plugin_name),
+            "system": templates["MCP_TOOL_TEST_SYSTEM"]
         }
 
     # ========== 自定义提示词支持 ==========
     
+    @classmethod
+    def get_system_template(cls, template_key: str) -> Optional[str]:
+        """
+        获取系统默认提示词模板（同步，无需查询数据库）
+        
+        Args:
+            template_key: 模板键名
+            
+        Returns:
+            系统默认模板内容，不存在时返回None
+        """
+        return _SYSTEM_TEMPLATES.get(template_key)
+    
     @classmethod
     async def get_template_with_fallback(cls,
                                         template_key: str,
@@ -2350,13 +2879,34 @@ class PromptService:
         Returns:
             提示词模板内容
         """
-        # 如果没有提供user_id或db，直接返回系统默认
+        # 如果没有提供user_id或db，直接返回系统默认（无需查询时可直接调用同步的 get_system_template）
         if not user_id or not db:
-            return getattr(cls, template_key, None)
+            return cls.get_system_template(template_key)
         
         # 尝试获取用户自定义模板
         return await cls.get_template(template_key, user_id, db)
     
+    @classmethod
+    async def get_templates_with_fallback(cls,
+                                          template_keys: List[str],
+                                          user_id: str = None,
+                                          db = None) -> Dict[str, str]:
+        """
+        批量获取提示词模板（优先用户自定义，支持降级）
+        
+        Args:
+            template_keys: 模板键名列表
+            user_id: 用户ID（可选，如果不提供则直接返回系统默认）
+            db: 数据库会话（可选）
+            
+        Returns:
+            模板键名到提示词模板内容的字典
+        """
+        if not user_id or not db:
+            return {key: cls.get_system_template(key) for key in template_keys}
+        
+        return await cls.get_templates_bulk(template_keys, user_id, db)
+    
     @classmethod
     async def get_template(cls,
                           template_key: str,
@@ -2373,36 +2923,110 @@ class PromptService:
         Returns:
             提示词模板内容
         """
-        from sqlalchemy import select
-        from app.models.prompt_template import PromptTemplate
-        from app.logger import get_logger
+        templates = await cls.get_templates_bulk([template_key], user_id, db)
+        return templates[template_key]
+    
+    @classmethod
+    async def get_templates_bulk(cls,
+                                 template_keys: List[str],
+                                 user_id: str,
+                                 db) -> Dict[str, str]:
+        """
+        批量获取提示词模板（优先用户自定义），未命中缓存的键合并为一次查询
         
-        logger = get_logger(__name__)
+        Args:
+            template_keys: 模板键名列表
+            user_id: 用户ID
+            db: 数据库会话
+            
+        Returns:
+            模板键名到提示词模板内容的字典
+        """
+        # 1. 先从缓存取，过期或缺失的键收集起来
+        now = time.monotonic()
+        entries: Dict[str, _TemplateCacheEntry] = {}
+        missing_keys = []
+        for template_key in template_keys:
+            cache_entry = _template_cache.get((user_id, template_key))
+            if cache_entry is None or now >= cache_entry.expire_time:
+                missing_keys.append(template_key)
+            else:
+                entries[template_key] = cache_entry
         
-        # 1. 尝试从数据库获取用户自定义模板
-        result = await db.execute(
-            select(PromptTemplate).where(
-                PromptTemplate.user_id == user_id,
-                PromptTemplate.template_key == template_key,
-                PromptTemplate.is_active == True
+        # 2. 缺失的键用一条 IN 查询从数据库获取，未找到的也写入缓存（content=None）
+        if missing_keys:
+            # 在函数内导入模型：模块级导入会形成 app.models ↔ app.database 的循环导入；
+            # 只有缓存未命中时才会执行到这里
+            from app.models.prompt_template import PromptTemplate
+            
+            # 只取需要的列，避免构造完整的ORM对象
+            result = await db.execute(
+                select(
+                    PromptTemplate.template_key,
+                    PromptTemplate.template_content,
+                    PromptTemplate.template_name
+                ).where(
+                    PromptTemplate.user_id == user_id,
+                    PromptTemplate.template_key.in_(missing_keys),
+                    PromptTemplate.is_active == True
+                )
             )
-        )
-        custom_template = result.scalar_one_or_none()
-        
-        if custom_template:
-            logger.info(f"✅ 使用用户自定义提示词: user_id={user_id}, template_key={template_key}, template_name={custom_template.template_name}")
-            return custom_template.template_content
-        
-        # 2. 降级到系统默认模板
-        logger.info(f"⚪ 使用系统默认提示词: user_id={user_id}, template_key={template_key} (未找到自定义模板)")
+            custom_templates = {row.template_key: row for row in result.all()}
+            
+            for template_key in missing_keys:
+                custom_template = custom_templates.get(template_key)
+                cache_entry = _TemplateCacheEntry(
+                    content=custom_template.template_content if custom_template else None,
+                    template_name=custom_template.template_name if custom_template else None,
+                    expire_time=now + _TEMPLATE_CACHE_TTL
+                )
+                _template_cache[(user_id, template_key)] = cache_entry
+                entries[template_key] = cache_entry
         
-        # 直接从类属性获取系统默认模板
-        template_content = getattr(cls, template_key, None)
+        # 日志使用惰性格式化：该路径每次生成都会经过，级别被过滤时不再拼接消息
+        templates = {}
+        for template_key in template_keys:
+            cache_entry = entries[template_key]
+            if cache_entry.content is not None:
+                logger.info(
+                    "✅ 使用用户自定义提示词: user_id=%s, template_key=%s, template_name=%s",
+                    user_id, template_key, cache_entry.template_name
+                )
+                templates[template_key] = cache_entry.content
+                continue
+            
+            # 3. 降级到系统默认模板
+            logger.info("⚪ 使用系统默认提示词: user_id=%s, template_key=%s (未找到自定义模板)", user_id, template_key)
+            
+            template_content = cls.get_system_template(template_key)
+            
+            if template_content is None:
+                logger.warning("⚠️ 未找到系统默认模板: %s", template_key)
+            
+            templates[template_key] = template_content
         
-        if template_content is None:
-            logger.warning(f"⚠️ 未找到系统默认模板: {template_key}")
+        return templates
+    
+    @classmethod
+    def invalidate_template_cache(cls, user_id: Optional[str] = None, template_key: Optional[str] = None):
+        """
+        使用户自定义模板缓存失效（模板增删改后调用）
         
-        return template_content
+        Args:
+            user_id: 用户ID，为None时清空所有缓存
+            template_key: 模板键名，为None时清空该用户的全部缓存
+        """
+        if user_id is None:
+            _template_cache.clear()
+        elif template_key is not None:
+            _template_cache.pop((user_id, template_key), None)
+        else:
+            for key in [k for k in _template_cache if k[0] == user_id]:
+                del _template_cache[key]
+    
+    # 系统模板信息缓存（系统模板在进程内不会变化，首次访问时构建）
+    _all_templates_cache: Optional[list] = None
+    _template_info_index: Optional[Dict[str, dict]] = None
     
     @classmethod
     def get_all_system_templates(cls) -> list:
@@ -2410,222 +3034,18 @@ class PromptService:
         获取所有系统默认模板的信息
         
         Returns:
-            系统模板列表
+            系统模板列表（每次返回新的列表和字典副本，调用方可随意修改）
         """
+        if cls._all_templates_cache is None:
+            cls._build_system_template_cache()
+        return [dict(t) for t in cls._all_templates_cache]
+    
+    @classmethod
+    def _build_system_template_cache(cls) -> None:
+        """构建系统模板信息缓存及按键名的索引"""
         templates = []
-        
-        # 定义所有模板及其元信息
-        template_definitions = {
-            "WORLD_BUILDING": {
-                "name": "世界构建",
-                "category": "世界构建",
-                "description": "用于生成小说世界观设定，包括时间背景、地理位置、氛围基调和世界规则",
-                "parameters": ["title", "theme", "genre", "description"]
-            },
-            "CHARACTERS_BATCH_GENERATION": {
-                "name": "批量角色生成",
-                "category": "角色生成",
-                "description": "批量生成多个角色和组织，建立角色关系网络",
-                "parameters": ["count", "time_period", "location", "atmosphere", "rules", "theme", "genre", "requirements"]
-            },
-            "SINGLE_CHARACTER_GENERATION": {
-                "name": "单个角色生成",
-                "category": "角色生成",
-                "description": "生成单个角色的详细设定",
-                "parameters": ["project_context", "user_input"]
-            },
-            "SINGLE_ORGANIZATION_GENERATION": {
-                "name": "组织生成",
-                "category": "角色生成",
-                "description": "生成组织/势力的详细设定",
-                "parameters": ["project_context", "user_input"]
-            },
-            "OUTLINE_CREATE": {
-                "name": "初始大纲生成",
-                "category": "大纲生成",
-                "description": "根据项目信息生成完整的章节大纲",
-                "parameters": ["title", "theme", "genre", "chapter_count", "narrative_perspective", "target_words", 
-                             "time_period", "location", "atmosphere", "rules", "characters_info", "requirements", "mcp_references"]
-            },
-            "OUTLINE_CONTINUE": {
-                "name": "大纲续写",
-                "category": "大纲生成",
-                "description": "基于已有章节续写大纲",
-                "parameters": ["title", "theme", "genre", "narrative_perspective", "chapter_count", "time_period", 
-                             "location", "atmosphere", "rules", "characters_info", "current_chapter_count", 
-                             "all_chapters_brief", "recent_plot", "memory_context", "mcp_references", 
-                             "plot_stage_instruction", "start_chapter", "end_chapter", "story_direction", "requirements"]
-            },
-            "CHAPTER_GENERATION_V2": {
-                "name": "章节创作V2（首章）",
-                "category": "章节创作",
-                "description": "根据大纲创作章节内容（用于第1章，无前置章节）",
-                "parameters": ["project_title", "genre", "chapter_number", "chapter_title", "chapter_outline",
-                             "target_word_count", "narrative_perspective", "characters_info"]
-            },
-            "CHAPTER_GENERATION_V2_WITH_CONTEXT": {
-                "name": "章节创作V2（续章）",
-                "category": "章节创作",
-                "description": "基于前置章节内容创作新章节（用于第2章及以后）",
-                "parameters": ["project_title", "genre", "chapter_number", "chapter_title", "chapter_outline",
-                             "target_word_count", "narrative_perspective", "characters_info", "continuation_point",
-                             "foreshadow_reminders", "relevant_memories", "story_skeleton", "previous_chapter_summary"]
-            },
-            "CHAPTER_REGENERATION_SYSTEM": {
-                "name": "章节重写系统提示",
-                "category": "章节重写",
-                "description": "用于章节重写的系统提示词",
-                "parameters": ["chapter_number", "title", "word_count", "content", "modification_instructions",
-                             "project_context", "style_content", "target_word_count"]
-            },
-            "PARTIAL_REGENERATE": {
-                "name": "局部重写",
-                "category": "章节重写",
-                "description": "根据用户修改要求重写选中的段落内容",
-                "parameters": ["context_before", "original_word_count", "selected_text", "context_after",
-                             "user_instructions", "length_requirement", "style_content"]
-            },
-            "PLOT_ANALYSIS": {
-                "name": "情节分析",
-                "category": "情节分析",
-                "description": "深度分析章节的剧情、钩子、伏笔等",
-                "parameters": ["chapter_number", "title", "content", "word_count"]
-            },
-            "OUTLINE_EXPAND_SINGLE": {
-                "name": "大纲单批次展开",
-                "category": "情节展开",
-                "description": "将大纲节点展开为详细章节规划（单批次）",
-                "parameters": ["project_title", "project_genre", "project_theme", "project_narrative_perspective", 
-                             "project_world_time_period", "project_world_location", "project_world_atmosphere", 
-                             "characters_info", "outline_order_index", "outline_title", "outline_content", 
-                             "context_info", "strategy_instruction", "target_chapter_count", "scene_instruction", "scene_field"]
-            },
-            "OUTLINE_EXPAND_MULTI": {
-                "name": "大纲分批展开",
-                "category": "情节展开",
-                "description": "将大纲节点展开为详细章节规划（分批）",
-                "parameters": ["project_title", "project_genre", "project_theme", "project_narrative_perspective", 
-                             "project_world_time_period", "project_world_location", "project_world_atmosphere", 
-                             "characters_info", "outline_order_index", "outline_title", "outline_content", 
-                             "context_info", "previous_context", "strategy_instruction", "start_index", 
-                             "end_index", "target_chapter_count", "scene_instruction", "scene_field"]
-            },
-            "MCP_TOOL_TEST": {
-                "name": "MCP工具测试(用户提示词)",
-                "category": "MCP测试",
-                "description": "用于测试MCP插件功能的用户提示词",
-                "parameters": ["plugin_name"]
-            },
-            "MCP_TOOL_TEST_SYSTEM": {
-                "name": "MCP工具测试(系统提示词)",
-                "category": "MCP测试",
-                "description": "用于测试MCP插件功能的系统提示词",
-                "parameters": []
-            },
-            "MCP_WORLD_BUILDING_PLANNING": {
-                "name": "MCP世界观规划",
-                "category": "MCP增强",
-                "description": "使用MCP工具搜索资料辅助世界观设计",
-                "parameters": ["title", "genre", "theme", "description"]
-            },
-            "MCP_CHARACTER_PLANNING": {
-                "name": "MCP角色规划",
-                "category": "MCP增强",
-                "description": "使用MCP工具搜索资料辅助角色设计",
-                "parameters": ["title", "genre", "theme", "time_period", "location"]
-            },
-            "AUTO_CHARACTER_ANALYSIS": {
-                "name": "自动角色分析",
-                "category": "自动角色引入",
-                "description": "分析新生成的大纲，判断是否需要引入新角色",
-                "parameters": ["title", "genre", "theme", "time_period", "location", "atmosphere",
-                             "existing_characters", "new_outlines", "start_chapter", "end_chapter"]
-            },
-            "AUTO_CHARACTER_GENERATION": {
-                "name": "自动角色生成",
-                "category": "自动角色引入",
-                "description": "根据剧情需求自动生成新角色的完整设定",
-                "parameters": ["title", "genre", "theme", "time_period", "location", "atmosphere", "rules",
-                             "existing_characters", "plot_context", "character_specification", "mcp_references"]
-            },
-            "AUTO_ORGANIZATION_ANALYSIS": {
-                "name": "自动组织分析",
-                "category": "自动组织引入",
-                "description": "分析新生成的大纲，判断是否需要引入新组织",
-                "parameters": ["title", "genre", "theme", "time_period", "location", "atmosphere",
-                             "existing_organizations", "existing_characters", "all_chapters_brief", "start_chapter", "chapter_count", "plot_stage", "story_direction"]
-            },
-            "AUTO_ORGANIZATION_GENERATION": {
-                "name": "自动组织生成",
-                "category": "自动组织引入",
-                "description": "根据剧情需求自动生成新组织的完整设定",
-                "parameters": ["title", "genre", "theme", "time_period", "location", "atmosphere", "rules",
-                             "existing_organizations", "existing_characters", "plot_context", "organization_specification", "mcp_references"]
-            },
-            "CAREER_SYSTEM_GENERATION": {
-                "name": "职业体系生成",
-                "category": "世界构建",
-                "description": "根据世界观自动生成完整的职业体系，包括主职业和副职业",
-                "parameters": ["title", "genre", "theme", "time_period", "location", "atmosphere", "rules"]
-            },
-            "INSPIRATION_TITLE_SYSTEM": {
-                "name": "灵感模式-书名生成(系统提示词)",
-                "category": "灵感模式",
-                "description": "根据用户的原始想法生成6个书名建议的系统提示词",
-                "parameters": ["initial_idea"]
-            },
-            "INSPIRATION_TITLE_USER": {
-                "name": "灵感模式-书名生成(用户提示词)",
-                "category": "灵感模式",
-                "description": "根据用户的原始想法生成6个书名建议的用户提示词",
-                "parameters": ["initial_idea"]
-            },
-            "INSPIRATION_DESCRIPTION_SYSTEM": {
-                "name": "灵感模式-简介生成(系统提示词)",
-                "category": "灵感模式",
-                "description": "根据用户想法和书名生成6个简介选项的系统提示词",
-                "parameters": ["initial_idea", "title"]
-            },
-            "INSPIRATION_DESCRIPTION_USER": {
-                "name": "灵感模式-简介生成(用户提示词)",
-                "category": "灵感模式",
-                "description": "根据用户想法和书名生成6个简介选项的用户提示词",
-                "parameters": ["initial_idea", "title"]
-            },
-            "INSPIRATION_THEME_SYSTEM": {
-                "name": "灵感模式-主题生成(系统提示词)",
-                "category": "灵感模式",
-                "description": "根据书名和简介生成6个深刻的主题选项的系统提示词",
-                "parameters": ["initial_idea", "title", "description"]
-            },
-            "INSPIRATION_THEME_USER": {
-                "name": "灵感模式-主题生成(用户提示词)",
-                "category": "灵感模式",
-                "description": "根据书名和简介生成6个深刻的主题选项的用户提示词",
-                "parameters": ["initial_idea", "title", "description"]
-            },
-            "INSPIRATION_GENRE_SYSTEM": {
-                "name": "灵感模式-类型生成(系统提示词)",
-                "category": "灵感模式",
-                "description": "根据小说信息生成6个合适的类型标签的系统提示词",
-                "parameters": ["initial_idea", "title", "description", "theme"]
-            },
-            "INSPIRATION_GENRE_USER": {
-                "name": "灵感模式-类型生成(用户提示词)",
-                "category": "灵感模式",
-                "description": "根据小说信息生成6个合适的类型标签的用户提示词",
-                "parameters": ["initial_idea", "title", "description", "theme"]
-            },
-            "INSPIRATION_QUICK_COMPLETE": {
-                "name": "灵感模式-智能补全",
-                "category": "灵感模式",
-                "description": "根据用户提供的部分信息智能补全完整的小说方案",
-                "parameters": ["existing"]
-            }
-        }
-        
-        for key, info in template_definitions.items():
-            template_content = getattr(cls, key, None)
+        for key, info in _TEMPLATE_DEFINITIONS.items():
+            template_content = _SYSTEM_TEMPLATES.get(key)
             if template_content:
                 templates.append({
                     "template_key": key,
@@ -2636,7 +3056,8 @@ class PromptService:
                     "content": template_content
                 })
         
-        return templates
+        cls._all_templates_cache = templates
+        cls._template_info_index = {t["template_key"]: t for t in templates}
     
     @classmethod
     def get_system_template_info(cls, template_key: str) -> dict:
@@ -2647,13 +3068,17 @@ class PromptService:
             template_key: 模板键名
             
         Returns:
-            模板信息字典
+            模板信息字典的副本，模板不存在时返回None
         """
-        all_templates = cls.get_all_system_templates()
-        for template in all_templates:
-            if template["template_key"] == template_key:
-                return template
-        return None
+        if cls._template_info_index is None:
+            cls._build_system_template_cache()
+        info = cls._template_info_index.get(template_key)
+        return dict(info) if info is not None else None
+
+# 系统默认模板: 模板键名 -> 模板内容（仅包含已登记的模板，避免键名误命中类的其他属性）
+_SYSTEM_TEMPLATES: Dict[str, str] = {
+    key: getattr(PromptService, key) for key in _TEMPLATE_DEFINITIONS
+}
 
 # ========== 全局实例 ==========
 prompt_service = PromptService()
\ No newline at end of file
@@ -1,11 +1,24 @@
 """云端提示词工坊 API 客户端（client 模式使用）"""
+import time
+from dataclasses import dataclass
 import httpx
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from app.config import settings, INSTANCE_ID
 from app.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 列表/详情响应缓存TTL（秒），浏览翻页时短时间内的重复请求直接复用
+_CACHE_TTL = 30
+_CACHE_MAX_ENTRIES = 256
+
+
+@dataclass
+class _ResponseCacheEntry:
+    """云端响应缓存条目"""
+    data: Dict[str, Any]
+    expire_time: float
+
 
 class WorkshopClientError(Exception):
     """工坊客户端错误"""
@@ -18,6 +31,69 @@ class WorkshopClient:
     def __init__(self):
         self.base_url = settings.WORKSHOP_CLOUD_URL
         self.timeout = settings.WORKSHOP_API_TIMEOUT
+        # 始终校验TLS证书；配置了CA证书路径时用它校验（如云端使用自签名证书）
+        self.verify_ssl = settings.WORKSHOP_CA_BUNDLE or True
+        # 长连接客户端，首次请求时创建，复用连接池避免每次请求重新握手
+        self._client: Optional[httpx.AsyncClient] = None
+        # 响应缓存: ("items", ...) / ("item", item_id, user_identifier) -> 缓存条目
+        self._cache: Dict[Tuple, _ResponseCacheEntry] = {}
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """获取或创建 HTTP 客户端"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.base_url}/api/prompt-workshop",
+                timeout=self.timeout,
+                verify=self.verify_ssl,
+                headers={
+                    "X-Instance-ID": INSTANCE_ID,
+                    "Content-Type": "application/json"
+                },
+                limits=httpx.Limits(
+                    max_keepalive_connections=20,
+                    max_connections=50
+                )
+            )
+        return self._client
+    
+    async def aclose(self):
+        """关闭 HTTP 客户端（应用关闭时调用）"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    def _get_cached(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """读取未过期的缓存响应"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry.expire_time:
+            del self._cache[key]
+            return None
+        return entry.data
+    
+    def _set_cached(self, key: Tuple, data: Dict[str, Any]):
+        """写入缓存响应，超出容量时先清理过期条目，仍超出则淘汰最早写入的条目"""
+        now = time.monotonic()
+        if len(self._cache) >= _CACHE_MAX_ENTRIES:
+            for k in [k for k, e in self._cache.items() if now >= e.expire_time]:
+                del self._cache[k]
+            if len(self._cache) >= _CACHE_MAX_ENTRIES:
+                del self._cache[next(iter(self._cache))]
+        self._cache[key] = _ResponseCacheEntry(data=data, expire_time=now + _CACHE_TTL)
+    
+    def invalidate_cache(self, item_id: Optional[str] = None):
+        """
+        使响应缓存失效（点赞、下载等会改变计数的操作后调用）
+        
+        Args:
+            item_id: 提示词ID，为None时清空所有缓存；否则清除该条目详情及所有列表缓存
+        """
+        if item_id is None:
+            self._cache.clear()
+            return
+        for key in [k for k in self._cache if k[0] == "items" or (k[0] == "item" and k[1] == item_id)]:
+            del self._cache[key]
     
     async def _request(
         self,
@@ -28,26 +104,19 @@ class WorkshopClient:
         user_identifier: Optional[str] = None
     ) -> Dict[str, Any]:
         """发送请求到云端"""
-        headers = {
-            "X-Instance-ID": INSTANCE_ID,
-            "Content-Type": "application/json"
-        }
-        if user_identifier:
-            headers["X-User-ID"] = user_identifier
-        
+        headers = {"X-User-ID": user_identifier} if user_identifier else None
         url = f"{self.base_url}/api/prompt-workshop{path}"
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout, verify=False) as client:
-                response = await client.request(
-                    method=method,
-                    url=url,
-                    params=params,
-                    json=json,
-                    headers=headers
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self._get_client().request(
+                method=method,
+                url=path,
+                params=params,
+                json=json,
+                headers=headers
+            )
+            response.raise_for_status()
+            return response.json()
         except httpx.ConnectError as e:
             logger.error(f"无法连接到云端服务: {self.base_url}, 错误: {e}")
             raise WorkshopClientError("无法连接到云端服务，请检查网络连接")
@@ -93,19 +162,37 @@ class WorkshopClient:
         if tags:
             params["tags"] = tags
         
-        return await self._request(
+        # 搜索结果不缓存，避免任意搜索词撑大缓存
+        cache_key = None
+        if not search:
+            cache_key = ("items", category, tags, sort, page, limit, user_identifier)
+            cached = self._get_cached(cache_key)
+            if cached is not None:
+                return cached
+        
+        result = await self._request(
             "GET", "/items",
             params=params,
             user_identifier=user_identifier
         )
+        if cache_key is not None:
+            self._set_cached(cache_key, result)
+        return result
     
     async def get_item(self, item_id: str, user_identifier: Optional[str] = None) -> Dict:
         """获取单个提示词详情"""
-        return await self._request("GET", f"/items/{item_id}", user_identifier=user_identifier)
+        cache_key = ("item", item_id, user_identifier)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
+        result = await self._request("GET", f"/items/{item_id}", user_identifier=user_identifier)
+        self._set_cached(cache_key, result)
+        return result
     
     async def record_download(self, item_id: str, user_identifier: str) -> Dict:
         """记录下载"""
-        return await self._request(
+        result = await self._request(
             "POST",
             f"/items/{item_id}/download",
             json={
@@ -114,14 +201,18 @@ class WorkshopClient:
             },
             user_identifier=user_identifier
         )
+        self.invalidate_cache(item_id)
+        return result
     
     async def toggle_like(self, item_id: str, user_identifier: str) -> Dict:
         """点赞/取消点赞"""
-        return await self._request(
+        result = await self._request(
             "POST",
             f"/items/{item_id}/like",
             user_identifier=user_identifier
         )
+        self.invalidate_cache(item_id)
+        return result
     
     async def submit(
         self,
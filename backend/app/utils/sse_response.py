@@ -1,15 +1,56 @@
 """Server-Sent Events (SSE) 响应工具类"""
 import json
 import asyncio
+from contextlib import aclosing
 from enum import Enum
-from typing import AsyncGenerator, Dict, Any, Optional, Callable
+from typing import AsyncGenerator, Dict, Any, Optional, Callable, Tuple
 from dataclasses import dataclass
 from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from app.logger import get_logger
 
+try:
+    import orjson
+except ImportError:  # orjson 由 chromadb 间接引入，缺失时退回标准库
+    orjson = None
+
 logger = get_logger(__name__)
 
 
+def _json_default(obj: Any) -> Any:
+    """序列化标准JSON不支持的对象（Pydantic模型转为字典）"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """序列化SSE数据负载为UTF-8字节（优先使用orjson，非ASCII字符不转义）"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_json_default, option=_ORJSON_OPTIONS)
+    return json.dumps(data, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+# 固定内容的SSE帧，模块加载时编码一次后直接复用
+_DONE_FRAME = b"data: " + _dumps({"type": "done"}) + b"\n\n"
+_HEARTBEAT_FRAME = b": heartbeat\n\n"
+_START_FRAME = b"data: " + _dumps({
+    "type": "progress",
+    "message": "开始生成...",
+    "progress": 0,
+    "status": "processing"
+}) + b"\n\n"
+
+# chunk/progress 帧的固定前后缀，只需对可变字段单独序列化
+_CHUNK_PREFIX = b'data: {"type":"chunk","content":'
+_PROGRESS_PREFIX = b'data: {"type":"progress","message":'
+_FRAME_SUFFIX = b"}\n\n"
+
+
 class ProgressStage(Enum):
     """标准化进度阶段枚举"""
     # 初始化阶段 (0-5%)
@@ -28,7 +69,7 @@ class ProgressStage(Enum):
     COMPLETE = "complete"
 
 
-@dataclass
+@dataclass(slots=True)
 class StageConfig:
     """阶段配置"""
     start: int  # 起始进度
@@ -47,6 +88,16 @@ STAGE_CONFIGS: Dict[ProgressStage, StageConfig] = {
     ProgressStage.COMPLETE: StageConfig(100, 100, "完成!"),
 }
 
+# 预计算各阶段的 (起始进度, 跨度) 与默认消息，避免生成阶段逐块重复计算
+_STAGE_RANGE: Dict[ProgressStage, Tuple[int, int]] = {
+    stage: (config.start, config.end - config.start)
+    for stage, config in STAGE_CONFIGS.items()
+}
+_STAGE_DEFAULT_MESSAGE: Dict[ProgressStage, str] = {
+    stage: config.default_message
+    for stage, config in STAGE_CONFIGS.items()
+}
+
 
 class WizardProgressTracker:
     """
@@ -54,16 +105,21 @@ class WizardProgressTracker:
     
     使用示例:
         tracker = WizardProgressTracker("世界观")
-        yield await tracker.start()
-        yield await tracker.loading("加载项目信息")
-        yield await tracker.preparing()
+        yield tracker.start()
+        yield tracker.loading("加载项目信息")
+        yield tracker.preparing()
         async for chunk in ai_stream:
-            yield await tracker.generating_chunk(chunk, len(accumulated))
-        yield await tracker.parsing()
-        yield await tracker.saving("保存世界观数据")
-        yield await tracker.complete()
+            yield tracker.generating_chunk(chunk)
+        yield tracker.parsing()
+        yield tracker.saving("保存世界观数据")
+        yield tracker.complete()
     """
     
+    __slots__ = (
+        "task_name", "current_stage", "current_progress",
+        "_last_generating_progress", "_generating_prefix"
+    )
+    
     def __init__(self, task_name: str = "任务"):
         """
         初始化进度追踪器
@@ -75,6 +131,7 @@ class WizardProgressTracker:
         self.current_stage = ProgressStage.INIT
         self.current_progress = 0
         self._last_generating_progress = 20  # 生成阶段的最后进度值
+        self._generating_prefix = f"生成{task_name}中... ("  # 生成阶段默认消息的固定前缀
     
     def _get_stage_progress(
         self,
@@ -91,44 +148,44 @@ class WizardProgressTracker:
         Returns:
             总进度值 (0-100)
         """
-        config = STAGE_CONFIGS[stage]
+        start, span = _STAGE_RANGE[stage]
         if sub_progress <= 0:
-            return config.start
+            return start
         if sub_progress >= 1:
-            return config.end
-        return config.start + int((config.end - config.start) * sub_progress)
+            return start + span
+        return start + int(span * sub_progress)
     
-    async def start(self, message: str = None) -> str:
+    def start(self, message: str = None) -> bytes:
         """开始阶段"""
         self.current_stage = ProgressStage.INIT
         self.current_progress = 0
         msg = message or f"开始生成{self.task_name}..."
-        return await SSEResponse.send_progress(msg, 0, "processing")
+        return SSEResponse.send_progress(msg, 0, "processing")
     
-    async def loading(self, message: str = None, sub_progress: float = 0.5) -> str:
+    def loading(self, message: str = None, sub_progress: float = 0.5) -> bytes:
         """加载数据阶段"""
         self.current_stage = ProgressStage.LOADING
         progress = self._get_stage_progress(ProgressStage.LOADING, sub_progress)
         self.current_progress = progress
-        msg = message or STAGE_CONFIGS[ProgressStage.LOADING].default_message
-        return await SSEResponse.send_progress(msg, progress, "processing")
+        msg = message or _STAGE_DEFAULT_MESSAGE[ProgressStage.LOADING]
+        return SSEResponse.send_progress(msg, progress, "processing")
     
-    async def preparing(self, message: str = None) -> str:
+    def preparing(self, message: str = None) -> bytes:
         """准备提示词阶段"""
         self.current_stage = ProgressStage.PREPARING
         progress = self._get_stage_progress(ProgressStage.PREPARING, 0.5)
         self.current_progress = progress
-        msg = message or STAGE_CONFIGS[ProgressStage.PREPARING].default_message
-        return await SSEResponse.send_progress(msg, progress, "processing")
+        msg = message or _STAGE_DEFAULT_MESSAGE[ProgressStage.PREPARING]
+        return SSEResponse.send_progress(msg, progress, "processing")
     
-    async def generating(
+    def generating(
         self,
         current_chars: int = 0,
         estimated_total: int = 5000,
         message: str = None,
         retry_count: int = 0,
         max_retries: int = 3
-    ) -> str:
+    ) -> bytes:
         """
         AI生成阶段进度更新
         
@@ -146,80 +203,80 @@ class WizardProgressTracker:
         progress = self._get_stage_progress(ProgressStage.GENERATING, sub_progress)
         
         # 确保进度单调递增
-        if progress < self._last_generating_progress:
-            progress = self._last_generating_progress
-        else:
-            self._last_generating_progress = progress
+        progress = self._last_generating_progress = max(progress, self._last_generating_progress)
         
         self.current_progress = progress
         
-        # 构建消息
-        retry_suffix = f" (重试 {retry_count}/{max_retries})" if retry_count > 0 else ""
-        if message:
-            msg = f"{message}{retry_suffix}"
+        # 构建消息（无重试时直接拼接固定前缀）
+        if retry_count > 0:
+            retry_suffix = f" (重试 {retry_count}/{max_retries})"
+            if message:
+                msg = f"{message}{retry_suffix}"
+            else:
+                msg = f"{self._generating_prefix}{current_chars}字符){retry_suffix}"
         else:
-            msg = f"生成{self.task_name}中... ({current_chars}字符){retry_suffix}"
+            msg = message or f"{self._generating_prefix}{current_chars}字符)"
         
-        return await SSEResponse.send_progress(msg, progress, "processing")
+        return SSEResponse.send_progress(msg, progress, "processing")
     
-    async def generating_chunk(self, chunk: str) -> str:
+    def generating_chunk(self, chunk: str) -> bytes:
         """发送生成的内容块"""
-        return await SSEResponse.send_chunk(chunk)
+        return SSEResponse.send_chunk(chunk)
     
-    async def parsing(self, message: str = None, sub_progress: float = 0.5) -> str:
+    def parsing(self, message: str = None, sub_progress: float = 0.5) -> bytes:
         """解析数据阶段"""
         self.current_stage = ProgressStage.PARSING
         progress = self._get_stage_progress(ProgressStage.PARSING, sub_progress)
         self.current_progress = progress
         msg = message or f"解析{self.task_name}数据..."
-        return await SSEResponse.send_progress(msg, progress, "processing")
+        return SSEResponse.send_progress(msg, progress, "processing")
     
-    async def saving(self, message: str = None, sub_progress: float = 0.5) -> str:
+    def saving(self, message: str = None, sub_progress: float = 0.5) -> bytes:
         """保存数据阶段"""
         self.current_stage = ProgressStage.SAVING
         progress = self._get_stage_progress(ProgressStage.SAVING, sub_progress)
         self.current_progress = progress
         msg = message or f"保存{self.task_name}到数据库..."
-        return await SSEResponse.send_progress(msg, progress, "processing")
+        return SSEResponse.send_progress(msg, progress, "processing")
     
-    async def complete(self, message: str = None) -> str:
+    def complete(self, message: str = None) -> bytes:
         """完成阶段"""
         self.current_stage = ProgressStage.COMPLETE
         self.current_progress = 100
         msg = message or f"{self.task_name}生成完成!"
-        return await SSEResponse.send_progress(msg, 100, "success")
+        return SSEResponse.send_progress(msg, 100, "success")
     
-    async def warning(self, message: str) -> str:
+    def warning(self, message: str) -> bytes:
         """发送警告消息（保持当前进度）"""
-        return await SSEResponse.send_progress(
+        return SSEResponse.send_progress(
             f"⚠️ {message}",
             self.current_progress,
             "warning"
         )
     
-    async def retry(self, retry_count: int, max_retries: int, reason: str = "准备重试") -> str:
+    def retry(self, retry_count: int, max_retries: int, reason: str = "准备重试") -> bytes:
         """发送重试消息"""
-        return await SSEResponse.send_progress(
+        return SSEResponse.send_progress(
             f"⚠️ {reason}... ({retry_count}/{max_retries})",
             self.current_progress,
             "warning"
         )
     
-    async def error(self, error_message: str, code: int = 500) -> str:
+    def error(self, error_message: str, code: int = 500) -> bytes:
         """发送错误消息"""
-        return await SSEResponse.send_error(error_message, code)
+        return SSEResponse.send_error(error_message, code)
     
-    async def result(self, data: Dict[str, Any]) -> str:
+    def result(self, data: Dict[str, Any]) -> bytes:
         """发送结果数据"""
-        return await SSEResponse.send_result(data)
+        return SSEResponse.send_result(data)
     
-    async def done(self) -> str:
+    def done(self) -> bytes:
         """发送完成信号"""
-        return await SSEResponse.send_done()
+        return SSEResponse.send_done()
     
-    async def heartbeat(self) -> str:
+    def heartbeat(self) -> bytes:
         """发送心跳"""
-        return await SSEResponse.send_heartbeat()
+        return SSEResponse.send_heartbeat()
     
     def reset_generating_progress(self):
         """重置生成阶段进度（用于重试时）"""
@@ -230,7 +287,7 @@ class SSEResponse:
     """SSE响应构建器"""
     
     @staticmethod
-    def format_sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    def format_sse(data: Dict[str, Any], event: Optional[str] = None) -> bytes:
         """
         格式化SSE消息
         
@@ -239,31 +296,31 @@ class SSEResponse:
             event: 事件类型(可选)
             
         Returns:
-            格式化后的SSE消息字符串
+            格式化后的SSE消息字节串（UTF-8），StreamingResponse可直接写出无需再编码
         """
         try:
-            message = ""
             if event:
-                message += f"event: {event}\n"
-            message += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-            return message
+                return b"".join((b"event: ", event.encode("utf-8"), b"\ndata: ", _dumps(data), b"\n\n"))
+            return b"".join((b"data: ", _dumps(data), b"\n\n"))
         except Exception as e:
             logger.error(f"❌ SSE格式化失败: {type(e).__name__}: {e}")
             logger.error(f"   data类型: {type(data)}")
             logger.error(f"   data内容: {str(data)[:500]}")
-            # 返回错误消息而不是崩溃
-            error_message = ""
+            # 返回错误消息而不是崩溃（错误文本单独序列化，保证引号等字符正确转义）
+            payload = json.dumps(
+                {"type": "error", "error": f"SSE格式化失败: {e}", "code": 500},
+                ensure_ascii=False
+            ).encode("utf-8")
             if event:
-                error_message += f"event: {event}\n"
-            error_message += f'data: {{"type": "error", "error": "SSE格式化失败: {str(e)}", "code": 500}}\n\n'
-            return error_message
+                return b"".join((b"event: ", event.encode("utf-8"), b"\ndata: ", payload, b"\n\n"))
+            return b"".join((b"data: ", payload, b"\n\n"))
     
     @staticmethod
-    async def send_progress(
+    def send_progress(
         message: str,
         progress: int,
         status: str = "processing"
-    ) -> str:
+    ) -> bytes:
         """
         发送进度消息
         
@@ -272,28 +329,40 @@ class SSEResponse:
             progress: 进度百分比(0-100)
             status: 状态(processing/success/error)
         """
-        return SSEResponse.format_sse({
-            "type": "progress",
-            "message": message,
-            "progress": progress,
-            "status": status
-        })
+        try:
+            # 固定结构的帧只序列化可变字段，省去整个字典的编码
+            return b"".join((
+                _PROGRESS_PREFIX, _dumps(message),
+                b',"progress":', _dumps(progress),
+                b',"status":', _dumps(status),
+                _FRAME_SUFFIX
+            ))
+        except Exception:
+            return SSEResponse.format_sse({
+                "type": "progress",
+                "message": message,
+                "progress": progress,
+                "status": status
+            })
     
     @staticmethod
-    async def send_chunk(content: str) -> str:
+    def send_chunk(content: str) -> bytes:
         """
         发送内容块(用于流式输出AI生成内容)
         
         Args:
             content: 内容块
         """
-        return SSEResponse.format_sse({
-            "type": "chunk",
-            "content": content
-        })
+        try:
+            return b"".join((_CHUNK_PREFIX, _dumps(content), _FRAME_SUFFIX))
+        except Exception:
+            return SSEResponse.format_sse({
+                "type": "chunk",
+                "content": content
+            })
     
     @staticmethod
-    async def send_result(data: Dict[str, Any]) -> str:
+    def send_result(data: Dict[str, Any]) -> bytes:
         """
         发送最终结果
         
@@ -306,7 +375,7 @@ class SSEResponse:
         })
     
     @staticmethod
-    async def send_event(event: str, data: Dict[str, Any]) -> str:
+    def send_event(event: str, data: Dict[str, Any]) -> bytes:
         """
         发送自定义事件类型的SSE消息
         
@@ -317,7 +386,7 @@ class SSEResponse:
         return SSEResponse.format_sse(data, event=event)
     
     @staticmethod
-    async def send_error(error: str, code: int = 500) -> str:
+    def send_error(error: str, code: int = 500) -> bytes:
         """
         发送错误消息
         
@@ -332,63 +401,227 @@ class SSEResponse:
         })
     
     @staticmethod
-    async def send_done() -> str:
+    def send_done() -> bytes:
         """发送完成消息"""
-        return SSEResponse.format_sse({
-            "type": "done"
-        })
+        return _DONE_FRAME
     
     @staticmethod
-    async def send_heartbeat() -> str:
+    def send_heartbeat() -> bytes:
         """发送心跳消息(保持连接活跃)"""
-        return ": heartbeat\n\n"
+        return _HEARTBEAT_FRAME
+
+
+# 上游生成结束标记
+_STREAM_END = object()
+
+
+@dataclass(slots=True)
+class _StreamError:
+    """上游生成器抛出的异常，经队列转交给消费端"""
+    error: Exception
+
+
+async def _drain_into_queue(async_gen: AsyncGenerator[str, None], queue: asyncio.Queue) -> None:
+    """
+    读取上游生成器并写入队列（生产者）
+    
+    Args:
+        async_gen: 上游异步生成器
+        queue: 内容块队列，结束时写入 _STREAM_END，出错时写入 _StreamError
+    """
+    try:
+        async for chunk in async_gen:
+            await queue.put(chunk)
+    except Exception as e:
+        await queue.put(_StreamError(e))
+        return
+    await queue.put(_STREAM_END)
+
+
+async def _coalesce(
+    async_gen: AsyncGenerator[str, None],
+    batch_ms: int,
+    batch_chars: int,
+    queue_size: int,
+    ping_interval: float = 0
+) -> AsyncGenerator[Optional[str], None]:
+    """
+    合并上游文本块（batch_text_stream 与 create_sse_generator 的共同实现）
+    
+    上游由后台任务读取并写入有界队列，下游处理时上游可继续生成，队列满时才等待下游。
+    
+    Yields:
+        合并后的文本；ping_interval > 0 且连接空闲超过该时长时产出 None
+    """
+    loop = asyncio.get_running_loop()
+    batch_interval = batch_ms / 1000
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    producer = asyncio.create_task(_drain_into_queue(async_gen, queue))
+    
+    buffer: list = []
+    buffer_len = 0
+    last_flush = last_sent = loop.time()
+    
+    try:
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                # 有缓冲内容时，最多等待到本批次的发送截止时间；否则等待到下次心跳时间
+                timeout = None
+                if buffer:
+                    timeout = max(batch_interval - (loop.time() - last_flush), 0)
+                elif ping_interval > 0:
+                    timeout = max(ping_interval - (loop.time() - last_sent), 0)
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    if buffer:
+                        # 上游暂时没有新内容，先发送已缓冲的内容
+                        text = "".join(buffer)
+                        buffer.clear()
+                        buffer_len = 0
+                        last_flush = loop.time()
+                        yield text
+                    else:
+                        yield None
+                    last_sent = loop.time()
+                    continue
+            
+            if item is _STREAM_END:
+                break
+            if isinstance(item, _StreamError):
+                # 先交出已缓冲的内容，再抛出上游异常
+                if buffer:
+                    text = "".join(buffer)
+                    buffer.clear()
+                    yield text
+                raise item.error
+            
+            if not buffer:
+                last_flush = loop.time()
+            buffer.append(item)
+            buffer_len += len(item)
+            
+            if (
+                batch_interval <= 0
+                or buffer_len >= batch_chars
+                or loop.time() - last_flush >= batch_interval
+            ):
+                text = "".join(buffer)
+                buffer.clear()
+                buffer_len = 0
+                last_flush = last_sent = loop.time()
+                yield text
+        
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        # 下游提前结束（客户端断开、异常）时停止读取上游，并关闭上游生成器，
+        # 使其 finally 块（释放连接等）立即执行，而不是等到被垃圾回收
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+        await async_gen.aclose()
+
+
+def batch_text_stream(
+    async_gen: AsyncGenerator[str, None],
+    batch_ms: int = 50,
+    batch_chars: int = 512,
+    queue_size: int = 32,
+    ping_interval: float = 15
+) -> AsyncGenerator[Optional[str], None]:
+    """
+    合并高频的AI文本流，减少下游逐块编码和写出SSE帧的次数
+    
+    上游的内容块先缓冲，累计达到 batch_chars 个字符或距上次输出超过
+    batch_ms 毫秒时合并输出；上游出错时先输出已缓冲的内容再抛出异常。
+    上游超过 ping_interval 秒没有任何输出时产出 None，调用方据此发送心跳，
+    内容持续输出时不会产出 None。
+    
+    Args:
+        async_gen: 上游文本生成器（如 AIService.generate_text_stream）
+        batch_ms: 最长缓冲时间(毫秒)，<=0 时不合并，逐块输出
+        batch_chars: 缓冲字符数上限，达到后立即输出
+        queue_size: 上游与下游之间的队列容量
+        ping_interval: 空闲心跳间隔(秒)，<=0 时不产出 None
+        
+    Returns:
+        产出合并后文本块（空闲时为 None）的异步生成器
+    """
+    # 直接返回内部生成器而不是再包一层 async for：调用方关闭时 _coalesce 的 finally
+    # （取消生产者、关闭上游）会立即执行，而不是等到被垃圾回收
+    return _coalesce(async_gen, batch_ms, batch_chars, queue_size, ping_interval)
 
 
 async def create_sse_generator(
     async_gen: AsyncGenerator[str, None],
-    show_progress: bool = True
-) -> AsyncGenerator[str, None]:
+    show_progress: bool = True,
+    batch_ms: int = 50,
+    batch_chars: int = 512,
+    ping_interval: float = 15,
+    queue_size: int = 32
+) -> AsyncGenerator[bytes, None]:
     """
     创建SSE生成器包装器
     
+    内容块按 batch_text_stream 的规则合并后作为chunk事件发送；
+    心跳只在连接空闲超过 ping_interval 秒时发送，内容持续输出时不额外发送。
+    
     Args:
         async_gen: 异步生成器
         show_progress: 是否显示进度
+        batch_ms: 最长缓冲时间(毫秒)，<=0 时不合并，逐块发送
+        batch_chars: 缓冲字符数上限，达到后立即发送
+        ping_interval: 空闲心跳间隔(秒)，<=0 时不发送心跳
+        queue_size: 上游与发送端之间的队列容量
         
     Yields:
-        格式化的SSE消息
+        格式化的SSE消息(bytes)
     """
     try:
         if show_progress:
-            yield await SSEResponse.send_progress("开始生成...", 0)
+            yield _START_FRAME
         
-        # 累积内容用于进度计算
-        accumulated_content = ""
-        chunk_count = 0
-        
-        async for chunk in async_gen:
-            chunk_count += 1
-            accumulated_content += chunk
-            
-            # 发送内容块
-            yield await SSEResponse.send_chunk(chunk)
-            
-            # 每10个块发送一次心跳
-            if chunk_count % 10 == 0:
-                yield await SSEResponse.send_heartbeat()
+        # aclosing 保证本生成器被关闭时内部生成器同步关闭，及时释放上游
+        async with aclosing(
+            _coalesce(async_gen, batch_ms, batch_chars, queue_size, ping_interval)
+        ) as items:
+            async for item in items:
+                if item is None:
+                    # 连接空闲，发送心跳保持连接
+                    yield _HEARTBEAT_FRAME
+                else:
+                    yield SSEResponse.send_chunk(item)
         
         if show_progress:
-            yield await SSEResponse.send_progress("生成完成", 100, "success")
+            yield SSEResponse.send_progress("生成完成", 100, "success")
         
         # 发送完成信号
-        yield await SSEResponse.send_done()
+        yield SSEResponse.send_done()
         
     except Exception as e:
         logger.error(f"SSE生成器错误: {str(e)}")
-        yield await SSEResponse.send_error(str(e))
+        yield SSEResponse.send_error(str(e))
+
+
+# SSE响应的媒体类型和响应头（StreamingResponse 会复制响应头，可安全共享）
+_SSE_MEDIA_TYPE = "text/event-stream; charset=utf-8"  # 明确指定charset
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache, no-transform",  # 禁用缓存和转换
+    # 移除 Connection: keep-alive (HTTP/2不兼容)
+    "X-Accel-Buffering": "no",  # 禁用nginx缓冲
+    "Access-Control-Allow-Origin": "*",  # CORS支持
+    "Access-Control-Allow-Methods": "POST, GET, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, Authorization",
+}
 
 
-def create_sse_response(generator: AsyncGenerator[str, None]) -> StreamingResponse:
+def create_sse_response(generator: AsyncGenerator[bytes, None]) -> StreamingResponse:
     """
     创建SSE StreamingResponse - 兼容HTTP/2协议
     
@@ -403,25 +636,10 @@ def create_sse_response(generator: AsyncGenerator[str, None]) -> StreamingRespon
     - 明确指定charset=utf-8以确保编码正确
     - 添加CORS头以支持跨域请求
     """
-    async def wrapper():
-        """包装生成器以捕获StreamingResponse初始化时的GeneratorExit"""
-        try:
-            async for chunk in generator:
-                yield chunk
-        except GeneratorExit:
-            # StreamingResponse在初始化时会进行类型检查，导致GeneratorExit
-            # 这是正常行为，不需要记录警告
-            pass
-    
+    # StreamingResponse 初始化时只保存迭代器，直接传入生成器，
+    # 客户端断开时 aclose() 能直接到达端点生成器自身的 GeneratorExit 处理
     return StreamingResponse(
-        wrapper(),
-        media_type="text/event-stream; charset=utf-8",  # 明确指定charset
-        headers={
-            "Cache-Control": "no-cache, no-transform",  # 禁用缓存和转换
-            # 移除 Connection: keep-alive (HTTP/2不兼容)
-            "X-Accel-Buffering": "no",  # 禁用nginx缓冲
-            "Access-Control-Allow-Origin": "*",  # CORS支持
-            "Access-Control-Allow-Methods": "POST, GET, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
-        }
-    )
\ No newline at end of file
+        generator,
+        media_type=_SSE_MEDIA_TYPE,
+        headers=_SSE_HEADERS
+    )
@@ -92,6 +92,7 @@ cd /app
 exec uvicorn app.main:app \
     --host "${APP_HOST:-0.0.0.0}" \
     --port "${APP_PORT:-8000}" \
+    --loop uvloop \
     --log-level info \
     --access-log \
     --use-colors
\ No newline at end of file
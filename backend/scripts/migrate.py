@@ -3,10 +3,13 @@
 数据库自动迁移脚本
 用于开发和生产环境的数据库迁移管理
 """
-import subprocess
 import sys
 import os
 from pathlib import Path
+from typing import Callable, Optional
+
+from alembic import command
+from alembic.config import Config
 
 # 添加项目路径
 project_root = Path(__file__).parent.parent
@@ -16,31 +19,32 @@ from app.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Alembic 配置（进程内只加载一次，多个命令共用）
+_alembic_config: Optional[Config] = None
+
+
+def get_alembic_config() -> Config:
+    """获取 Alembic 配置（与命令行一致，默认读取项目根目录下的 alembic.ini）"""
+    global _alembic_config
+    if _alembic_config is None:
+        config_path = os.environ.get("ALEMBIC_CONFIG", str(project_root / "alembic.ini"))
+        _alembic_config = Config(config_path)
+    return _alembic_config
 
-def run_command(cmd: list, description: str) -> bool:
-    """运行命令并返回是否成功"""
+
+def run_command(func: Callable, description: str, *args, **kwargs) -> bool:
+    """在当前进程内执行 Alembic 命令并返回是否成功"""
     try:
         logger.info(f"🚀 {description}...")
-        result = subprocess.run(
-            cmd,
-            cwd=project_root,
-            capture_output=True,
-            text=True,
-            check=False
-        )
-        
-        if result.returncode == 0:
-            logger.info(f"✅ {description}成功")
-            if result.stdout:
-                print(result.stdout)
-            return True
-        else:
-            logger.error(f"❌ {description}失败")
-            if result.stderr:
-                print(result.stderr, file=sys.stderr)
-            return False
+        try:
+            func(get_alembic_config(), *args, **kwargs)
+        finally:
+            # env.py 中的 fileConfig 会禁用已存在的 logger，恢复本脚本的日志输出
+            logger.disabled = False
+        logger.info(f"✅ {description}成功")
+        return True
     except Exception as e:
-        logger.error(f"❌ {description}异常: {e}")
+        logger.error(f"❌ {description}失败: {e}")
         return False
 
 
@@ -51,44 +55,37 @@ def create_migration(message: str = None):
         if not message:
             message = "auto_migration"
     
-    cmd = ["alembic", "revision", "--autogenerate", "-m", message]
-    return run_command(cmd, f"生成迁移: {message}")
+    return run_command(command.revision, f"生成迁移: {message}", message=message, autogenerate=True)
 
 
 def upgrade_database(revision: str = "head"):
     """升级数据库到指定版本"""
-    cmd = ["alembic", "upgrade", revision]
-    return run_command(cmd, f"升级数据库到: {revision}")
+    return run_command(command.upgrade, f"升级数据库到: {revision}", revision)
 
 
 def downgrade_database(revision: str = "-1"):
     """降级数据库到指定版本"""
-    cmd = ["alembic", "downgrade", revision]
-    return run_command(cmd, f"降级数据库到: {revision}")
+    return run_command(command.downgrade, f"降级数据库到: {revision}", revision)
 
 
 def show_current():
     """显示当前数据库版本"""
-    cmd = ["alembic", "current"]
-    return run_command(cmd, "查看当前版本")
+    return run_command(command.current, "查看当前版本")
 
 
 def show_history():
     """显示迁移历史"""
-    cmd = ["alembic", "history", "--verbose"]
-    return run_command(cmd, "查看迁移历史")
+    return run_command(command.history, "查看迁移历史", verbose=True)
 
 
 def show_heads():
     """显示最新版本"""
-    cmd = ["alembic", "heads"]
-    return run_command(cmd, "查看最新版本")
+    return run_command(command.heads, "查看最新版本")
 
 
 def stamp_database(revision: str = "head"):
     """标记数据库版本（不执行迁移）"""
-    cmd = ["alembic", "stamp", revision]
-    return run_command(cmd, f"标记数据库版本: {revision}")
+    return run_command(command.stamp, f"标记数据库版本: {revision}", revision)
 
 
 def auto_migrate():
@@ -149,32 +146,35 @@ def main():
         print("  python migrate.py init               - 初始化数据库")
         sys.exit(1)
     
-    command = sys.argv[1]
+    # 与原先在项目根目录执行 alembic 命令保持一致（相对路径的 script_location、.env 等）
+    os.chdir(project_root)
+    
+    action = sys.argv[1]
     
-    if command == "create":
+    if action == "create":
         message = sys.argv[2] if len(sys.argv) > 2 else None
         success = create_migration(message)
-    elif command == "upgrade":
+    elif action == "upgrade":
         revision = sys.argv[2] if len(sys.argv) > 2 else "head"
         success = upgrade_database(revision)
-    elif command == "downgrade":
+    elif action == "downgrade":
         revision = sys.argv[2] if len(sys.argv) > 2 else "-1"
         success = downgrade_database(revision)
-    elif command == "current":
+    elif action == "current":
         success = show_current()
-    elif command == "history":
+    elif action == "history":
         success = show_history()
-    elif command == "heads":
+    elif action == "heads":
         success = show_heads()
-    elif command == "stamp":
+    elif action == "stamp":
         revision = sys.argv[2] if len(sys.argv) > 2 else "head"
         success = stamp_database(revision)
-    elif command == "auto":
+    elif action == "auto":
         success = auto_migrate()
-    elif command == "init":
+    elif action == "init":
         success = init_database()
     else:
-        logger.error(f"❌ 未知命令: {command}")
+        logger.error(f"❌ 未知命令: {action}")
         success = False
     
     sys.exit(0 if success else 1)
@@ -10,34 +10,39 @@ PostgreSQL 数据库自动设置脚本
 
 使用方法:
     python backend/scripts/setup_postgres.py
+    python backend/scripts/setup_postgres.py --help     # 查看命令行参数
+
+    PGHOST/PGPORT/PGUSER/PGPASSWORD/POSTGRES_DB/POSTGRES_USER/POSTGRES_PASSWORD
+    环境变量各自生效（命令行参数优先），已提供的项不再询问；两个密码都已提供时跳过交互输入；
+    也可通过 --non-interactive 配合 PGPASSWORD 或 --admin-password-file 等参数无人值守运行
+    非交互且未指定 --yes 时，若目标数据库已迁移到最新版本则只更新 .env，跳过其余步骤
 
 前置条件:
     - PostgreSQL服务已安装并运行
     - 知道PostgreSQL的超级用户密码（通常是postgres用户）
 """
+import os
+import re
 import sys
 import asyncio
+import tempfile
+import argparse
+from dataclasses import dataclass, asdict
 from pathlib import Path
 from getpass import getpass
+from typing import Optional
 import logging
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-try:
-    import psycopg2
-    from psycopg2 import sql
-    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-except ImportError:
-    print("❌ 缺少psycopg2依赖，正在安装...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "psycopg2-binary"])
-    import psycopg2
-    from psycopg2 import sql
-    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+import asyncpg
 
 # 注意: 表结构应由 Alembic 管理
-from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from alembic.util import CommandError
 
 # 设置日志
 logging.basicConfig(
@@ -46,6 +51,160 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 项目根目录（backend/）
+_PROJECT_ROOT = Path(__file__).parent.parent
+
+# 数据库用户的默认密码（命令行/环境变量/交互输入均未提供时使用）
+_DEFAULT_DB_PASSWORD = "mumuai123"
+
+# .env 中的 DATABASE_URL 配置行
+_DATABASE_URL_LINE = re.compile(r"^DATABASE_URL=.*$", re.MULTILINE)
+
+
+def _parse_port(value: str) -> int:
+    """解析并校验端口号，无效时抛出 ValueError"""
+    try:
+        port = int(value, 10)
+    except ValueError:
+        port = 0
+    if not 1 <= port <= 65535:
+        raise ValueError(f"端口必须是 1-65535 之间的整数: {value!r}")
+    return port
+
+
+# 配置字段 -> 环境变量
+_ENV_VARS = {
+    "host": "PGHOST",
+    "port": "PGPORT",
+    "admin_user": "PGUSER",
+    "admin_password": "PGPASSWORD",
+    "db_name": "POSTGRES_DB",
+    "db_user": "POSTGRES_USER",
+    "db_password": "POSTGRES_PASSWORD",
+}
+
+
+@dataclass(slots=True)
+class SetupConfig:
+    """设置参数（来自命令行参数、环境变量或交互输入）"""
+    host: str = "localhost"
+    port: int = 5432
+    admin_user: str = "postgres"
+    admin_password: Optional[str] = None
+    db_name: str = "mumuai_novel"
+    db_user: str = "mumuai"
+    db_password: str = _DEFAULT_DB_PASSWORD
+    
+    def apply_env(self) -> set:
+        """
+        用环境变量覆盖配置，用于重复执行或CI等非交互场景（各变量独立生效）
+        
+        管理员连接使用 libpq 标准变量 PGHOST/PGPORT/PGUSER/PGPASSWORD，
+        目标数据库使用 POSTGRES_DB/POSTGRES_USER/POSTGRES_PASSWORD（与 .env.example 一致）
+        
+        Returns:
+            已由环境变量提供的字段名集合（交互模式下不再询问）
+        
+        Raises:
+            ValueError: PGPORT 不是有效端口
+        """
+        provided = set()
+        for name, env_name in _ENV_VARS.items():
+            value = os.environ.get(env_name)
+            if value:
+                setattr(self, name, _parse_port(value) if name == "port" else value)
+                provided.add(name)
+        return provided
+    
+    def apply_args(self, args: argparse.Namespace) -> set:
+        """
+        用命令行参数覆盖配置
+        
+        Args:
+            args: parse_args() 的解析结果
+        
+        Returns:
+            已由命令行提供的字段名集合（交互模式下不再询问）
+        
+        Raises:
+            OSError: 密码文件读取失败
+        """
+        provided = set()
+        for name in ("host", "port", "admin_user", "db_name", "db_user"):
+            value = getattr(args, name)
+            if value is not None:
+                setattr(self, name, value)
+                provided.add(name)
+        if args.admin_password_file:
+            self.admin_password = _read_secret_file(args.admin_password_file)
+            provided.add("admin_password")
+        if args.db_password_file:
+            self.db_password = _read_secret_file(args.db_password_file)
+            provided.add("db_password")
+        return provided
+
+
+def _alembic_config() -> Config:
+    """
+    加载项目的 Alembic 配置，script_location 解析为绝对路径
+    
+    不依赖当前工作目录，无需切换目录即可在任意位置（包括后台线程中）使用。
+    """
+    config = Config(str(_PROJECT_ROOT / "alembic.ini"))
+    script_location = config.get_main_option("script_location")
+    if script_location and not Path(script_location).is_absolute():
+        config.set_main_option("script_location", str(_PROJECT_ROOT / script_location))
+    return config
+
+
+def _quote_ident(value: str) -> str:
+    """按 PostgreSQL quote_ident 规则引用标识符"""
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _quote_literal(value: str) -> str:
+    """按 PostgreSQL quote_literal 规则引用字符串字面量（含反斜杠时使用 E'' 形式）"""
+    quoted = "'" + value.replace("'", "''") + "'"
+    if "\\" in value:
+        return "E" + quoted.replace("\\", "\\\\")
+    return quoted
+
+
+def _read_secret_file(path: str) -> str:
+    """读取密码文件（去掉末尾换行）"""
+    return Path(path).read_text(encoding="utf-8").rstrip("\r\n")
+
+
+def _port_arg(value: str) -> int:
+    """argparse 的端口参数类型"""
+    try:
+        return _parse_port(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    """解析命令行参数（未提供的参数依次取环境变量、交互输入、默认值）"""
+    parser = argparse.ArgumentParser(description="PostgreSQL 数据库自动设置工具")
+    parser.add_argument("--host", help="主机地址（默认 localhost）")
+    parser.add_argument("--port", type=_port_arg, help="端口（默认 5432）")
+    parser.add_argument("--admin-user", help="管理员用户名（默认 postgres）")
+    parser.add_argument("--admin-password-file", help="从文件读取管理员密码")
+    parser.add_argument("--db-name", help="要创建的数据库名（默认 mumuai_novel）")
+    parser.add_argument("--db-user", help="要创建的用户名（默认 mumuai）")
+    parser.add_argument("--db-password-file", help="从文件读取数据库用户密码")
+    parser.add_argument(
+        "--non-interactive",
+        action="store_true",
+        help="不进行任何交互输入（缺少的参数使用默认值，已有数据库将保留，已是最新版本时跳过设置）"
+    )
+    parser.add_argument(
+        "-y", "--yes",
+        action="store_true",
+        help="自动确认所有询问（包括重置已有用户密码、删除并重建已有数据库）"
+    )
+    return parser.parse_args(argv)
+
 
 class PostgreSQLSetup:
     """PostgreSQL数据库自动设置"""
@@ -58,7 +217,9 @@ class PostgreSQLSetup:
         admin_password: str = None,
         db_name: str = "mumuai_novel",
         db_user: str = "mumuai",
-        db_password: str = "123456"
+        db_password: str = _DEFAULT_DB_PASSWORD,
+        interactive: bool = True,
+        assume_yes: bool = False
     ):
         """
         初始化设置参数
@@ -71,6 +232,8 @@ class PostgreSQLSetup:
             db_name: 要创建的数据库名
             db_user: 要创建的用户名
             db_password: 用户密码
+            interactive: 是否交互询问（否则重置已有用户密码、保留已有数据库）
+            assume_yes: 是否自动确认所有询问
         """
         self.host = host
         self.port = port
@@ -79,26 +242,48 @@ class PostgreSQLSetup:
         self.db_name = db_name
         self.db_user = db_user
         self.db_password = db_password
+        self.interactive = interactive
+        self.assume_yes = assume_yes
+        # DDL 不支持绑定参数，标识符和密码在本地按服务端规则引用一次，各语句直接复用
+        self._user_ident = _quote_ident(db_user)
+        self._db_ident = _quote_ident(db_name)
+        self._password_literal = _quote_literal(db_password)
         self.conn = None
+        # 连接时一次查询得到的用户/数据库存在状态，None 表示需要重新查询
+        self._user_exists = None
+        self._database_exists = None
+        self._database_created = False  # 本次是否新建了数据库（OWNER 已是目标用户）
     
-    def connect_as_admin(self) -> bool:
+    async def connect_as_admin(self) -> bool:
         """连接到PostgreSQL（使用管理员权限）"""
         try:
             logger.info(f"🔌 连接到 PostgreSQL ({self.host}:{self.port})...")
             
-            self.conn = psycopg2.connect(
+            # asyncpg 连接默认不开启事务，CREATE DATABASE 等语句可直接执行
+            self.conn = await asyncpg.connect(
                 host=self.host,
                 port=self.port,
                 user=self.admin_user,
                 password=self.admin_password,
                 database="postgres"  # 连接到默认数据库
             )
-            self.conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            
+            # 用户和数据库的存在检查合并为一次往返
+            row = await self.conn.fetchrow(
+                """
+                SELECT
+                    EXISTS(SELECT 1 FROM pg_user WHERE usename = $1),
+                    EXISTS(SELECT 1 FROM pg_database WHERE datname = $2)
+                """,
+                self.db_user,
+                self.db_name
+            )
+            self._user_exists, self._database_exists = row[0], row[1]
             
             logger.info(f"✅ 已连接到 PostgreSQL")
             return True
             
-        except psycopg2.OperationalError as e:
+        except (OSError, asyncpg.PostgresError) as e:
             logger.error(f"❌ 连接失败: {e}")
             logger.error("\n可能的原因:")
             logger.error("1. PostgreSQL服务未启动")
@@ -107,58 +292,58 @@ class PostgreSQLSetup:
             logger.error("4. pg_hba.conf配置不允许连接")
             return False
     
-    def database_exists(self) -> bool:
+    def _confirm(self, question: str, non_interactive_answer: bool) -> bool:
+        """
+        询问用户确认
+        
+        Args:
+            question: 问题文本
+            non_interactive_answer: 非交互模式下的默认回答
+        """
+        if self.assume_yes:
+            return True
+        if not self.interactive:
+            return non_interactive_answer
+        return input(f"{question} (yes/no): ").lower() in ['yes', 'y']
+    
+    async def database_exists(self) -> bool:
         """检查数据库是否存在"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT 1 FROM pg_database WHERE datname = %s",
-            (self.db_name,)
+        if self._database_exists is not None:
+            return self._database_exists
+        return await self.conn.fetchval(
+            "SELECT EXISTS(SELECT 1 FROM pg_database WHERE datname = $1)",
+            self.db_name
         )
-        exists = cursor.fetchone() is not None
-        cursor.close()
-        return exists
     
-    def user_exists(self) -> bool:
+    async def user_exists(self) -> bool:
         """检查用户是否存在"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT 1 FROM pg_user WHERE usename = %s",
-            (self.db_user,)
+        if self._user_exists is not None:
+            return self._user_exists
+        return await self.conn.fetchval(
+            "SELECT EXISTS(SELECT 1 FROM pg_user WHERE usename = $1)",
+            self.db_user
         )
-        exists = cursor.fetchone() is not None
-        cursor.close()
-        return exists
     
-    def create_user(self) -> bool:
+    async def create_user(self) -> bool:
         """创建数据库用户"""
         try:
-            if self.user_exists():
+            if await self.user_exists():
                 logger.info(f"ℹ️  用户 '{self.db_user}' 已存在")
                 
-                # 询问是否重置密码
-                response = input(f"是否重置用户 '{self.db_user}' 的密码? (yes/no): ")
-                if response.lower() in ['yes', 'y']:
-                    cursor = self.conn.cursor()
-                    cursor.execute(
-                        sql.SQL("ALTER USER {} WITH PASSWORD %s").format(
-                            sql.Identifier(self.db_user)
-                        ),
-                        (self.db_password,)
+                # 询问是否重置密码（非交互模式下直接重置，保证写入.env的连接串可用）
+                if self._confirm(f"是否重置用户 '{self.db_user}' 的密码?", True):
+                    await self.conn.execute(
+                        f"ALTER USER {self._user_ident} WITH PASSWORD {self._password_literal}"
                     )
-                    cursor.close()
                     logger.info(f"✅ 用户密码已更新")
                 
                 return True
             
             logger.info(f"👤 创建用户 '{self.db_user}'...")
-            cursor = self.conn.cursor()
-            cursor.execute(
-                sql.SQL("CREATE USER {} WITH PASSWORD %s").format(
-                    sql.Identifier(self.db_user)
-                ),
-                (self.db_password,)
+            await self.conn.execute(
+                f"CREATE USER {self._user_ident} WITH PASSWORD {self._password_literal}"
             )
-            cursor.close()
+            self._user_exists = True
             logger.info(f"✅ 用户创建成功")
             return True
             
@@ -166,46 +351,39 @@ class PostgreSQLSetup:
             logger.error(f"❌ 创建用户失败: {e}")
             return False
     
-    def create_database(self) -> bool:
+    async def create_database(self) -> bool:
         """创建数据库"""
         try:
-            if self.database_exists():
+            if await self.database_exists():
                 logger.info(f"ℹ️  数据库 '{self.db_name}' 已存在")
                 
-                # 询问是否删除重建
-                response = input(f"是否删除并重建数据库 '{self.db_name}'? (yes/no): ")
-                if response.lower() in ['yes', 'y']:
+                # 询问是否删除重建（非交互模式下保留已有数据库）
+                if self._confirm(f"是否删除并重建数据库 '{self.db_name}'?", False):
                     logger.warning(f"⚠️  删除数据库 '{self.db_name}'...")
-                    cursor = self.conn.cursor()
-                    # 断开所有连接
-                    cursor.execute(
-                        sql.SQL("""
+                    if self.conn.get_server_version().major >= 13:
+                        # PostgreSQL 13+ 由服务端断开所有连接并删除，一次往返且不会有新连接插入
+                        await self.conn.execute(f"DROP DATABASE {self._db_ident} WITH (FORCE)")
+                    else:
+                        # 断开所有连接
+                        await self.conn.execute(
+                            """
                             SELECT pg_terminate_backend(pg_stat_activity.pid)
                             FROM pg_stat_activity
-                            WHERE pg_stat_activity.datname = %s
+                            WHERE pg_stat_activity.datname = $1
                             AND pid <> pg_backend_pid()
-                        """),
-                        (self.db_name,)
-                    )
-                    cursor.execute(
-                        sql.SQL("DROP DATABASE {}").format(
-                            sql.Identifier(self.db_name)
+                            """,
+                            self.db_name
                         )
-                    )
-                    cursor.close()
+                        await self.conn.execute(f"DROP DATABASE {self._db_ident}")
+                    self._database_exists = False
                     logger.info(f"✅ 数据库已删除")
                 else:
                     return True
             
             logger.info(f"🗄️  创建数据库 '{self.db_name}'...")
-            cursor = self.conn.cursor()
-            cursor.execute(
-                sql.SQL("CREATE DATABASE {} OWNER {}").format(
-                    sql.Identifier(self.db_name),
-                    sql.Identifier(self.db_user)
-                )
-            )
-            cursor.close()
+            await self.conn.execute(f"CREATE DATABASE {self._db_ident} OWNER {self._user_ident}")
+            self._database_exists = True
+            self._database_created = True
             logger.info(f"✅ 数据库创建成功")
             return True
             
@@ -213,21 +391,16 @@ class PostgreSQLSetup:
             logger.error(f"❌ 创建数据库失败: {e}")
             return False
     
-    def grant_privileges(self) -> bool:
+    async def grant_privileges(self) -> bool:
         """授予用户权限"""
         try:
             logger.info(f"🔐 授予用户权限...")
-            cursor = self.conn.cursor()
             
             # 授予数据库所有权限
-            cursor.execute(
-                sql.SQL("GRANT ALL PRIVILEGES ON DATABASE {} TO {}").format(
-                    sql.Identifier(self.db_name),
-                    sql.Identifier(self.db_user)
-                )
+            await self.conn.execute(
+                f"GRANT ALL PRIVILEGES ON DATABASE {self._db_ident} TO {self._user_ident}"
             )
             
-            cursor.close()
             logger.info(f"✅ 权限授予成功")
             return True
             
@@ -235,39 +408,47 @@ class PostgreSQLSetup:
             logger.error(f"❌ 授予权限失败: {e}")
             return False
     
+    @property
+    def database_url(self) -> str:
+        """应用连接目标数据库使用的 DATABASE_URL"""
+        return (
+            f"postgresql+asyncpg://{self.db_user}:{self.db_password}"
+            f"@{self.host}:{self.port}/{self.db_name}"
+        )
+    
     def update_env_file(self) -> bool:
         """更新.env文件"""
         try:
-            env_file = Path(__file__).parent.parent / ".env"
-            
-            database_url = (
-                f"postgresql+asyncpg://{self.db_user}:{self.db_password}"
-                f"@{self.host}:{self.port}/{self.db_name}"
-            )
+            env_file = _PROJECT_ROOT / ".env"
+            database_url = self.database_url
             
+            entry = f"DATABASE_URL={database_url}"
             if env_file.exists():
-                # 读取现有内容
-                with open(env_file, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                
-                # 更新DATABASE_URL
-                updated = False
-                for i, line in enumerate(lines):
-                    if line.startswith('DATABASE_URL='):
-                        lines[i] = f"DATABASE_URL={database_url}\n"
-                        updated = True
-                        break
-                
+                # 一次读入并替换第一行DATABASE_URL（用函数替换，避免密码中的反斜杠被当作转义）
+                content = env_file.read_text(encoding='utf-8')
+                content, updated = _DATABASE_URL_LINE.subn(lambda _: entry, content, count=1)
                 if not updated:
-                    lines.append(f"\nDATABASE_URL={database_url}\n")
-                
-                # 写回文件
-                with open(env_file, 'w', encoding='utf-8') as f:
-                    f.writelines(lines)
+                    content += f"\n{entry}\n"
             else:
                 # 创建新文件
-                with open(env_file, 'w', encoding='utf-8') as f:
-                    f.write(f"DATABASE_URL={database_url}\n")
+                content = f"{entry}\n"
+            
+            # 先写同目录临时文件并落盘，再原子替换，避免中途被中断导致.env被截断
+            with tempfile.NamedTemporaryFile(
+                'w', encoding='utf-8', dir=env_file.parent,
+                delete=False, prefix='.env.', suffix='.tmp'
+            ) as tmp:
+                tmp.write(content)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            try:
+                if env_file.exists():
+                    # 保留原文件权限（临时文件默认为 0600）
+                    os.chmod(tmp.name, env_file.stat().st_mode & 0o777)
+                os.replace(tmp.name, env_file)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
             
             logger.info(f"✅ .env 文件已更新")
             logger.info(f"   DATABASE_URL={database_url}")
@@ -277,62 +458,117 @@ class PostgreSQLSetup:
             logger.error(f"❌ 更新.env文件失败: {e}")
             return False
     
+    @staticmethod
+    def _current_head() -> Optional[str]:
+        """读取迁移脚本的最新版本号（不连接数据库）"""
+        config = _alembic_config()
+        if not config.get_main_option("script_location"):
+            return None
+        return ScriptDirectory.from_config(config).get_current_head()
+    
+    async def is_up_to_date(self) -> bool:
+        """
+        检查目标数据库是否已就绪（用户可登录、数据库存在且已迁移到最新版本）
+        
+        Returns:
+            已就绪返回True；任一条件不满足或检查出错时返回False，由完整流程处理
+        """
+        head_task = asyncio.create_task(asyncio.to_thread(self._current_head))
+        conn = None
+        try:
+            conn = await asyncpg.connect(
+                host=self.host,
+                port=self.port,
+                user=self.db_user,
+                password=self.db_password,
+                database=self.db_name
+            )
+            version = await conn.fetchval("SELECT version_num FROM alembic_version")
+            head = await head_task
+            return head is not None and version == head
+        except Exception as e:
+            logger.debug(f"数据库未就绪，执行完整设置: {e}")
+            return False
+        finally:
+            if not head_task.done():
+                head_task.cancel()
+            elif not head_task.cancelled():
+                head_task.exception()  # 取回异常，避免事件循环报告未处理的任务异常
+            if conn is not None:
+                await conn.close()
+    
+    def _upgrade_to_head(self) -> None:
+        """在当前进程内执行 alembic upgrade head"""
+        # 使用绝对路径的配置并直接传入连接串，不切换工作目录（本方法在线程池中执行，
+        # chdir 会影响整个进程），也不依赖 env.py 按当前目录查找 .env
+        config = _alembic_config()
+        config.attributes["database_url"] = self.database_url
+        try:
+            command.upgrade(config, "head")
+        finally:
+            # env.py 中的 fileConfig 会重置根日志配置并禁用已存在的 logger，恢复本脚本的日志输出
+            logging.basicConfig(level=logging.INFO, format='%(message)s', force=True)
+            logger.disabled = False
+    
     async def initialize_tables(self) -> bool:
         """初始化数据库表结构（使用 Alembic）"""
         try:
-            import subprocess
             logger.info(f"📋 使用 Alembic 初始化数据库表结构...")
             
-            # 运行 Alembic 迁移
-            result = subprocess.run(
-                ["alembic", "upgrade", "head"],
-                capture_output=True,
-                text=True,
-                cwd=Path(__file__).parent.parent
-            )
+            # 运行 Alembic 迁移（env.py 内部会启动自己的事件循环，放到线程中执行）
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._upgrade_to_head)
             
-            if result.returncode == 0:
-                logger.info(f"✅ 表结构初始化成功")
-                return True
-            else:
-                logger.error(f"❌ Alembic 迁移失败: {result.stderr}")
-                return False
-                
+            logger.info(f"✅ 表结构初始化成功")
+            return True
+            
+        except CommandError as e:
+            logger.error(f"❌ Alembic 迁移失败: {e}")
+            return False
         except Exception as e:
             logger.error(f"❌ 初始化表结构失败: {e}")
             return False
     
-    def close(self):
+    async def close(self):
         """关闭数据库连接"""
         if self.conn:
-            self.conn.close()
+            await self.conn.close()
+            self.conn = None
             logger.info(f"🔌 已断开连接")
     
     async def setup(self) -> bool:
         """执行完整设置流程"""
         try:
+            # 0. 非交互且未要求重建时，目标用户已能登录且表结构为最新版本则只同步配置文件，跳过其余步骤
+            #    （交互模式或 --yes 仍走完整流程，以便询问/执行重置密码、删除重建数据库）
+            if not self.interactive and not self.assume_yes and await self.is_up_to_date():
+                logger.info(f"✅ 数据库 '{self.db_name}' 已是最新版本，跳过设置")
+                return await asyncio.to_thread(self.update_env_file)
+            
             # 1. 连接
-            if not self.connect_as_admin():
+            if not await self.connect_as_admin():
                 return False
             
             # 2. 创建用户
-            if not self.create_user():
+            if not await self.create_user():
                 return False
             
             # 3. 创建数据库
-            if not self.create_database():
+            if not await self.create_database():
                 return False
             
-            # 4. 授予权限
-            if not self.grant_privileges():
-                return False
+            # 4. 授予权限，同时在线程中更新配置（用户和数据库已就绪，二者互不依赖）
+            #    新建的数据库属主已是该用户，拥有全部权限，只有沿用已有数据库时才需要授权
+            env_task = asyncio.create_task(asyncio.to_thread(self.update_env_file))
+            granted = self._database_created or await self.grant_privileges()
             
             # 5. 更新配置
-            if not self.update_env_file():
+            env_updated = await env_task
+            if not granted or not env_updated:
                 return False
             
             # 6. 关闭管理员连接
-            self.close()
+            await self.close()
             
             # 7. 初始化表结构
             if not await self.initialize_tables():
@@ -345,7 +581,7 @@ class PostgreSQLSetup:
             return False
         finally:
             if self.conn:
-                self.close()
+                await self.close()
 
 
 async def main():
@@ -363,43 +599,70 @@ async def main():
 ╚═══════════════════════════════════════════════════════════════╝
     """)
     
-    # 获取配置
-    print("请输入PostgreSQL配置信息:\n")
-    
-    host = input("主机地址 [localhost]: ").strip() or "localhost"
-    port = input("端口 [5432]: ").strip() or "5432"
-    port = int(port)
+    args = parse_args()
     
-    admin_user = input("管理员用户名 [postgres]: ").strip() or "postgres"
-    admin_password = getpass(f"管理员密码: ")
+    # 获取配置：命令行参数 > 环境变量 > 交互输入 > 默认值
+    try:
+        config = SetupConfig()
+        provided = config.apply_env() | config.apply_args(args)
+    except (ValueError, OSError) as e:
+        print(f"❌ {e}")
+        return
+    # 两个密码都已提供时无需交互输入，其余参数取已有值或默认值
+    interactive = (
+        not args.non_interactive
+        and sys.stdin.isatty()
+        and not {"admin_password", "db_password"} <= provided
+    )
     
-    print("\n请输入要创建的数据库信息:\n")
-    db_name = input("数据库名 [mumuai_novel]: ").strip() or "mumuai_novel"
-    db_user = input("数据库用户名 [mumuai]: ").strip() or "mumuai"
-    db_password = getpass("数据库用户密码 [mumuai123]: ") or "mumuai123"
+    if interactive:
+        print("请输入PostgreSQL配置信息:\n")
+        
+        if "host" not in provided:
+            config.host = input(f"主机地址 [{config.host}]: ").strip() or config.host
+        if "port" not in provided:
+            port = input(f"端口 [{config.port}]: ").strip()
+            if port:
+                try:
+                    config.port = _parse_port(port)
+                except ValueError as e:
+                    # 尽早失败，避免输入完所有信息后才报错
+                    print(f"❌ {e}")
+                    return
+        
+        if "admin_user" not in provided:
+            config.admin_user = input(f"管理员用户名 [{config.admin_user}]: ").strip() or config.admin_user
+        if "admin_password" not in provided:
+            config.admin_password = getpass(f"管理员密码: ")
+        
+        print("\n请输入要创建的数据库信息:\n")
+        if "db_name" not in provided:
+            config.db_name = input(f"数据库名 [{config.db_name}]: ").strip() or config.db_name
+        if "db_user" not in provided:
+            config.db_user = input(f"数据库用户名 [{config.db_user}]: ").strip() or config.db_user
+        if "db_password" not in provided:
+            config.db_password = getpass(f"数据库用户密码 [{config.db_password}]: ") or config.db_password
+    else:
+        if config.admin_password is None:
+            print("❌ 非交互模式需要管理员密码（设置 PGPASSWORD 或使用 --admin-password-file）")
+            return
+        print("非交互模式，跳过输入\n")
     
     print(f"\n{'='*60}")
     print(f"配置摘要:")
-    print(f"  服务器: {host}:{port}")
-    print(f"  数据库: {db_name}")
-    print(f"  用户: {db_user}")
+    print(f"  服务器: {config.host}:{config.port}")
+    print(f"  数据库: {config.db_name}")
+    print(f"  用户: {config.db_user}")
     print(f"{'='*60}\n")
     
-    response = input("确认开始设置? (yes/no): ")
-    if response.lower() not in ['yes', 'y']:
-        print("已取消设置")
-        return
+    if interactive and not args.yes:
+        response = input("确认开始设置? (yes/no): ")
+        if response.lower() not in ['yes', 'y']:
+            print("已取消设置")
+            return
     
     # 执行设置
-    setup = PostgreSQLSetup(
-        host=host,
-        port=port,
-        admin_user=admin_user,
-        admin_password=admin_password,
-        db_name=db_name,
-        db_user=db_user,
-        db_password=db_password
-    )
+    setup = PostgreSQLSetup(**asdict(config), interactive=interactive, assume_yes=args.yes)
     
     print(f"\n{'='*60}")
     success = await setup.setup()